@@ -1,72 +1,202 @@
-import csv
-from indicators import soil_indicators
-from fahp import evaluate_soil_health
-from fertilizer_recommendations import get_fertilizer_recommendation
+import hashlib
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+from indicators import soil_indicators, indicator_columns, indicator_bounds, membership_values
+from fahp import fahp_weights, matrix_fingerprint, evaluate_soil_health_masked
+from fertilizer_recommendations import get_fertilizer_recommendation, get_fertilizer_recommendations_batch
+from recommendations import crop_index, fertilizer_index
 
-def assess_soil_health(indicator_values):
-    # Validate the indicator values
-    for indicator, value in zip(soil_indicators, indicator_values):
-        if not indicator.min_value <= value <= indicator.max_value:
-            raise ValueError(f"Invalid value for {indicator.name}: {value}")
+@dataclass(frozen=True)
+class AssessmentResult:
+    # Everything derived from one sample's indicator values. Computed once per sample and shared by
+    # the result view, database save, Excel export and PDF report.
+    indicator_values: tuple
+    normalized_values: tuple
+    soil_health_score: float
+    rating: str
+    crop_recommendations: str
+    fertilizer_recommendation: str
+    missing_indicators: tuple
+    seconds: float
 
-    # Normalize the indicator values based on their ranges
-    normalized_values = []
-    for indicator, value in zip(soil_indicators, indicator_values):
-        normalized_value = (value - indicator.min_value) / (indicator.max_value - indicator.min_value)
-        normalized_values.append(normalized_value)
+    def as_dict(self):
+        return {
+            'soil_health_score': self.soil_health_score,
+            'rating': self.rating,
+            'crop_recommendations': self.crop_recommendations,
+            'fertilizer_recommendation': self.fertilizer_recommendation
+        }
 
-    # Calculate the soil health score using FAHP
-    soil_health_score = evaluate_soil_health(normalized_values)
-    rating = generate_rating(soil_health_score)
-    crop_recommendations = generate_crop_recommendations(soil_health_score)
-    fertilizer_recommendation = generate_fertilizer_recommendation(soil_health_score)
+# How indicator values are mapped onto 0-1 before weighting:
+#   'linear'     position between the indicator's min_value and max_value
+#   'membership' trapezoidal membership of the indicator's optimal_range (1 inside it, falling to 0
+#                at min_value and max_value), so values past the optimum stop scoring higher
+scoring_modes = ('linear', 'membership')
 
+def scoring_provenance(scoring_mode='linear'):
+    # Everything a stored score and its recommendations depend on
     return {
-        'soil_health_score': soil_health_score,
-        'rating': rating,
-        'crop_recommendations': crop_recommendations,
-        'fertilizer_recommendation': fertilizer_recommendation
+        'scoring_mode': scoring_mode,
+        'weights': matrix_fingerprint(fahp_weights()),
+        'crop_recommendations': crop_index.digest(),
+        'fertilizer_recommendations': fertilizer_index.digest(),
     }
 
+def missing_recommendation_files():
+    # Recommendation CSVs that could not be read; scoring without them yields placeholder texts
+    return [index.file_path for index in (crop_index, fertilizer_index) if index.digest() is None]
+
+def scoring_version(scoring_mode='linear'):
+    # Short id of scoring_provenance, stored with every scored soil test; it changes whenever the
+    # FAHP matrix, either recommendation CSV or the scoring mode changes
+    provenance = scoring_provenance(scoring_mode)
+    key = '|'.join(str(provenance[name]) for name in sorted(provenance))
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+def scale_indicators(values, scoring_mode='linear'):
+    # Vectorized over an (N, 8) array or one sample; NaN stays NaN
+    values = np.asarray(values, dtype=float)
+    if scoring_mode == 'linear':
+        min_values, max_values = indicator_bounds()
+        return (values - min_values) / (max_values - min_values)
+    if scoring_mode == 'membership':
+        return membership_values(values)
+    raise ValueError(f"Unknown scoring mode {scoring_mode}: use one of {', '.join(scoring_modes)}")
+
+def normalize_indicators(indicator_values, scoring_mode='linear'):
+    # Validate the indicator values; None marks an indicator that was not measured
+    for indicator, value in zip(soil_indicators, indicator_values):
+        if value is not None and not indicator.min_value <= value <= indicator.max_value:
+            raise ValueError(f"Invalid value for {indicator.name}: {value}")
+
+    # Normalize the indicator values based on their ranges (NaN where not measured)
+    return scale_indicators(np.asarray(indicator_values, dtype=float), scoring_mode)
+
+@lru_cache(maxsize=1024)
+def _assess_sample(indicator_values, weights_version, crop_version, fertilizer_version, scoring_mode):
+    start_time = time.perf_counter()
+    present = [value is not None for value in indicator_values]
+    if not any(present):
+        raise ValueError("Enter at least one soil health indicator value")
+    normalized_values = normalize_indicators(indicator_values, scoring_mode)
+
+    # Calculate the soil health score using FAHP, with the weights renormalized over measured indicators
+    soil_health_score = float(evaluate_soil_health_masked(normalized_values, present))
+    return AssessmentResult(
+        indicator_values=indicator_values,
+        normalized_values=tuple(value if measured else None
+                                for value, measured in zip(normalized_values.tolist(), present)),
+        soil_health_score=soil_health_score,
+        rating=generate_rating(soil_health_score),
+        crop_recommendations=generate_crop_recommendations(soil_health_score),
+        fertilizer_recommendation=generate_fertilizer_recommendation(soil_health_score),
+        missing_indicators=tuple(indicator.name for indicator, measured in zip(soil_indicators, present)
+                                 if not measured),
+        seconds=time.perf_counter() - start_time
+    )
+
+def assess_sample(indicator_values, scoring_mode='linear'):
+    # Cached by indicator tuple. The FAHP weights fingerprint and the recommendation CSV versions are
+    # part of the key, so a new comparison matrix or an edited CSV is picked up instead of serving
+    # stale results. None or NaN marks a skipped indicator.
+    indicator_values = tuple(None if value is None or value != value else float(value)
+                             for value in indicator_values)
+    return _assess_sample(indicator_values, matrix_fingerprint(fahp_weights()), crop_index.version(),
+                          fertilizer_index.version(), scoring_mode)
+
+def clear_assessment_cache():
+    # Call after changing the indicator ranges; weight and CSV changes already miss the cache
+    _assess_sample.cache_clear()
+
+def assess_soil_health(indicator_values, scoring_mode='linear'):
+    return assess_sample(indicator_values, scoring_mode).as_dict()
+
+# Lower score bound of every rating after "Very Poor", shared by the scalar and batch paths
+rating_thresholds = np.array([0.2, 0.4, 0.6, 0.7, 0.8, 0.9])
+rating_labels = np.array(["Very Poor", "Poor", "Below Average", "Average", "Above Average", "Good", "Excellent"],
+                         dtype=object)
+
 def generate_rating(soil_health_score):
-    if soil_health_score < 0.2:
-        return "Very Poor"
-    elif soil_health_score < 0.4:
-        return "Poor"
-    elif soil_health_score < 0.6:
-        return "Below Average"
-    elif soil_health_score < 0.7:
-        return "Average"
-    elif soil_health_score < 0.8:
-        return "Above Average"
-    elif soil_health_score < 0.9:
-        return "Good"
+    # A missing or non-finite score (an unscorable sample) gets no rating rather than "Excellent"
+    if soil_health_score is None or not np.isfinite(soil_health_score):
+        return None
+    return rating_labels[np.searchsorted(rating_thresholds, soil_health_score, side='right')]
+
+def generate_ratings(soil_health_scores):
+    # Vectorized generate_rating; NaN scores (invalid rows) get no rating
+    soil_health_scores = np.asarray(soil_health_scores, dtype=float)
+    ratings = rating_labels[np.searchsorted(rating_thresholds, soil_health_scores, side='right')]
+    ratings[~np.isfinite(soil_health_scores)] = None
+    return ratings
+
+def indicator_array(samples):
+    # Accept an (N, 8) array-like or a structured/record array with indicator column names;
+    # None values become NaN
+    samples = np.asarray(samples)
+    if samples.dtype == object:
+        samples = np.where(np.equal(samples, None), np.nan, samples)
+    if samples.dtype.names:
+        missing = [column for column in indicator_columns if column not in samples.dtype.names]
+        if missing:
+            raise ValueError(f"Record array is missing indicator fields: {', '.join(missing)}")
+        samples = np.column_stack([samples[column].astype(float) for column in indicator_columns])
+    else:
+        samples = np.atleast_2d(samples.astype(float))
+    if samples.shape[1] != len(soil_indicators):
+        raise ValueError(f"Expected {len(soil_indicators)} indicator columns, got {samples.shape[1]}")
+    return samples
+
+def assess_batch(samples, allow_missing=False, scoring_mode='linear'):
+    # allow_missing scores rows with NaN (not measured) indicators over the ones present, instead of
+    # flagging them invalid; a row still needs at least one measured indicator
+    values = indicator_array(samples)
+    min_values, max_values = indicator_bounds()
+    present_mask = ~np.isnan(values)
+
+    # Out-of-range and NaN values are flagged per cell instead of raising
+    with np.errstate(invalid='ignore'):
+        invalid_mask = ~((values >= min_values) & (values <= max_values))
+    if allow_missing:
+        invalid_mask &= present_mask
+    valid = ~invalid_mask.any(axis=1) & present_mask.any(axis=1)
+
+    normalized_values = scale_indicators(values, scoring_mode)
+    if allow_missing:
+        soil_health_scores = evaluate_soil_health_masked(normalized_values, present_mask)
     else:
-        return "Excellent"
+        soil_health_scores = normalized_values @ fahp_weights()
+    soil_health_scores[~valid] = np.nan
+
+    return {
+        'soil_health_score': soil_health_scores,
+        'rating': generate_ratings(soil_health_scores),
+        'normalized_values': normalized_values,
+        'valid': valid,
+        'invalid_mask': invalid_mask,
+        'present_mask': present_mask
+    }
+
+NO_CROP_RECOMMENDATION = "No specific crop recommendations available for the given soil health score."
 
 def load_crop_recommendations():
-    crop_recommendations = []
-    try:
-        with open('crop_recommendations.csv', 'r') as file:
-            csv_reader = csv.reader(file)
-            next(csv_reader)  # Skip the header row
-            for row in csv_reader:
-                min_score = float(row[0])
-                max_score = float(row[1])
-                recommendation = row[2]
-                crop_recommendations.append((min_score, max_score, recommendation))
-    except FileNotFoundError:
-        print("Error: crop_recommendations.csv file not found.")
-    except csv.Error as e:
-        print(f"Error reading crop_recommendations.csv: {e}")
-    return crop_recommendations
+    crop_index.refresh()
+    return crop_index.recommendations
 
 def generate_crop_recommendations(soil_health_score):
-    crop_recommendations = load_crop_recommendations()
-    for min_score, max_score, recommendation in crop_recommendations:
-        if min_score <= soil_health_score < max_score:
-            return recommendation
-    return "No specific crop recommendations available for the given soil health score."
+    # Overlapping score bands all apply, in the order they appear in the CSV
+    recommendations = crop_index.lookup_all(soil_health_score)
+    if recommendations:
+        return " ".join(recommendations)
+    return NO_CROP_RECOMMENDATION
+
+def generate_crop_recommendations_batch(soil_health_scores):
+    return [" ".join(recommendations) if recommendations else NO_CROP_RECOMMENDATION
+            for recommendations in crop_index.lookup_batch(soil_health_scores)]
 
 def generate_fertilizer_recommendation(soil_health_score):
-    return get_fertilizer_recommendation(soil_health_score)
\ No newline at end of file
+    return get_fertilizer_recommendation(soil_health_score)
+
+def generate_fertilizer_recommendations_batch(soil_health_scores):
+    return get_fertilizer_recommendations_batch(soil_health_scores)
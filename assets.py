@@ -0,0 +1,9 @@
+import os
+
+# Files shipped with the application (recommendation CSVs, icons, logos and the default database) are
+# found next to the code, so scripts and scheduled jobs work from any working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def asset_path(name):
+    return os.path.join(BASE_DIR, name)
@@ -0,0 +1,114 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from connection import get_connection, get_database_path, set_database_path
+from indicators import indicator_columns
+from assessment import generate_rating
+from schema import display_date
+
+
+def report_data(row):
+    # soil_test_details row (as a column -> value mapping) to the data dict generate_pdf_report expects
+    data = dict(row)
+    data['collection_date'] = display_date(data['collection_date'])
+    # Tests imported before scores were stored, or never scorable, have no score and so no rating
+    data['rating'] = generate_rating(data['soil_health_score'])
+    data['crop_recommendations'] = data['crop_recommendations'] or ''
+    data['fertilizer_recommendation'] = data['fertilizer_recommendation'] or ''
+    return data
+
+
+def select_tests(test_ids=None, where=None, parameters=()):
+    # Tests to report on: an explicit list of test IDs, or a WHERE clause over soil_test_details
+    conn = get_connection()
+    cursor = conn.execute("SELECT * FROM soil_test_details LIMIT 0")
+    columns = [description[0] for description in cursor.description]
+    if test_ids is not None:
+        test_ids = [str(test_id) for test_id in test_ids]
+        for start in range(0, len(test_ids), 500):
+            chunk = test_ids[start:start + 500]
+            for row in conn.execute(
+                    f"SELECT * FROM soil_test_details WHERE test_id IN ({', '.join('?' * len(chunk))}) ORDER BY id", chunk):
+                yield dict(zip(columns, row))
+        return
+    query = "SELECT * FROM soil_test_details"
+    if where:
+        query += f" WHERE {where}"
+    for row in conn.execute(query + " ORDER BY id", parameters):
+        yield dict(zip(columns, row))
+
+
+def report_file_name(data):
+    return f"{data['test_id'] or data['id']}_report.pdf"
+
+
+def init_worker(database_path, working_directory):
+    # Runs once in every worker process: same database and asset directory, warmed report resources
+    os.chdir(working_directory)
+    set_database_path(database_path)
+    from report import warm_report_resources
+    warm_report_resources()
+
+
+def render_report(data, file_path):
+    from report import generate_pdf_report
+    start_time = time.perf_counter()
+    indicator_values = [data[column] for column in indicator_columns]
+    generate_pdf_report(data, file_path, indicator_values)
+    return time.perf_counter() - start_time
+
+
+def generate_reports(output_dir, test_ids=None, where=None, parameters=(), workers=None, progress=None):
+    # Render one PDF per selected test into output_dir across a process pool.
+    # Returns one {'test_id', 'file_path', 'seconds', 'error'} dict per report.
+    os.makedirs(output_dir, exist_ok=True)
+    output_dir = os.path.abspath(output_dir)
+    rows = list(select_tests(test_ids, where, parameters))
+    results = []
+
+    def finish(result):
+        results.append(result)
+        if progress:
+            progress(len(results), len(rows), result)
+
+    # A test whose stored data cannot be prepared fails on its own, like a report that fails to render
+    tests = []
+    for row in rows:
+        try:
+            tests.append(report_data(row))
+        except Exception as e:
+            finish({'test_id': row['test_id'], 'file_path': None, 'seconds': None, 'error': str(e)})
+    if not tests:
+        return results
+
+    initargs = (os.path.abspath(get_database_path()), os.getcwd())
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as executor:
+        futures = {}
+        for data in tests:
+            file_path = os.path.join(output_dir, report_file_name(data))
+            futures[executor.submit(render_report, data, file_path)] = (data, file_path)
+        for future in as_completed(futures):
+            data, file_path = futures[future]
+            result = {'test_id': data['test_id'], 'file_path': file_path, 'seconds': None, 'error': None}
+            try:
+                result['seconds'] = future.result()
+            except Exception as e:
+                result['error'] = str(e)
+            finish(result)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python batch_reports.py <output directory> [test_id ...]")
+        sys.exit(1)
+
+    def print_progress(done, total, result):
+        status = f"{result['seconds']:.2f}s" if result['error'] is None else f"failed: {result['error']}"
+        print(f"[{done}/{total}] {result['test_id']}: {status}")
+
+    batch_start = time.perf_counter()
+    reports = generate_reports(sys.argv[1], test_ids=sys.argv[2:] or None, progress=print_progress)
+    print(f"Generated {sum(result['error'] is None for result in reports)} of {len(reports)} reports "
+          f"in {time.perf_counter() - batch_start:.1f}s")
@@ -0,0 +1,67 @@
+import json
+import statistics
+import subprocess
+import sys
+
+# Startup cost of the entry points, each measured in a fresh interpreter:
+#   python bench_startup.py [runs]
+# "numpy" is the floor for everything else, since the scoring core is built on it. The target for
+# importing the core and scoring one sample is TARGET_MS; where numpy alone takes most of that, the
+# "over numpy" column shows what the project's own modules add.
+
+TARGET_MS = 100
+
+SAMPLE = [6.5, 120, 40, 150, 1.2, 25, 40, 50]
+
+scenarios = {
+    'numpy': "import numpy",
+    'score one sample': f"from assessment import assess_sample\nassess_sample({SAMPLE})",
+    'importer': "import importer",
+    'database': "import database",
+    'service': "import service",
+    'report': "import report",
+}
+
+# Modules that should only load when the feature that needs them is used
+heavy_modules = ['tkinter', 'matplotlib', 'reportlab', 'openpyxl', 'PIL', 'pdf2image', 'win32api']
+
+probe = '''
+import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, "<scenario>", "exec"))
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": loaded}}))
+'''
+
+
+def measure(code, runs):
+    timings, heavy = [], []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', probe.format(code=code, heavy=heavy_modules)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(sample['seconds'])
+        heavy = sample['heavy']
+    return statistics.median(timings), heavy
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'Scenario':<20}{'Median':>10}{'Over numpy':>12}  Heavy modules loaded")
+    medians = {}
+    for name, code in scenarios.items():
+        seconds, heavy = measure(code, runs)
+        if seconds is None:
+            print(f"{name:<20}{'failed':>10}{'':>12}  {heavy}")
+            continue
+        medians[name] = seconds * 1000
+        over = f"{'':>12}"
+        if name != 'numpy' and 'numpy' in medians:
+            over = f"{medians[name] - medians['numpy']:>10.1f}ms"
+        print(f"{name:<20}{medians[name]:>8.1f}ms{over}  {', '.join(heavy) or '-'}")
+    if 'score one sample' in medians:
+        verdict = "met" if medians['score one sample'] <= TARGET_MS else "NOT met"
+        print(f"\nTarget: score one sample in {TARGET_MS} ms: {verdict} ({medians['score one sample']:.1f} ms)")
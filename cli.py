@@ -0,0 +1,315 @@
+import argparse
+import csv
+import sys
+import time
+from functools import partial
+import numpy as np
+from indicators import indicator_columns
+from assessment import (assess_batch, scoring_modes, generate_crop_recommendations_batch,
+                        generate_fertilizer_recommendations_batch, missing_recommendation_files)
+from connection import get_connection, set_database_path
+from importer import read_rows, read_records, chunked, map_chunks, to_float, to_text, import_file
+from exporter import table_columns, query_rows, fetch_chunks, write_csv, export_file
+
+# Non-interactive entry point for scripted and scheduled jobs, e.g.
+#   python cli.py score samples.csv -o scored.csv --workers 4
+#   python cli.py --database district.db import samples.xlsx
+#   python cli.py report "Test Reports" --where "collection_date >= '2024-01-01'"
+#   python cli.py export -o dump.xlsx --split-by month
+#   python cli.py rescore
+#   python cli.py sensitivity --draws 10000 --workers 4
+# Every command works through its input in chunks, so memory use does not grow with file size.
+# Exit status is 0 on success, 2 when some rows were rejected or could not be scored, and 1 when the
+# command could not run, e.g. without the recommendation files.
+
+score_columns = (['line', 'test_id'] + indicator_columns +
+                 ['soil_health_score', 'rating', 'crop_recommendations', 'fertilizer_recommendation', 'error'])
+score_types = dict({column: 'text' for column in score_columns}, line='integer', soil_health_score='real',
+                   **{column: 'real' for column in indicator_columns})
+
+
+def score_chunk(chunk, lookup_table=None, scoring_mode='linear'):
+    # Score one chunk of (line number, record) pairs into output rows; runs in worker processes.
+    # lookup_table scores from a precomputed score_table.py table instead of exact FAHP.
+    values = np.full((len(chunk), len(indicator_columns)), np.nan)
+    errors = [None] * len(chunk)
+    for position, (line_number, record) in enumerate(chunk):
+        try:
+            values[position] = [to_float(record.get(column)) if record.get(column) not in (None, '') else np.nan
+                                for column in indicator_columns]
+        except (TypeError, ValueError) as e:
+            errors[position] = f"Unreadable value: {e}"
+
+    if lookup_table:
+        from score_table import load_score_table
+        results = load_score_table(lookup_table).lookup(values)
+        scores = results['soil_health_score']
+        crop_recommendations = results['crop_recommendations']
+        fertilizer_recommendations = results['fertilizer_recommendations']
+    else:
+        results = assess_batch(values, scoring_mode=scoring_mode)
+        scores = results['soil_health_score']
+        crop_recommendations = generate_crop_recommendations_batch(scores)
+        fertilizer_recommendations = generate_fertilizer_recommendations_batch(scores)
+
+    rows = []
+    for position, (line_number, record) in enumerate(chunk):
+        row = [line_number, to_text(record.get('test_id'))]
+        row += [None if np.isnan(value) else float(value) for value in values[position]]
+        if errors[position] is None and results['valid'][position]:
+            row += [float(scores[position]), results['rating'][position], crop_recommendations[position],
+                    fertilizer_recommendations[position], None]
+        else:
+            if errors[position] is None:
+                bad_columns = [indicator_columns[i] for i in np.flatnonzero(results['invalid_mask'][position])]
+                errors[position] = f"Invalid or missing values for {', '.join(bad_columns)}"
+            row += [None, None, None, None, errors[position]]
+        rows.append(row)
+    return rows
+
+
+def input_rows(path):
+    if path == '-':
+        return csv.reader(sys.stdin)
+    return read_rows(path)
+
+
+class CsvOutput:
+    def __init__(self, path, columns):
+        self.file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetOutput:
+    # One row group per chunk; pyarrow is only needed when Parquet output is asked for.
+    # types maps each column to its SQLite type affinity: 'integer', 'real' or 'text'.
+    def __init__(self, path, columns, types):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.columns = columns
+        arrow_types = {'integer': pa.int64(), 'real': pa.float64(), 'text': pa.string()}
+        self.schema = pa.schema([pa.field(column, arrow_types[types[column]]) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        arrays = {column: [row[i] for row in rows] for i, column in enumerate(self.columns)}
+        self.writer.write_table(self.pa.Table.from_pydict(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_output(path, columns, types):
+    if path.lower().endswith('.parquet'):
+        return ParquetOutput(path, columns, types)
+    return CsvOutput(path, columns)
+
+
+def recommendations_missing():
+    # Scoring without a recommendation CSV would hand out placeholder texts, so the commands that
+    # produce recommendations stop with an error instead
+    missing = missing_recommendation_files()
+    for file_path in missing:
+        print(f"Recommendation file not found: {file_path}", file=sys.stderr)
+    return bool(missing)
+
+
+def command_score(args):
+    if args.lookup_table and args.scoring_mode != 'linear':
+        raise SystemExit("Lookup tables are built for linear scoring; drop --lookup-table or --scoring-mode")
+    if not args.lookup_table and recommendations_missing():
+        return 1
+    start_time = time.perf_counter()
+    output = open_output(args.output, score_columns, score_types)
+    scored = failed = 0
+    try:
+        chunks = chunked(read_records(input_rows(args.input)), args.chunk_size)
+        for rows in map_chunks(partial(score_chunk, lookup_table=args.lookup_table,
+                                           scoring_mode=args.scoring_mode), chunks, args.workers):
+            output.write(rows)
+            scored += len(rows)
+            failed += sum(row[-1] is not None for row in rows)
+    finally:
+        output.close()
+    print(f"Scored {scored - failed} of {scored} samples in {time.perf_counter() - start_time:.2f}s, "
+          f"{failed} invalid", file=sys.stderr)
+    return 0 if failed == 0 else 2
+
+
+def command_import(args):
+    def print_progress(stats):
+        print(f"  {stats['rows']} rows read, {stats['imported']} imported", file=sys.stderr)
+
+    if recommendations_missing():
+        return 1
+    rows = csv.reader(sys.stdin) if args.input == '-' else None
+    result = import_file(args.input, chunk_size=args.chunk_size, progress=print_progress if args.verbose else None,
+                         workers=args.workers, rows=rows)
+    print(f"Imported {result['imported']} of {result['rows']} rows in {result['seconds']:.2f}s "
+          f"({result['rows_per_second']:.0f} rows/s), rejected {result['rejected']}", file=sys.stderr)
+    for line_number, reason in result['rejected_rows']:
+        print(f"  line {line_number}: {reason}", file=sys.stderr)
+    return 0 if result['rejected'] == 0 else 2
+
+
+def command_report(args):
+    from batch_reports import generate_reports
+
+    def print_progress(done, total, result):
+        status = f"{result['seconds']:.2f}s" if result['error'] is None else f"failed: {result['error']}"
+        print(f"[{done}/{total}] {result['test_id']}: {status}", file=sys.stderr)
+
+    start_time = time.perf_counter()
+    reports = generate_reports(args.output_dir, test_ids=args.test_ids or None, where=args.where,
+                               workers=args.workers, progress=print_progress)
+    failed = sum(result['error'] is not None for result in reports)
+    print(f"Generated {len(reports) - failed} of {len(reports)} reports in {time.perf_counter() - start_time:.1f}s",
+          file=sys.stderr)
+    return 0 if failed == 0 else 2
+
+
+def command_export(args):
+    if args.output.lower().endswith('.parquet'):
+        conn = get_connection()
+        cursor = query_rows(args.where, conn=conn)
+        output = open_output(args.output, [description[0] for description in cursor.description],
+                             dict(table_columns(conn)))
+        exported = 0
+        try:
+            for rows in fetch_chunks(cursor):
+                output.write(rows)
+                exported += len(rows)
+        finally:
+            output.close()
+    elif args.output == '-':
+        if args.split_by:
+            raise SystemExit("--split-by needs an .xlsx output file")
+        exported = write_csv(sys.stdout, args.where)
+    else:
+        exported = export_file(args.output, args.where, split_by=args.split_by)
+    print(f"Exported {exported} rows", file=sys.stderr)
+    return 0
+
+
+def command_rescore(args):
+    from rescoring import rescore_database
+
+    def print_progress(stats):
+        print(f"  {stats['rescored'] + stats['failed']} of {stats['stale']} stale rows done", file=sys.stderr)
+
+    if recommendations_missing():
+        return 1
+
+    result = rescore_database(chunk_size=args.chunk_size, duty_cycle=args.duty_cycle,
+                              progress=print_progress if args.verbose else None)
+    print(f"Rescored {result['rescored']} of {result['stale']} stale rows in {result['seconds']:.2f}s "
+          f"(version {result['version']}), {result['failed']} could not be scored and kept their stored results",
+          file=sys.stderr)
+    return 0 if result['failed'] == 0 else 2
+
+
+def command_sensitivity(args):
+    from sensitivity import run_sensitivity, format_report
+    start_time = time.perf_counter()
+    result = run_sensitivity(args.draws, seed=args.seed, workers=args.workers, scoring_mode=args.scoring_mode)
+    print(format_report(result, args.most_sensitive))
+    print(f"Finished in {time.perf_counter() - start_time:.1f}s", file=sys.stderr)
+    return 0
+
+
+def positive_int(text):
+    # argparse type for counts that must be at least 1
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Soil Health Diagnostic System command-line tools")
+    parser.add_argument('--database', help="SQLite database to use instead of soil_health.db")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    score = commands.add_parser('score', help="Score samples from a file or stdin without storing them")
+    score.add_argument('input', help="CSV, XLSX or Parquet file, or - to read CSV from stdin")
+    score.add_argument('-o', '--output', default='-', help="CSV or .parquet file, or - for stdout (default)")
+    score.add_argument('--chunk-size', type=int, default=10000)
+    score.add_argument('--workers', type=int, default=1, help="Processes scoring chunks in parallel")
+    score.add_argument('--lookup-table', help="Score from a table built by score_table.py (ratings and "
+                                              "recommendations exact, scores within the table's error bound)")
+    score.add_argument('--scoring-mode', choices=scoring_modes, default='linear',
+                       help="linear: position between each indicator's limits (default); membership: closeness "
+                            "to each indicator's optimal range")
+    score.set_defaults(handler=command_score)
+
+    load = commands.add_parser('import', help="Score samples and store them in soil_tests")
+    load.add_argument('input', help="CSV, XLSX or Parquet file, or - to read CSV from stdin")
+    load.add_argument('--chunk-size', type=int, default=10000)
+    load.add_argument('--workers', type=int, default=1, help="Processes scoring chunks in parallel")
+    load.add_argument('-v', '--verbose', action='store_true', help="Report progress after every chunk")
+    load.set_defaults(handler=command_import)
+
+    report = commands.add_parser('report', help="Generate PDF reports for stored tests")
+    report.add_argument('output_dir')
+    report.add_argument('test_ids', nargs='*', help="Test IDs to report on (default: every test matching --where)")
+    report.add_argument('--where', help="SQL condition on soil_test_details selecting the tests")
+    report.add_argument('--workers', type=int, default=None, help="Processes rendering reports (default: CPU count)")
+    report.set_defaults(handler=command_report)
+
+    export = commands.add_parser('export', help="Dump stored tests to CSV, Excel or Parquet")
+    export.add_argument('-o', '--output', default='-',
+                        help="CSV, .xlsx or .parquet file, or - for CSV on stdout (default)")
+    export.add_argument('--where', help="SQL condition on soil_test_details selecting the rows")
+    export.add_argument('--split-by', help="Excel only: one sheet per year, month or value of a column such as address")
+    export.set_defaults(handler=command_export)
+
+    rescore = commands.add_parser('rescore', help="Recompute stored scores made with older weights or recommendations")
+    rescore.add_argument('--chunk-size', type=int, default=2000)
+    rescore.add_argument('--duty-cycle', type=float, default=1.0,
+                         help="Share of time spent working, below 1 to leave room for other users (default: 1)")
+    rescore.add_argument('-v', '--verbose', action='store_true', help="Report progress after every chunk")
+    rescore.set_defaults(handler=command_rescore)
+
+    sensitivity = commands.add_parser('sensitivity', help="Monte Carlo sensitivity of weights and stored ratings "
+                                                          "to the FAHP comparison matrix")
+    sensitivity.add_argument('--draws', type=positive_int, default=5000, help="Perturbed comparison matrices to sample")
+    sensitivity.add_argument('--seed', type=int, help="Random seed, for repeatable results")
+    sensitivity.add_argument('--workers', type=int, default=1, help="Processes sampling draws in parallel")
+    sensitivity.add_argument('--scoring-mode', choices=scoring_modes, default='linear')
+    sensitivity.add_argument('--most-sensitive', type=int, default=10, help="Samples to list by rating flip rate")
+    sensitivity.set_defaults(handler=command_sensitivity)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.database:
+        set_database_path(args.database)
+    try:
+        return args.handler(args)
+    except ImportError as e:
+        if not (e.name or '').startswith('pyarrow'):
+            raise
+        print("Parquet files need pyarrow: pip install pyarrow", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output piped into something like head that stopped reading early
+        import os
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import atexit
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from assets import asset_path
+
+DEFAULT_DB_PATH = asset_path('soil_health.db')
+
+# The database path can be overridden with SHDS_DB_PATH or set_database_path()
+_db_path = os.environ.get('SHDS_DB_PATH', DEFAULT_DB_PATH)
+_path_generation = 0
+_local = threading.local()
+# Per-thread holders of the connections get_connection() opened. A holder lives in its thread's
+# locals, so it is collected when the thread exits and its finalizer closes the connection.
+_open_connections = weakref.WeakSet()
+_registry_lock = threading.Lock()
+
+
+class _ThreadConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.finalizer = weakref.finalize(self, conn.close)
+
+
+def get_database_path():
+    return _db_path
+
+
+def set_database_path(path):
+    # Connections already opened by other threads are reopened on their next get_connection()
+    global _db_path, _path_generation
+    close_all_connections()
+    _db_path = path
+    _path_generation += 1
+
+
+def open_connection(path=None, check_same_thread=True):
+    # A standalone connection with the shared settings. Python's sqlite3 keeps a per-connection
+    # cache of prepared statements, so long-lived connections reuse them across calls.
+    conn = sqlite3.connect(path or _db_path, timeout=30, isolation_level=None, cached_statements=256,
+                           check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def get_connection():
+    # One connection per thread, opened on first use and reused afterwards. It may be closed from
+    # another thread (close_all_connections, set_database_path), so it skips sqlite3's owner check;
+    # only its own thread ever runs statements on it.
+    holder = getattr(_local, 'holder', None)
+    if holder is not None and holder.finalizer.alive and _local.generation == _path_generation:
+        return holder.conn
+    if holder is not None:
+        _discard(holder)
+    holder = _ThreadConnection(open_connection(check_same_thread=False))
+    _local.holder = holder
+    _local.generation = _path_generation
+    _local.depth = 0
+    with _registry_lock:
+        _open_connections.add(holder)
+    return holder.conn
+
+
+@contextmanager
+def transaction():
+    # Commit on success and roll back on error; nested use becomes a savepoint
+    conn = get_connection()
+    depth = _local.depth
+    if depth == 0:
+        conn.execute("BEGIN IMMEDIATE")
+    else:
+        conn.execute(f"SAVEPOINT sp_{depth}")
+    _local.depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        if depth == 0:
+            conn.execute("ROLLBACK")
+        else:
+            conn.execute(f"ROLLBACK TO sp_{depth}")
+            conn.execute(f"RELEASE sp_{depth}")
+        raise
+    else:
+        if depth == 0:
+            conn.execute("COMMIT")
+        else:
+            conn.execute(f"RELEASE sp_{depth}")
+    finally:
+        _local.depth = depth
+
+
+def _discard(holder):
+    with _registry_lock:
+        _open_connections.discard(holder)
+    holder.finalizer()
+
+
+def close_connection():
+    holder = getattr(_local, 'holder', None)
+    if holder is not None:
+        _local.holder = None
+        _discard(holder)
+
+
+def close_all_connections():
+    close_connection()
+    with _registry_lock:
+        holders = list(_open_connections)
+    for holder in holders:
+        _discard(holder)
+
+
+atexit.register(close_all_connections)
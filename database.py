@@ -1,59 +1,42 @@
-import sqlite3
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox  # Add 'messagebox' to the import statement
-from PIL import Image as PILImage, ImageTk
-import openpyxl
+from connection import transaction
+from schema import (migrate, insert_sql, iso_date, record_scoring_version, store_recommendation_texts,
+                    normalize_test_id, stored_test_ids)
+from pagination import PagedQuery
+from exporter import export_xlsx
+from assets import asset_path
+
+# Rows fetched per page while scrolling the database viewer, and how many pages are prefetched ahead
+PAGE_SIZE = 100
+PREFETCH_PAGES = 2
 
 def create_database():
-    conn = sqlite3.connect('soil_health.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS soil_tests
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  test_id TEXT,
-                  collection_date TEXT,
-                  latitude REAL,
-                  longitude REAL,
-                  name TEXT,
-                  area REAL,
-                  gender TEXT,
-                  age INTEGER,
-                  address TEXT,
-                  mobile_no TEXT,
-                  soil_ph REAL,
-                  nitrogen REAL,
-                  phosphorus REAL,
-                  potassium REAL,
-                  electrical_conductivity REAL,
-                  temperature REAL,
-                  moisture REAL,
-                  humidity REAL,
-                  soil_health_score REAL(3,2),
-                  crop_recommendations TEXT,
-                  fertilizer_recommendation TEXT)''')
-    conn.commit()
-    conn.close()
-
-def save_results(data):
-    conn = sqlite3.connect('soil_health.db')
-    c = conn.cursor()
-
-    c.execute('''INSERT INTO soil_tests
-                 (test_id, collection_date, latitude, longitude, name, area, gender, age, address, mobile_no,
-                  soil_ph, nitrogen, phosphorus, potassium, electrical_conductivity, temperature, moisture, humidity,
-                  soil_health_score, crop_recommendations, fertilizer_recommendation)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-              (
-                  data['test_id'], data['collection_date'], data['latitude'], data['longitude'], data['name'],
-                  data['area'],
-                  data['gender'], data['age'], data['address'], data['mobile_no'], data['soil_ph'], data['nitrogen'],
-                  data['phosphorus'], data['potassium'], data['electrical_conductivity'], data['temperature'],
-                  data['moisture'],
-                  data['humidity'], round(data['soil_health_score'], 2), data['crop_recommendations'],
-                  data['fertilizer_recommendation']))
-    conn.commit()
-    conn.close()
+    # Create the tables and bring an existing database up to the current schema version
+    migrate()
+
+def save_results(data, replace=False):
+    # Returns False, saving nothing, when the test ID is already stored and replace is not set
+    test_id = normalize_test_id(data['test_id'])
+    with transaction() as conn:
+        if not replace and stored_test_ids(conn, [test_id]):
+            return False
+        version = data.get('scoring_version') or record_scoring_version(conn)
+        row = (test_id, iso_date(data['collection_date']), data['latitude'], data['longitude'],
+               data['name'], data['area'],
+               data['gender'], data['age'], data['address'], data['mobile_no'], data['soil_ph'],
+               data['nitrogen'], data['phosphorus'], data['potassium'], data['electrical_conductivity'],
+               data['temperature'], data['moisture'],
+               data['humidity'], round(data['soil_health_score'], 2), data['crop_recommendations'],
+               data['fertilizer_recommendation'], version)
+        store_recommendation_texts(conn, [row])
+        conn.execute(insert_sql(replace), row)
+    return True
 
 def view_database(window):
+    # Tk and PIL are only loaded when the viewer opens, so saving and importing stay GUI-free
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+    from PIL import Image as PILImage, ImageTk
+
     # Create a new window for database browsing
     db_window = tk.Toplevel(window)
     db_window.title("Soil Health Database Viewer")
@@ -83,44 +66,61 @@ def view_database(window):
     filter_entry = ttk.Entry(options_frame)
     filter_entry.pack(side=tk.LEFT, padx=5)
 
-    # Create a button to apply sorting and filtering
-    def apply_options():
-        # Get the selected sorting column and filter text
-        sort_column = sort_var.get()
-        filter_text = filter_entry.get().strip()
+    # Columns behind the "Sort by" dropdown entries
+    sort_options = {
+        "ID": "id",
+        "Test ID": "test_id",
+        "Collection Date": "collection_date",
+        "Name": "name",
+        "Soil Health Score": "soil_health_score"
+    }
+
+    # The query currently shown in the Treeview; rows are fetched page by page as the user scrolls
+    paged_query = None
+    page_load_pending = False
+
+    def load_records(sort_column, descending=False):
+        nonlocal paged_query
+        paged_query = PagedQuery(sort_column, descending, filter_entry.get(), page_size=PAGE_SIZE)
 
         # Clear existing records in the Treeview
         tree.delete(*tree.get_children())
 
-        # Connect to the database and retrieve records
-        conn = sqlite3.connect('soil_health.db')
-        c = conn.cursor()
-
-        # Prepare the SQL query based on sorting and filtering options
-        query = "SELECT * FROM soil_tests"
-        if filter_text:
-            query += f" WHERE name LIKE '%{filter_text}%' OR test_id LIKE '%{filter_text}%'"
-        if sort_column == "ID":
-            query += " ORDER BY id"
-        elif sort_column == "Test ID":
-            query += " ORDER BY test_id"
-        elif sort_column == "Collection Date":
-            query += " ORDER BY collection_date"
-        elif sort_column == "Name":
-            query += " ORDER BY name"
-        elif sort_column == "Soil Health Score":
-            query += " ORDER BY soil_health_score"
-
-        c.execute(query)
-        records = c.fetchall()
-        conn.close()
-
-        # Insert the sorted and filtered records into the Treeview
-        for record in records:
+        # Show the first page plus a prefetch window, then the rest on demand
+        load_next_page(PAGE_SIZE * PREFETCH_PAGES)
+        update_status()
+
+    def load_next_page(limit=None):
+        nonlocal page_load_pending
+        page_load_pending = False
+        if paged_query is None or paged_query.exhausted:
+            return
+        for record in paged_query.next_page(limit):
             tree.insert("", "end", values=record)
+        update_status()
+
+    def update_status():
+        status_label.config(text=f"Showing {len(tree.get_children())} of {paged_query.count()} records")
+
+    def on_tree_scroll(first, last):
+        nonlocal page_load_pending
+        vertical_scrollbar.set(first, last)
+        # Fetch the next page once the view gets close to the last loaded row
+        if float(last) > 0.9 and paged_query is not None and not paged_query.exhausted and not page_load_pending:
+            page_load_pending = True
+            tree.after_idle(load_next_page)
+
+    # Create a button to apply sorting and filtering
+    def apply_options():
+        nonlocal current_sorting_column, current_sorting_order
+        current_sorting_column = sort_options.get(sort_var.get(), "id")
+        current_sorting_order = "ascending"
+        for col in tree["columns"]:
+            tree.heading(col, image="")  # Clear the sorting icon for all columns
+        load_records(current_sorting_column)
 
     # Load the 'apply.png' icon
-    apply_icon = PILImage.open('apply.png')
+    apply_icon = PILImage.open(asset_path('apply.png'))
     apply_icon = apply_icon.resize((20, 20), PILImage.LANCZOS)
     apply_photo = ImageTk.PhotoImage(apply_icon)
 
@@ -141,7 +141,7 @@ def view_database(window):
     horizontal_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
 
     # Create a Treeview widget to display the records
-    tree = ttk.Treeview(tree_frame, show="headings", yscrollcommand=vertical_scrollbar.set, xscrollcommand=horizontal_scrollbar.set, height=15)
+    tree = ttk.Treeview(tree_frame, show="headings", yscrollcommand=on_tree_scroll, xscrollcommand=horizontal_scrollbar.set, height=15)
     tree["columns"] = (
         "id", "test_id", "collection_date", "latitude", "longitude", "name", "area", "gender", "age", "address",
         "mobile_no", "soil_ph", "nitrogen", "phosphorus", "potassium", "electrical_conductivity", "temperature",
@@ -200,10 +200,10 @@ def view_database(window):
     horizontal_scrollbar.config(command=tree.xview)
 
     # Load the sorting order icons
-    ascending_icon = PILImage.open("ascending.png")
+    ascending_icon = PILImage.open(asset_path("ascending.png"))
     ascending_icon = ascending_icon.resize((16, 16), PILImage.LANCZOS)
     ascending_photo = ImageTk.PhotoImage(ascending_icon)
-    descending_icon = PILImage.open("descending.png")
+    descending_icon = PILImage.open(asset_path("descending.png"))
     descending_icon = descending_icon.resize((16, 16), PILImage.LANCZOS)
     descending_photo = ImageTk.PhotoImage(descending_icon)
 
@@ -225,22 +225,8 @@ def view_database(window):
             current_sorting_column = column
             current_sorting_order = "ascending"
 
-        # Clear existing records in the Treeview
-        tree.delete(*tree.get_children())
-
-        # Connect to the database and retrieve records
-        conn = sqlite3.connect('soil_health.db')
-        c = conn.cursor()
-
-        # Prepare the SQL query based on the sorting column and order
-        query = f"SELECT * FROM soil_tests ORDER BY {column} {'ASC' if current_sorting_order == 'ascending' else 'DESC'}"
-        c.execute(query)
-        records = c.fetchall()
-        conn.close()
-
-        # Insert the sorted records into the Treeview
-        for record in records:
-            tree.insert("", "end", values=record)
+        # Sorting (and the current filter) stay in SQL; only the first pages are fetched
+        load_records(column, descending=current_sorting_order == "descending")
 
         # Update the sorting order icon in the column header
         for col in tree["columns"]:
@@ -263,18 +249,16 @@ def view_database(window):
 
             confirm = messagebox.askyesno("Delete Record", "Are you sure you want to delete this record permanently?")
             if confirm:
-                conn = sqlite3.connect('soil_health.db')
-                c = conn.cursor()
-                c.execute("DELETE FROM soil_tests WHERE id=?", (record_id,))
-                conn.commit()
-                conn.close()
+                with transaction() as conn:
+                    conn.execute("DELETE FROM soil_tests WHERE id=?", (record_id,))
                 tree.delete(selected_item)
+                update_status()
                 messagebox.showinfo("Delete", "Record deleted successfully.")
         else:
             messagebox.showwarning("No Selection", "Please select a record to delete.")
 
     # Load the 'delete.png' icon
-    delete_icon = PILImage.open('delete.png')
+    delete_icon = PILImage.open(asset_path('delete.png'))
     delete_icon = delete_icon.resize((20, 20), PILImage.LANCZOS)
     delete_photo = ImageTk.PhotoImage(delete_icon)
 
@@ -292,33 +276,13 @@ def view_database(window):
             file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")],
                                                      initialfile=f"{test_id}_test.xlsx")
             if file_path:
-                workbook = openpyxl.Workbook()
-                sheet = workbook.active
-                header = ["ID", "Test ID", "Collection Date", "Latitude", "Longitude", "Name", "Area (ha)", "Gender",
-                          "Age",
-                          "Address", "Mobile No.", "Soil pH", "Nitrogen", "Phosphorus", "Potassium",
-                          "Electrical Conductivity", "Temperature", "Moisture", "Humidity", "Soil Health Score",
-                          "Crop Recommendations", "Fertilizer Recommendation"]
-                sheet.append(header)
-
-                # Format the values based on their respective data types
-                formatted_values = []
-                for i, value in enumerate(values):
-                    if i in [3, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 19]:
-                        formatted_values.append(round(float(value), 2) if value else None)
-                    elif i == 8:
-                        formatted_values.append(int(value) if value else None)
-                    else:
-                        formatted_values.append(value)
-
-                sheet.append(formatted_values)
-                workbook.save(file_path)
+                export_xlsx(file_path, where="id = ?", parameters=(values[0],))
                 messagebox.showinfo("Export", "Database Record exported to Excel successfully.")
         else:
             messagebox.showwarning("No Selection", "Please select a record to Export.")
 
     # Load the 'excel.png' icon
-    excel_icon = PILImage.open('excel.png')
+    excel_icon = PILImage.open(asset_path('excel.png'))
     excel_icon = excel_icon.resize((20, 20), PILImage.LANCZOS)
     excel_photo = ImageTk.PhotoImage(excel_icon)
 
@@ -327,13 +291,17 @@ def view_database(window):
     export_button.image = excel_photo  # Keep a reference to the image to prevent garbage collection
     export_button.pack(side=tk.TOP, padx=5)
 
+    # Show how many of the matching records have been loaded so far
+    status_label = ttk.Label(db_window, text="")
+    status_label.pack(side=tk.TOP, padx=5)
+
     # Retrieve and display the initial records
     apply_options()
 
     tree.pack(expand=True, fill=tk.BOTH)
 
     # Load the 'close.png' icon
-    close_icon = PILImage.open('close.png')
+    close_icon = PILImage.open(asset_path('close.png'))
     close_icon = close_icon.resize((20, 20), PILImage.LANCZOS)
     close_photo = ImageTk.PhotoImage(close_icon)
 
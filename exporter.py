@@ -0,0 +1,172 @@
+import csv
+import re
+from datetime import date
+from connection import get_connection
+
+# Spreadsheet headers for soil_test_details columns, as used by the GUI and database viewer exports
+column_titles = {
+    'id': 'ID',
+    'test_id': 'Test ID',
+    'collection_date': 'Collection Date',
+    'latitude': 'Latitude',
+    'longitude': 'Longitude',
+    'name': 'Name',
+    'area': 'Area (ha)',
+    'gender': 'Gender',
+    'age': 'Age',
+    'address': 'Address',
+    'mobile_no': 'Mobile No.',
+    'soil_ph': 'Soil pH',
+    'nitrogen': 'Nitrogen',
+    'phosphorus': 'Phosphorus',
+    'potassium': 'Potassium',
+    'electrical_conductivity': 'Electrical Conductivity',
+    'temperature': 'Temperature',
+    'moisture': 'Moisture',
+    'humidity': 'Humidity',
+    'soil_health_score': 'Soil Health Score',
+    'crop_recommendations': 'Crop Recommendations',
+    'fertilizer_recommendation': 'Fertilizer Recommendation',
+    'scoring_version': 'Scoring Version',
+}
+
+# Sheet splits: a period of the collection date, or the value of any soil_test_details column (e.g. address)
+date_splits = {'year': "substr(collection_date, 1, 4)", 'month': "substr(collection_date, 1, 7)"}
+
+FETCH_SIZE = 5000
+# Excel's row limit per sheet, header row included
+MAX_SHEET_ROWS = 1048576
+
+_sheet_name_invalid = re.compile(r'[\[\]:*?/\\]')
+_iso_date = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+
+
+def table_columns(conn, table='soil_test_details'):
+    # (column, affinity) pairs in table order, the declared type reduced to integer / real / text
+    columns = []
+    for _, column, declared, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        declared = declared.upper()
+        columns.append((column, 'integer' if 'INT' in declared else
+                        'real' if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')) else 'text'))
+    return columns
+
+
+def converter(column, affinity):
+    # Every value of a column goes through the same conversion, so a column never mixes types
+    if column == 'collection_date':
+        def to_date(value):
+            match = _iso_date.match(value) if isinstance(value, str) else None
+            if match:
+                try:
+                    return date(*(int(part) for part in match.groups()))
+                except ValueError:
+                    pass
+            return value
+        return to_date
+    if affinity == 'integer':
+        return lambda value: int(value) if isinstance(value, (int, float)) else value
+    if affinity == 'real':
+        return lambda value: float(value) if isinstance(value, (int, float)) else value
+    return lambda value: value if value is None or isinstance(value, str) else str(value)
+
+
+def split_expression(split_by, columns):
+    if split_by is None:
+        return None
+    if split_by in date_splits:
+        return date_splits[split_by]
+    if split_by in columns:
+        return split_by
+    raise ValueError(f"Cannot split by {split_by}: use year, month or a soil_test_details column")
+
+
+def query_rows(where=None, parameters=(), split_by=None, conn=None):
+    # Cursor over soil_test_details rows (soil tests with their recommendation texts), grouped by the
+    # split key (first column) when splitting
+    conn = conn or get_connection()
+    columns = [column for column, _ in table_columns(conn)]
+    key = split_expression(split_by, columns)
+    select = f"SELECT {key} AS split_key, * FROM soil_test_details" if key else "SELECT * FROM soil_test_details"
+    if where:
+        select += f" WHERE {where}"
+    select += f" ORDER BY {key}, id" if key else " ORDER BY id"
+    return conn.execute(select, parameters)
+
+
+def fetch_chunks(cursor):
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield rows
+
+
+def sheet_title(key, used):
+    # Excel sheet names: at most 31 characters, none of []:*?/\ and unique within the workbook
+    base = _sheet_name_invalid.sub('_', str(key) if key not in (None, '') else 'Unknown')[:31] or 'Sheet'
+    title, number = base, 2
+    while title.lower() in used:
+        suffix = f" ({number})"
+        title, number = base[:31 - len(suffix)] + suffix, number + 1
+    used.add(title.lower())
+    return title
+
+
+def export_xlsx(file_path, where=None, parameters=(), split_by=None):
+    # Stream matching rows into a write-only workbook, which keeps only the current row in memory.
+    # split_by writes one sheet per year, month or column value; sheets over Excel's row limit
+    # continue on a numbered sheet. Returns the number of rows exported.
+    import openpyxl
+    conn = get_connection()
+    columns = table_columns(conn)
+    convert = [converter(column, affinity) for column, affinity in columns]
+    header = [column_titles.get(column, column) for column, _ in columns]
+    cursor = query_rows(where, parameters, split_by, conn)
+    offset = 1 if split_by else 0
+
+    workbook = openpyxl.Workbook(write_only=True)
+    used_titles = set()
+    sheet, sheet_key, sheet_rows = None, object(), 0
+    exported = 0
+    for rows in fetch_chunks(cursor):
+        for row in rows:
+            key = row[0] if split_by else 'Soil Tests'
+            if sheet is None or key != sheet_key or sheet_rows >= MAX_SHEET_ROWS:
+                sheet = workbook.create_sheet(sheet_title(key, used_titles))
+                sheet.append(header)
+                sheet_key, sheet_rows = key, 1
+            sheet.append([function(value) for function, value in zip(convert, row[offset:])])
+            sheet_rows += 1
+            exported += 1
+    if sheet is None:
+        workbook.create_sheet('Soil Tests').append(header)
+    workbook.save(file_path)
+    return exported
+
+
+def write_csv(file, where=None, parameters=()):
+    # Stream matching rows as CSV into an open file, with the same headers as the Excel export,
+    # which the importer reads back
+    conn = get_connection()
+    columns = table_columns(conn)
+    cursor = query_rows(where, parameters, conn=conn)
+    writer = csv.writer(file)
+    writer.writerow([column_titles.get(column, column) for column, _ in columns])
+    exported = 0
+    for rows in fetch_chunks(cursor):
+        writer.writerows(rows)
+        exported += len(rows)
+    return exported
+
+
+def export_csv(file_path, where=None, parameters=()):
+    with open(file_path, 'w', newline='', encoding='utf-8') as file:
+        return write_csv(file, where, parameters)
+
+
+def export_file(file_path, where=None, parameters=(), split_by=None):
+    if file_path.lower().endswith('.csv'):
+        if split_by:
+            raise ValueError("Splitting into sheets needs an .xlsx file")
+        return export_csv(file_path, where, parameters)
+    return export_xlsx(file_path, where, parameters, split_by)
@@ -1,3 +1,4 @@
+import hashlib
 import numpy as np
 
 def triangular_fuzzy_number(a, b, c):
@@ -22,24 +23,14 @@ def predefined_fuzzy_comparison_matrix():
     return matrix
 
 def fuzzy_geometric_mean(matrix):
+    # Row-wise geometric mean of each (l, m, u) component
+    matrix = np.asarray(matrix, dtype=float)
     n = matrix.shape[0]
-    geometric_means = []
-    for i in range(n):
-        row = matrix[i]
-        geometric_mean = np.ones(3)
-        for j in range(n):
-            geometric_mean *= row[j]
-        geometric_mean **= 1/n
-        geometric_means.append(geometric_mean)
-    return np.array(geometric_means)
+    return np.prod(matrix, axis=1) ** (1 / n)
 
 def fuzzy_weights(geometric_means):
-    n = len(geometric_means)
-    fuzzy_weights = []
-    for i in range(n):
-        weight = geometric_means[i] / np.sum(geometric_means, axis=0)
-        fuzzy_weights.append(weight)
-    return np.array(fuzzy_weights)
+    geometric_means = np.asarray(geometric_means, dtype=float)
+    return geometric_means / np.sum(geometric_means, axis=0)
 
 '''def consistency_ratio(matrix):
     n = matrix.shape[0]
@@ -54,15 +45,85 @@ def fuzzy_weights(geometric_means):
     consistency_ratio = consistency_index / random_index[n]
     return consistency_ratio'''
 
-def fahp_weights():
-    matrix = predefined_fuzzy_comparison_matrix()
+# Normalized weight vectors keyed by comparison matrix fingerprint
+_weights_cache = {}
+_default_fingerprint = None
+# Renormalized weights for every pattern of present indicators, keyed the same way
+_masked_weights_cache = {}
+
+def matrix_fingerprint(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=float)
+    return hashlib.sha1(str(matrix.shape).encode() + matrix.tobytes()).hexdigest()
+
+def compute_fahp_weights(matrix):
     geometric_means = fuzzy_geometric_mean(matrix)
     weights = fuzzy_weights(geometric_means)
-    defuzzified_weights = [defuzzify(weight) for weight in weights]
-    normalized_weights = defuzzified_weights / np.sum(defuzzified_weights)
-    return normalized_weights
-
-def evaluate_soil_health(normalized_values):
-    weights = fahp_weights()
-    soil_health_score = sum(weight * value for weight, value in zip(weights, normalized_values))
-    return soil_health_score
\ No newline at end of file
+    defuzzified_weights = np.mean(weights, axis=1)
+    return defuzzified_weights / np.sum(defuzzified_weights)
+
+def fahp_weights(matrix=None):
+    global _default_fingerprint
+    if matrix is None:
+        if _default_fingerprint is None:
+            _default_fingerprint = matrix_fingerprint(predefined_fuzzy_comparison_matrix())
+        weights = _weights_cache.get(_default_fingerprint)
+        if weights is not None:
+            return weights
+        matrix = predefined_fuzzy_comparison_matrix()
+    key = matrix_fingerprint(matrix)
+    weights = _weights_cache.get(key)
+    if weights is None:
+        weights = compute_fahp_weights(matrix)
+        weights.flags.writeable = False  # Shared by every caller, so keep it read-only
+        _weights_cache[key] = weights
+    return weights
+
+def masked_weights_table(weights=None):
+    # Row p holds the weights renormalized over the indicators present in pattern p, where bit i of p
+    # is set when indicator i was measured; the all-missing pattern is a row of NaN
+    if weights is None:
+        weights = fahp_weights()
+    key = matrix_fingerprint(weights)
+    table = _masked_weights_cache.get(key)
+    if table is None:
+        n = len(weights)
+        present = (np.arange(2 ** n)[:, None] >> np.arange(n)) & 1
+        kept = present * np.asarray(weights, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table = kept / kept.sum(axis=1, keepdims=True)
+        table.flags.writeable = False
+        _masked_weights_cache[key] = table
+    return table
+
+def mask_patterns(present_mask):
+    # Pattern number of each row of a boolean (N, n) present mask, or of a single (n,) mask
+    present_mask = np.asarray(present_mask, dtype=bool)
+    return present_mask @ (1 << np.arange(present_mask.shape[-1]))
+
+def masked_weights(present_mask, weights=None):
+    return masked_weights_table(weights)[mask_patterns(present_mask)]
+
+def invalidate_weights_cache(matrix=None):
+    # Drop the cached weights for one matrix, or for every matrix when none is given
+    global _default_fingerprint
+    if matrix is None:
+        _weights_cache.clear()
+        _default_fingerprint = None
+    else:
+        _weights_cache.pop(matrix_fingerprint(matrix), None)
+    _masked_weights_cache.clear()
+
+def evaluate_soil_health(normalized_values, weights=None):
+    if weights is None:
+        weights = fahp_weights()
+    return float(np.dot(weights, np.asarray(normalized_values, dtype=float)))
+
+def evaluate_soil_health_masked(normalized_values, present_mask, weights=None):
+    # Scores for an (N, n) array, or one (n,) sample, using only the indicators marked present: the
+    # FAHP weights are renormalized over them, so a skipped indicator neither counts as zero nor
+    # shifts the other weights. Values under missing indicators are ignored (NaN is fine there);
+    # rows with nothing present score NaN.
+    normalized_values = np.asarray(normalized_values, dtype=float)
+    present_mask = np.asarray(present_mask, dtype=bool)
+    row_weights = masked_weights(present_mask, weights)
+    return np.einsum('...i,...i->...', np.where(present_mask, normalized_values, 0.0), row_weights)
@@ -1,25 +1,18 @@
-import csv
+from recommendations import fertilizer_index
+
+NO_FERTILIZER_RECOMMENDATION = ("No specific fertilizer recommendation available for the given soil health score. "
+                                "Please consult with local agriculture experts for personalized recommendations.")
 
 def load_fertilizer_recommendations():
-    fertilizer_recommendations = []
-    try:
-        with open('fertilizer_recommendations.csv', 'r') as file:
-            csv_reader = csv.reader(file)
-            next(csv_reader)  # Skip the header row
-            for row in csv_reader:
-                min_score = float(row[0])
-                max_score = float(row[1])
-                recommendation = row[2]
-                fertilizer_recommendations.append((min_score, max_score, recommendation))
-    except FileNotFoundError:
-        print("Error: fertilizer_recommendations.csv file not found.")
-    except csv.Error as e:
-        print(f"Error reading fertilizer_recommendations.csv: {e}")
-    return fertilizer_recommendations
+    fertilizer_index.refresh()
+    return fertilizer_index.recommendations
 
 def get_fertilizer_recommendation(soil_health_score):
-    fertilizer_recommendations = load_fertilizer_recommendations()
-    for min_score, max_score, recommendation in fertilizer_recommendations:
-        if min_score <= soil_health_score < max_score:
-            return recommendation
-    return "No specific fertilizer recommendation available for the given soil health score. Please consult with local agriculture experts for personalized recommendations."
\ No newline at end of file
+    recommendations = fertilizer_index.lookup_all(soil_health_score)
+    if recommendations:
+        return " ".join(recommendations)
+    return NO_FERTILIZER_RECOMMENDATION
+
+def get_fertilizer_recommendations_batch(soil_health_scores):
+    return [" ".join(recommendations) if recommendations else NO_FERTILIZER_RECOMMENDATION
+            for recommendations in fertilizer_index.lookup_batch(soil_health_scores)]
\ No newline at end of file
@@ -1,58 +1,148 @@
+import argparse
 import csv
+import json
+import sys
+import time
+import numpy as np
 
-# Define the ranges for each soil health indicator
-soil_ph_ranges = ['<5.5', '5.5-6.5', '6.5-7.5', '7.5-8.5', '>8.5']
-nitrogen_ranges = ['<100', '100-150', '150-200', '200-250', '>250']
-phosphorus_ranges = ['<10', '10-20', '20-30', '30-40', '>40']
-potassium_ranges = ['<50', '50-100', '100-150', '150-200', '>200']
-ec_ranges = ['<0.5', '0.5-1.0', '1.0-1.5', '1.5-2.0', '>2.0']
-temperature_ranges = ['<20', '20-25', '25-30', '30-35', '>35']
-moisture_ranges = ['<30', '30-50', '50-70', '70-90', '>90']
-humidity_ranges = ['<30', '30-50', '50-70', '70-90', '>90']
-
-# Generate the fuzzy comparison matrix dataset
-dataset = []
-for ph in soil_ph_ranges:
-    for n in nitrogen_ranges:
-        for p in phosphorus_ranges:
-            for k in potassium_ranges:
-                for ec in ec_ranges:
-                    for temp in temperature_ranges:
-                        for moist in moisture_ranges:
-                            for humid in humidity_ranges:
-                                fuzzy_value = 0.5  # Default fuzzy value (Medium)
-                                if (
-                                    ph in ['<5.5', '>8.5'] or
-                                    n == '<100' or
-                                    p == '<10' or
-                                    k == '<50' or
-                                    ec == '<0.5' or
-                                    temp == '<20' or
-                                    moist == '<30' or
-                                    humid == '<30'
-                                ):
-                                    fuzzy_value = 0.2  # Low
-                                elif (
-                                    ph in ['6.5-7.5'] and
-                                    n in ['150-200'] and
-                                    p in ['20-30'] and
-                                    k in ['100-150'] and
-                                    ec in ['1.0-1.5'] and
-                                    temp in ['25-30'] and
-                                    moist in ['50-70'] and
-                                    humid in ['50-70']
-                                ):
-                                    fuzzy_value = 0.8  # High
-                                row = [ph, n, p, k, ec, temp, moist, humid, fuzzy_value]
-                                dataset.append(row)
-
-# Save the dataset to a CSV file
-with open('fuzzy_comparison_matrix.csv', 'w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(['Soil pH', 'Nitrogen (mg/kg)', 'Phosphorus (mg/kg)', 'Potassium (mg/kg)',
-                     'Electrical Conductivity (dS/m)', 'Temperature (°C)', 'Moisture (%)', 'Humidity (%)',
-                     'Fuzzy Value'])
-    writer.writerows(dataset)
-
-print("Fuzzy comparison matrix dataset generated successfully!")
-print(f"Total rows: {len(dataset)}")
\ No newline at end of file
+# Fuzzy comparison dataset: one row per combination of indicator ranges, rated Low / Medium / High.
+#   python fuzzy_comparison_matrix.py [fuzzy_comparison_matrix.csv | .npy] [--config rules.json]
+# Combinations are enumerated from their row numbers in chunks, so memory use stays flat however
+# many indicators and ranges the rules table has.
+
+# Define the ranges for each soil health indicator, with the ranges that rate a combination
+# Low (any indicator in one of them) and High (every indicator in one of them)
+default_indicators = [
+    {'name': 'Soil pH', 'ranges': ['<5.5', '5.5-6.5', '6.5-7.5', '7.5-8.5', '>8.5'],
+     'low': ['<5.5', '>8.5'], 'high': ['6.5-7.5']},
+    {'name': 'Nitrogen (mg/kg)', 'ranges': ['<100', '100-150', '150-200', '200-250', '>250'],
+     'low': ['<100'], 'high': ['150-200']},
+    {'name': 'Phosphorus (mg/kg)', 'ranges': ['<10', '10-20', '20-30', '30-40', '>40'],
+     'low': ['<10'], 'high': ['20-30']},
+    {'name': 'Potassium (mg/kg)', 'ranges': ['<50', '50-100', '100-150', '150-200', '>200'],
+     'low': ['<50'], 'high': ['100-150']},
+    {'name': 'Electrical Conductivity (dS/m)', 'ranges': ['<0.5', '0.5-1.0', '1.0-1.5', '1.5-2.0', '>2.0'],
+     'low': ['<0.5'], 'high': ['1.0-1.5']},
+    {'name': 'Temperature (°C)', 'ranges': ['<20', '20-25', '25-30', '30-35', '>35'],
+     'low': ['<20'], 'high': ['25-30']},
+    {'name': 'Moisture (%)', 'ranges': ['<30', '30-50', '50-70', '70-90', '>90'],
+     'low': ['<30'], 'high': ['50-70']},
+    {'name': 'Humidity (%)', 'ranges': ['<30', '30-50', '50-70', '70-90', '>90'],
+     'low': ['<30'], 'high': ['50-70']},
+]
+
+# Fuzzy value of each rating, indexed by rating code
+LOW, MEDIUM, HIGH = 0, 1, 2
+default_values = {'low': 0.2, 'medium': 0.5, 'high': 0.8}
+
+CHUNK_ROWS = 65536
+
+
+def load_config(path):
+    # JSON file shaped like {"indicators": [...as default_indicators...], "values": {"low": .., ...}}
+    with open(path, encoding='utf-8') as file:
+        config = json.load(file)
+    return config.get('indicators', default_indicators), dict(default_values, **config.get('values', {}))
+
+
+def range_masks(indicators):
+    # Per indicator, boolean lookups over its range numbers: in a Low range, in a High range
+    masks = []
+    for indicator in indicators:
+        ranges = indicator['ranges']
+        low, high = np.zeros(len(ranges), dtype=bool), np.zeros(len(ranges), dtype=bool)
+        for mask, rule in ((low, 'low'), (high, 'high')):
+            for label in indicator.get(rule, []):
+                if label not in ranges:
+                    raise ValueError(f"{indicator['name']}: {rule} range {label} is not one of {ranges}")
+                mask[ranges.index(label)] = True
+        masks.append((low, high))
+    return masks
+
+
+def classify(bins, masks):
+    # Rating code of every combination in a chunk, from its per-indicator range numbers
+    low = np.zeros(len(bins[0]), dtype=bool)
+    high = np.ones(len(bins[0]), dtype=bool)
+    for column, (low_ranges, high_ranges) in zip(bins, masks):
+        low |= low_ranges[column]
+        high &= high_ranges[column]
+    ratings = np.full(len(low), MEDIUM, dtype=np.uint8)
+    ratings[high] = HIGH
+    ratings[low] = LOW
+    return ratings
+
+
+def generate_chunks(indicators, chunk_rows=CHUNK_ROWS):
+    # Yield (range numbers per indicator, rating codes) for consecutive blocks of combinations,
+    # in the same order as nested loops over the indicators (last indicator varying fastest)
+    shape = tuple(len(indicator['ranges']) for indicator in indicators)
+    masks = range_masks(indicators)
+    total = int(np.prod(shape, dtype=np.int64))
+    for start in range(0, total, chunk_rows):
+        bins = np.unravel_index(np.arange(start, min(start + chunk_rows, total), dtype=np.int64), shape)
+        yield bins, classify(bins, masks)
+
+
+def rating_values(values):
+    return [values['low'], values['medium'], values['high']]
+
+
+def write_csv(path, indicators, values, chunk_rows=CHUNK_ROWS):
+    labels = [np.array(indicator['ranges'], dtype=object) for indicator in indicators]
+    fuzzy_values = np.array(rating_values(values), dtype=object)
+    rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow([indicator['name'] for indicator in indicators] + ['Fuzzy Value'])
+        for bins, ratings in generate_chunks(indicators, chunk_rows):
+            columns = [label[column] for label, column in zip(labels, bins)]
+            writer.writerows(zip(*columns, fuzzy_values[ratings]))
+            rows += len(ratings)
+    return rows
+
+
+def write_npy(path, indicators, values, chunk_rows=CHUNK_ROWS):
+    # Structured array of range numbers (indexes into each indicator's ranges) plus the fuzzy value,
+    # written through a memory map; np.load(path, mmap_mode='r') reads it back without loading it all
+    from numpy.lib.format import open_memmap
+    index_type = np.uint8 if max(len(indicator['ranges']) for indicator in indicators) <= 256 else np.uint16
+    dtype = [(indicator['name'], index_type) for indicator in indicators] + [('Fuzzy Value', np.float32)]
+    total = int(np.prod([len(indicator['ranges']) for indicator in indicators], dtype=np.int64))
+    output = open_memmap(path, mode='w+', dtype=dtype, shape=(total,))
+    fuzzy_values = np.array(rating_values(values), dtype=np.float32)
+    start = 0
+    for bins, ratings in generate_chunks(indicators, chunk_rows):
+        block = output[start:start + len(ratings)]
+        for indicator, column in zip(indicators, bins):
+            block[indicator['name']] = column
+        block['Fuzzy Value'] = fuzzy_values[ratings]
+        start += len(ratings)
+    output.flush()
+    del output
+    return total
+
+
+def generate(path='fuzzy_comparison_matrix.csv', indicators=None, values=None, chunk_rows=CHUNK_ROWS):
+    indicators = indicators or default_indicators
+    values = values or default_values
+    if path.lower().endswith('.npy'):
+        return write_npy(path, indicators, values, chunk_rows)
+    return write_csv(path, indicators, values, chunk_rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the fuzzy comparison matrix dataset")
+    parser.add_argument('output', nargs='?', default='fuzzy_comparison_matrix.csv', help="CSV or .npy file")
+    parser.add_argument('--config', help="JSON file with indicator ranges, rules and fuzzy values")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    indicators, values = load_config(args.config) if args.config else (default_indicators, default_values)
+    start_time = time.perf_counter()
+    try:
+        rows = generate(args.output, indicators, values, args.chunk_rows)
+    except ValueError as e:
+        sys.exit(str(e))
+    print("Fuzzy comparison matrix dataset generated successfully!")
+    print(f"Total rows: {rows} ({time.perf_counter() - start_time:.2f}s)")
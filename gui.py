@@ -2,30 +2,17 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import webbrowser
 from ttkthemes import ThemedTk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
 import re
-from indicators import soil_indicators
-from fahp import evaluate_soil_health
-from assessment import assess_soil_health, generate_rating, generate_crop_recommendations
+from indicators import indicator_columns
+from assessment import assess_sample
 from PIL import Image as PILImage, ImageTk
-from tkcalendar import Calendar
 from database import view_database, save_results
-from report import export_to_excel, generate_pdf_report
-import threading
-import time
+from tasks import TaskRunner
+from assets import asset_path
 import os
 import subprocess
 import io
-from PIL import Image, ImageTk
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
-import win32api
-import win32print
-import win32ui
-import win32con
-import openpyxl
+from PIL import ImageTk
 
 
 def create_gui():
@@ -36,7 +23,7 @@ def create_gui():
     window.title("Soil Health Diagnostic System (v0.2.404)")
     window.resizable(False, False)  # Make the window non-resizable
 
-    icon = PILImage.open("main.ico")
+    icon = PILImage.open(asset_path("main.ico"))
     window.iconphoto(True, ImageTk.PhotoImage(icon))
 
     window.grid_columnconfigure(0, weight=1)
@@ -44,11 +31,11 @@ def create_gui():
     window.grid_columnconfigure(2, weight=0)  # Set the weight of column 2 to 0
     window.grid_rowconfigure(0, weight=1)
 
-    label_image = PILImage.open('shi.png')
+    label_image = PILImage.open(asset_path('shi.png'))
     label_image = label_image.resize((30, 30), PILImage.Resampling.LANCZOS)
     label_icon = ImageTk.PhotoImage(label_image)
 
-    farmer_image = PILImage.open('farmer.png')
+    farmer_image = PILImage.open(asset_path('farmer.png'))
     farmer_image = farmer_image.resize((30, 30), PILImage.Resampling.LANCZOS)
     farmer_icon = ImageTk.PhotoImage(farmer_image)
 
@@ -245,7 +232,13 @@ def create_gui():
     assessing_label = ttk.Label(window, text="", font=("Helvetica", 12))
     assessing_label.grid(row=1, column=0, columnspan=2, padx=10, pady=5)
 
-    def show_loading_window():
+    # AssessmentResult of the sample currently on screen, reused by save, export and report
+    current_assessment = None
+    # Assessments run off the Tk thread; a new one cancels any still in flight
+    task_runner = TaskRunner(window)
+    assessment_task = None
+
+    def show_loading_window(on_cancel):
         loading_window = tk.Toplevel(window)
         loading_window.overrideredirect(True)  # Remove window decorations
         loading_window.resizable(False, False)
@@ -257,9 +250,13 @@ def create_gui():
                                   font=("Helvetica", 10, "bold", "italic"))
         loading_label.pack(pady=10)
 
-        progress_bar = ttk.Progressbar(loading_window, length=200, mode='indeterminate')
+        # Progress follows the assessment steps as they complete
+        progress_bar = ttk.Progressbar(loading_window, length=200, mode='determinate', maximum=1.0)
         progress_bar.pack(pady=10)
 
+        cancel_button = ttk.Button(loading_window, text="Cancel", command=on_cancel)
+        cancel_button.pack(pady=(0, 10))
+
         # Center the loading window on the program window
         loading_window.update_idletasks()
         width = loading_window.winfo_width()
@@ -268,9 +265,7 @@ def create_gui():
         y = window.winfo_y() + (window.winfo_height() // 2) - (height // 2)
         loading_window.geometry(f"{width}x{height}+{x}+{y}")
 
-        progress_bar.start()
-
-        return loading_window, progress_bar
+        return loading_window, progress_bar, loading_label
 
     def assess_button_clicked():
         indicator_ranges = {
@@ -305,77 +300,76 @@ def create_gui():
             mobile_entry.selection_range(0, tk.END)  # Highlight the text in the entry field
             return
 
-        loading_window, progress_bar = show_loading_window()
+        # Entries are read here on the Tk thread; the worker only gets plain values
+        indicator_values = read_indicator_values()
+
+        nonlocal assessment_task
+        if assessment_task is not None:
+            assessment_task.cancel()
+
+        def cancel_assessment():
+            assessment_task.cancel()
+            loading_window.destroy()
+            assess_button.config(state=tk.NORMAL)
+
+        def show_progress(fraction, message):
+            progress_bar['value'] = fraction
+            loading_label.config(text=message)
+
+        def assessment_failed(error):
+            loading_window.destroy()
+            assess_button.config(state=tk.NORMAL)
+            tk.messagebox.showerror("Assessment Failed", str(error))
+
+        loading_window, progress_bar, loading_label = show_loading_window(cancel_assessment)
 
         # Disable the Assess Soil Health button
         assess_button.config(state=tk.DISABLED)
 
-        # Start a separate thread to perform the assessment
-        threading.Thread(target=perform_assessment, args=(loading_window, progress_bar)).start()
-
-    def perform_assessment(loading_window, progress_bar):
-        # Simulating assessment calculation time
-        time.sleep(2)  # Adjust the time as needed
-
-        # Perform the assessment calculations
-        indicator_values = [
-            float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-            float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-            float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-            float(potassium_entry.get()) if potassium_entry.get() else None,
-            float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-            float(temperature_entry.get()) if temperature_entry.get() else None,
-            float(moisture_entry.get()) if moisture_entry.get() else None,
-            float(humidity_entry.get()) if humidity_entry.get() else None
-        ]
-
-        latitude = float(latitude_entry.get().strip())
-        longitude = float(longitude_entry.get().strip())
-
-        normalized_values = []
-        for indicator, value in zip(soil_indicators, indicator_values):
-            if value is None:
-                normalized_values.append(None)
-            else:
-                normalized_value = (value - indicator.min_value) / (indicator.max_value - indicator.min_value)
-                normalized_values.append(normalized_value)
+        # Score and draw the chart on a worker thread
+        assessment_task = task_runner.submit(
+            lambda task: perform_assessment(task, indicator_values),
+            on_done=lambda result: update_results(loading_window, *result),
+            on_error=assessment_failed,
+            on_progress=show_progress)
 
-        soil_health_score = evaluate_soil_health([value for value in normalized_values if value is not None])
-        recommendations = generate_crop_recommendations(soil_health_score)
+    def read_indicator_values():
+        return [float(entry.get()) if entry.get() else None
+                for entry in (soil_ph_entry, nitrogen_entry, phosphorus_entry, potassium_entry,
+                              electrical_conductivity_entry, temperature_entry, moisture_entry, humidity_entry)]
 
+    def sample_data(assessment):
+        # Farmer and sample fields as entered, with the results of the sample's one assessment
         data = {
             'test_id': test_id_entry.get(),
             'collection_date': sample_date_entry.get(),
-            'latitude': latitude,
-            'longitude': longitude,
+            'latitude': float(latitude_entry.get().strip()) if latitude_entry.get().strip() else None,
+            'longitude': float(longitude_entry.get().strip()) if longitude_entry.get().strip() else None,
             'name': name_entry.get(),
             'area': float(area_entry.get()) if area_entry.get() else None,
             'gender': gender_var.get(),
             'age': int(age_entry.get()) if age_entry.get() else None,
             'address': address_entry.get(),
-            'mobile_no': mobile_entry.get(),
-            'soil_ph': indicator_values[0],
-            'nitrogen': indicator_values[1],
-            'phosphorus': indicator_values[2],
-            'potassium': indicator_values[3],
-            'electrical_conductivity': indicator_values[4],
-            'temperature': indicator_values[5],
-            'moisture': indicator_values[6],
-            'humidity': indicator_values[7],
-            'soil_health_score': soil_health_score,
-            'recommendations': recommendations
+            'mobile_no': mobile_entry.get()
         }
-
-        result_frame = visualize_results(indicator_values, soil_health_score, visualization_frame)
-
-        # Update the UI with the results
-        window.after(0, update_results, loading_window, progress_bar, indicator_values, soil_health_score,
-                     recommendations, result_frame)
-
-    def update_results(loading_window, progress_bar, indicator_values, soil_health_score, recommendations,
-                       result_frame):
-        # Stop the progress bar animation
-        progress_bar.stop()
+        data.update(zip(indicator_columns, assessment.indicator_values))
+        data.update(assessment.as_dict())
+        return data
+
+    def perform_assessment(task, indicator_values):
+        # Runs on a worker thread, so no widgets are touched here
+        task.report_progress(0.1, "Assessing Soil Health...")
+        assessment = assess_sample(indicator_values)
+        task.report_progress(0.6, "Drawing Radar Chart...")
+        from radar_chart import render_radar_chart
+        chart = render_radar_chart(assessment.indicator_values, style='gui', preview=True)
+        task.report_progress(1.0, "Done")
+        return assessment, chart
+
+    def update_results(loading_window, assessment, chart):
+        nonlocal current_assessment, assessment_task
+        current_assessment = assessment
+        assessment_task = None
 
         # Close the loading window
         loading_window.destroy()
@@ -387,7 +381,12 @@ def create_gui():
         # Disable and grey out the input fields in the Farmer Information and Soil Health Indicators frame
         disable_input_fields()
 
-        result_frame = visualize_results(indicator_values, soil_health_score, visualization_frame)
+        result_frame = visualize_results(chart, visualization_frame)
+        if assessment.missing_indicators:
+            missing_label = ttk.Label(result_frame, font=("Helvetica", 9, "italic"), wraplength=400,
+                                      text="Not measured (score uses the other indicators): " +
+                                           ", ".join(assessment.missing_indicators))
+            missing_label.pack(side=tk.TOP, padx=10)
 
         save_export_button.config(state=tk.NORMAL)
         report_button.config(state=tk.DISABLED)
@@ -409,15 +408,17 @@ def create_gui():
         window.geometry(f"+{x}+{y}")
         '''
         # Update the recommendations label with the generated recommendations in the main GUI window
-        recommendations_text = f"\nCrop Recommendations:\n{recommendations}"
+        recommendations_text = f"\nCrop Recommendations:\n{assessment.crop_recommendations}"
         recommendations_label = ttk.Label(result_frame, text=recommendations_text, font=("Helvetica", 10, "bold"),
                                           justify=tk.CENTER, wraplength=400)
         recommendations_label.pack(side=tk.BOTTOM, padx=10)
-        recommendations_label.config(text=f"\nCrop Recommendations:\n{recommendations}")
+        recommendations_label.config(text=f"\nCrop Recommendations:\n{assessment.crop_recommendations}")
         '''
 
     # Function to clear all the input fields
     def clear_button_clicked():
+        nonlocal current_assessment
+        current_assessment = None
         enable_input_fields()
         clear_button.config(state=tk.NORMAL)
         assess_button.config(state=tk.DISABLED)
@@ -455,81 +456,12 @@ def create_gui():
         humidity_entry.delete(0, tk.END)
 
     def generate_pdf_report_clicked():
-        data = {
-            'test_id': test_id_entry.get(),
-            'collection_date': sample_date_entry.get(),
-            'latitude': float(latitude_entry.get().strip()),
-            'longitude': float(longitude_entry.get().strip()),
-            'name': name_entry.get(),
-            'area': float(area_entry.get()) if area_entry.get() else None,
-            'gender': gender_var.get(),
-            'age': int(age_entry.get()) if age_entry.get() else None,
-            'address': address_entry.get(),
-            'mobile_no': mobile_entry.get(),
-            'soil_ph': float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-            'nitrogen': float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-            'phosphorus': float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-            'potassium': float(potassium_entry.get()) if potassium_entry.get() else None,
-            'electrical_conductivity': float(
-                electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-            'temperature': float(temperature_entry.get()) if temperature_entry.get() else None,
-            'moisture': float(moisture_entry.get()) if moisture_entry.get() else None,
-            'humidity': float(humidity_entry.get()) if humidity_entry.get() else None,
-            'soil_health_score': assess_soil_health([
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ])['soil_health_score'],
-            'rating': assess_soil_health([
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ])['rating'],
-                'crop_recommendations': assess_soil_health([
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ])['crop_recommendations'],
-            'fertilizer_recommendation': assess_soil_health([
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ])['fertilizer_recommendation']
-        }
+        from report import generate_pdf_report
+        data = sample_data(current_assessment)
         file_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Files", "*.pdf")],
                                                  initialfile=f"{data['test_id']}_report.pdf")
         if file_path:
-            indicator_values = [
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ]
-            generate_pdf_report(data, file_path, indicator_values)
+            generate_pdf_report(data, file_path, current_assessment.indicator_values)
             tk.messagebox.showinfo("Report Confirmation", "Soil Health Report Generated Successfully")
 
             # Disable the 'Clear', 'Save & Export', and 'Assess Soil Health' buttons
@@ -547,65 +479,22 @@ def create_gui():
             new_test_button.config(state=tk.NORMAL)
 
     def save_export_button_clicked():
-        data = {
-            'test_id': test_id_entry.get(),
-            'collection_date': sample_date_entry.get(),
-            'latitude': float(latitude_entry.get().strip()) if latitude_entry.get().strip() else None,
-            'longitude': float(longitude_entry.get().strip()) if longitude_entry.get().strip() else None,
-            'name': name_entry.get(),
-            'area': float(area_entry.get()) if area_entry.get() else None,
-            'gender': gender_var.get(),
-            'age': int(age_entry.get()) if age_entry.get() else None,
-            'address': address_entry.get(),
-            'mobile_no': mobile_entry.get(),
-            'soil_ph': float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-            'nitrogen': float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-            'phosphorus': float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-            'potassium': float(potassium_entry.get()) if potassium_entry.get() else None,
-            'electrical_conductivity': float(
-                electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-            'temperature': float(temperature_entry.get()) if temperature_entry.get() else None,
-            'moisture': float(moisture_entry.get()) if moisture_entry.get() else None,
-            'humidity': float(humidity_entry.get()) if humidity_entry.get() else None,
-            'soil_health_score': assess_soil_health([
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ])['soil_health_score'],
-            'crop_recommendations': assess_soil_health([
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ])['crop_recommendations'],
-            'fertilizer_recommendation': assess_soil_health([
-                float(soil_ph_entry.get()) if soil_ph_entry.get() else None,
-                float(nitrogen_entry.get()) if nitrogen_entry.get() else None,
-                float(phosphorus_entry.get()) if phosphorus_entry.get() else None,
-                float(potassium_entry.get()) if potassium_entry.get() else None,
-                float(electrical_conductivity_entry.get()) if electrical_conductivity_entry.get() else None,
-                float(temperature_entry.get()) if temperature_entry.get() else None,
-                float(moisture_entry.get()) if moisture_entry.get() else None,
-                float(humidity_entry.get()) if humidity_entry.get() else None
-            ])['fertilizer_recommendation']
-        }
-
-
-        # Save the data to the database
-        save_results(data)
+        data = sample_data(current_assessment)
+        # The database and the Excel export have no rating column
+        del data['rating']
+
+        # Save the data to the database, asking before replacing a stored test with the same Test ID
+        if not save_results(data):
+            if not messagebox.askyesno("Test ID Already Saved",
+                                       f"A test with Test ID '{data['test_id']}' is already in the database.\n"
+                                       "Replace the stored test with these results?"):
+                return
+            save_results(data, replace=True)
 
         file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")],
                                                  initialfile=f"{data['test_id']}_test.xlsx")
         if file_path:
+            import openpyxl
             workbook = openpyxl.Workbook()
             sheet = workbook.active
             header = ["Test ID", "Collection Date", "Latitude", "Longitude", "Name", "Area (ha)", "Gender", "Age",
@@ -653,11 +542,12 @@ def create_gui():
         visualization_frame.grid_remove()
 
     def enable_assess_button():
+        # Indicators the field kit did not measure may be left blank; at least one is needed
         if all(entry.get() for entry in [test_id_entry, sample_date_entry, latitude_entry, longitude_entry, name_entry,
-                                         area_entry, gender_var, age_entry, address_entry, mobile_entry, soil_ph_entry,
-                                         nitrogen_entry, phosphorus_entry, potassium_entry,
-                                         electrical_conductivity_entry, temperature_entry, moisture_entry,
-                                         humidity_entry]):
+                                         area_entry, gender_var, age_entry, address_entry, mobile_entry]) and \
+                any(entry.get() for entry in [soil_ph_entry, nitrogen_entry, phosphorus_entry, potassium_entry,
+                                              electrical_conductivity_entry, temperature_entry, moisture_entry,
+                                              humidity_entry]):
             assess_button.config(state=tk.NORMAL)
         else:
             assess_button.config(state=tk.DISABLED)
@@ -769,27 +659,27 @@ def create_gui():
     button_width = 20
     button_height = 20
 
-    new_image = PILImage.open('new.png')
+    new_image = PILImage.open(asset_path('new.png'))
     new_image = new_image.resize((button_width, button_height), PILImage.Resampling.LANCZOS)
     new_icon = ImageTk.PhotoImage(new_image)
 
-    clear_image = PILImage.open('clear.png')
+    clear_image = PILImage.open(asset_path('clear.png'))
     clear_image = clear_image.resize((button_width, button_height), PILImage.Resampling.LANCZOS)
     clear_icon = ImageTk.PhotoImage(clear_image)
 
-    assess_image = PILImage.open('assess.png')
+    assess_image = PILImage.open(asset_path('assess.png'))
     assess_image = assess_image.resize((button_width, button_height), PILImage.Resampling.LANCZOS)
     assess_icon = ImageTk.PhotoImage(assess_image)
 
-    export_image = PILImage.open('excel.png')
+    export_image = PILImage.open(asset_path('excel.png'))
     export_image = export_image.resize((button_width, button_height), PILImage.Resampling.LANCZOS)
     export_icon = ImageTk.PhotoImage(export_image)
 
-    report_image = PILImage.open('report.png')
+    report_image = PILImage.open(asset_path('report.png'))
     report_image = report_image.resize((button_width, button_height), PILImage.Resampling.LANCZOS)
     report_icon = ImageTk.PhotoImage(report_image)
 
-    database_icon = PILImage.open('database.png')
+    database_icon = PILImage.open(asset_path('database.png'))
     database_icon = database_icon.resize((20, 20), PILImage.LANCZOS)
     database_photo = ImageTk.PhotoImage(database_icon)
 
@@ -862,7 +752,7 @@ def create_gui():
     credentials_frame = ttk.Frame(bottom_frame)
     credentials_frame.grid(row=1, column=0, padx=5, pady=(0, 5))
 
-    main_logo = PILImage.open("main.png")
+    main_logo = PILImage.open(asset_path("main.png"))
     main_logo = main_logo.resize((50, 50), PILImage.LANCZOS)
     main_photo = ImageTk.PhotoImage(main_logo)
     main_label = ttk.Label(credentials_frame, image=main_photo)
@@ -874,7 +764,7 @@ def create_gui():
                                   anchor="center")
     credentials_label.pack(side=tk.LEFT, padx=(0, 0))
 
-    mzu_logo = PILImage.open("mzu.png")
+    mzu_logo = PILImage.open(asset_path("mzu.png"))
     mzu_logo = mzu_logo.resize((60, 60), PILImage.LANCZOS)
     mzu_photo = ImageTk.PhotoImage(mzu_logo)
     mzu_label = ttk.Label(credentials_frame, image=mzu_photo)
@@ -890,7 +780,7 @@ def create_gui():
     department_label = ttk.Label(bottom_frame, text=department_text, font=("Helvetica", 8, "bold"), justify="center")
     department_label.grid(row=3, column=0, padx=5, pady=(5, 5))
 
-    def visualize_results(indicator_values, soil_health_score, visualization_frame):
+    def visualize_results(chart, visualization_frame):
         for widget in visualization_frame.winfo_children():
             widget.destroy()
         visualization_content_frame = ttk.Frame(visualization_frame)
@@ -899,124 +789,27 @@ def create_gui():
         radar_chart_frame = ttk.Frame(visualization_content_frame)
         radar_chart_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-        fig, ax = plt.subplots(figsize=(4.5, 4.5), subplot_kw={'projection': 'polar'})
-        angles = np.linspace(0, 2 * np.pi, len(soil_indicators), endpoint=False)
-        angles = np.concatenate((angles, [angles[0]]))
-        indicator_values = np.concatenate((indicator_values, [indicator_values[0]]))
-
-        ax.plot(angles, indicator_values, 'o-', linewidth=1)
-        ax.fill(angles, indicator_values, alpha=0.25)
-
-        labels = [
-            'pH',
-            'N\n(mg/kg)',
-            'P\n(mg/kg)',
-            'K\n(mg/kg)',
-            'EC\n(dS/m)',
-            'Temp\n(°C)',
-            'Moist\n(%)',
-            'Humid\n(%)'
-        ]
-        ax.set_thetagrids(angles[:-1] * 180 / np.pi, labels, fontsize=8)
-
-        ax.set_title("Soil Health Indicators", fontsize=12)
-        ax.grid(True)
-
-        canvas = FigureCanvasTkAgg(fig, master=radar_chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # The chart PNG was rendered off the Tk thread; only the PhotoImage is created here
+        chart_photo = ImageTk.PhotoImage(PILImage.open(chart))
+        chart_label = ttk.Label(radar_chart_frame, image=chart_photo)
+        chart_label.image = chart_photo
+        chart_label.pack(fill=tk.BOTH, expand=True)
 
         result_frame = ttk.Frame(visualization_content_frame)
         result_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        '''
-        result_label = ttk.Label(result_frame, text=f"Soil Health Score: {soil_health_score:.2f}",
-                                 font=("Helvetica", 10, "bold"))
-        result_label.pack(side=tk.TOP, padx=10)
-
-        rating = generate_rating(soil_health_score)
-
-        rating_label = ttk.Label(result_frame, text=f"\nRating: {rating}", font=("Helvetica", 10, "bold"))
-        rating_label.pack(side=tk.TOP, padx=10)
-        '''
         return result_frame
 
-        # Calculate the rating
-        rating = generate_rating(soil_health_score)
-
-        rating_label = ttk.Label(result_frame, text=f"\nRating: {rating}", font=("Helvetica", 10, "bold"))
-        rating_label.pack(side=tk.TOP, padx=10)
-
-        try:
-            data = {
-                'test_id': test_id_entry.get(),
-                'collection_date': sample_date_entry.get(),
-                'latitude': float(latitude_entry.get().strip()),
-                'longitude': float(longitude_entry.get().strip()),
-                'name': name_entry.get(),
-                'area': float(area_entry.get()) if area_entry.get() else None,
-                'gender': gender_var.get(),
-                'age': int(age_entry.get()) if age_entry.get() else None,
-                'address': address_entry.get(),
-                'mobile_no': mobile_entry.get(),
-                'soil_ph': indicator_values[0],
-                'nitrogen': indicator_values[1],
-                'phosphorus': indicator_values[2],
-                'potassium': indicator_values[3],
-                'electrical_conductivity': indicator_values[4],
-                'temperature': indicator_values[5],
-                'moisture': indicator_values[6],
-                'humidity': indicator_values[7],
-                'soil_health_score': soil_health_score,
-                'recommendations': generate_crop_recommendations(soil_health_score)
-            }
-
-        except ValueError as e:
-            tk.messagebox.showerror("Invalid Input", str(e))
-
     # Open PDF Files
     def open_pdf_window(file_path):
         # Create a new window for the PDF viewer
         pdf_window = tk.Toplevel(window)
         pdf_window.title(f"Soil Health Report of: {os.path.basename(file_path)}")
 
-        # Create a canvas to display the PDF pages
-        canvas = tk.Canvas(pdf_window, width=600, height=800)
-        canvas.pack(fill=tk.BOTH, expand=True)
-
-        # Create a scrollbar for the canvas
-        scrollbar = ttk.Scrollbar(pdf_window, orient=tk.VERTICAL, command=canvas.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Open the PDF file
-        with open(file_path, 'rb') as file:
-            pdf_reader = PdfReader(file)
-            num_pages = len(pdf_reader.pages)
-
-            for page_num in range(num_pages):
-                # Render each page as an image using pdf2image
-                page_images = convert_from_path(file_path, first_page=page_num + 1, last_page=page_num + 1)
-
-                for img in page_images:
-                    img = img.resize((600, 800), Image.LANCZOS)
-                    photo = ImageTk.PhotoImage(img)
-
-                    # Display the image on the canvas
-                    canvas.create_image(0, page_num * 600, anchor=tk.NW, image=photo)
-                    canvas.image = photo
-
-        # Configure the canvas scroll region
-        canvas.configure(scrollregion=canvas.bbox(tk.ALL))
-
-        # Bind mouse wheel events for zooming in/out
-        def zoom(event):
-            if event.delta > 0:
-                canvas.scale(tk.ALL, event.x, event.y, 1.1, 1.1)
-            elif event.delta < 0:
-                canvas.scale(tk.ALL, event.x, event.y, 0.9, 0.9)
-            canvas.configure(scrollregion=canvas.bbox(tk.ALL))
-
-        canvas.bind("<MouseWheel>", zoom)
+        # Pages are rasterized at the preview size in the background, first page first
+        preview_frame = ttk.Frame(pdf_window)
+        preview_frame.pack(fill=tk.BOTH, expand=True)
+        from pdf_preview import PdfPreview
+        PdfPreview(preview_frame, file_path)
 
         # Create a frame for the buttons
         button_frame = ttk.Frame(pdf_window)
@@ -1044,6 +837,10 @@ def create_gui():
     def print_pdf(file_path):
         # Print the PDF file
         try:
+            # pywin32 is Windows-only, so it is loaded when printing rather than at startup
+            import win32api
+            import win32print
+
             # Get the default printer
             default_printer = win32print.GetDefaultPrinter()
 
@@ -1081,6 +878,29 @@ def create_gui():
         except Exception as e:
             messagebox.showerror("Print Error", f"An error occurred while printing the file:\n{str(e)}")
 
+    def rescore_stored_tests(task):
+        # Runs on the maintenance runner's thread; a quarter of the time at most, so saving and
+        # browsing stay quick while older scores are brought up to date
+        from rescoring import rescore_database
+
+        def report(stats):
+            done = stats['rescored'] + stats['failed']
+            task.report_progress(done / max(stats['stale'], 1),
+                                 f"Updating stored scores to the current weights: {done} of {stats['stale']}")
+
+        return rescore_database(duty_cycle=0.25, progress=report, should_stop=lambda: task.cancelled)
+
+    # Stored scores made with older weights or recommendations are recomputed in the background, on
+    # a runner of their own so assessments never wait behind it. Closing the window stops the job
+    # after its current chunk; the next start carries on from there.
+    maintenance_runner = TaskRunner(window)
+    rescoring_task = maintenance_runner.submit(
+        rescore_stored_tests,
+        on_done=lambda stats: assessing_label.config(text=""),
+        on_error=lambda error: assessing_label.config(text=""),
+        on_progress=lambda fraction, message: assessing_label.config(text=message))
+    window.bind("<Destroy>", lambda event: rescoring_task.cancel() if event.widget is window else None, add='+')
+
     return window
 def on_sample_date_click(event, info_frame, sample_date_entry):
     def on_date_click(event):
@@ -1100,6 +920,7 @@ def on_sample_date_click(event, info_frame, sample_date_entry):
 
     calendar_frame = ttk.Frame(info_frame)
     calendar_frame.grid(row=2, column=1, padx=5, pady=5, sticky='ew')
+    from tkcalendar import Calendar
     calendar = Calendar(calendar_frame, selectmode='day', date_pattern='dd-mm-y')
     calendar.pack(fill='both', expand=True)
 
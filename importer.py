@@ -0,0 +1,270 @@
+import csv
+import os
+import sys
+import time
+import numpy as np
+from indicators import indicator_columns
+from assessment import assess_batch, scoring_version, generate_crop_recommendations_batch, generate_fertilizer_recommendations_batch
+from connection import get_connection, set_database_path, transaction
+from schema import (soil_test_columns, insert_sql, iso_date, migrate, record_scoring_version,
+                    store_recommendation_texts, normalize_test_id, stored_test_ids)
+
+# Spreadsheet headers (as exported by the GUI and database viewer) mapped to soil_tests columns
+header_aliases = {
+    'test id': 'test_id',
+    'collection date': 'collection_date',
+    'sample collection date': 'collection_date',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'name': 'name',
+    'area (ha)': 'area',
+    'area': 'area',
+    'gender': 'gender',
+    'age': 'age',
+    'address': 'address',
+    'mobile no.': 'mobile_no',
+    'mobile no': 'mobile_no',
+    'soil ph': 'soil_ph',
+    'nitrogen': 'nitrogen',
+    'phosphorus': 'phosphorus',
+    'potassium': 'potassium',
+    'electrical conductivity': 'electrical_conductivity',
+    'temperature': 'temperature',
+    'moisture': 'moisture',
+    'humidity': 'humidity',
+}
+
+# Rows of soil_health_data.csv carry only an ID, the indicators, a score and a recommendation,
+# even though its header lists the full farmer record
+indicator_only_layout = ['id'] + indicator_columns + ['soil_health_score', 'crop_recommendations']
+
+MAX_REPORTED_REJECTIONS = 1000
+
+
+def header_to_columns(header):
+    columns = []
+    for title in header:
+        title = str(title).strip() if title is not None else ''
+        columns.append(header_aliases.get(title.lower(), title if title in soil_test_columns else None))
+    return columns
+
+
+def read_csv_rows(file_path):
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as file:
+        yield from csv.reader(file)
+
+
+def read_xlsx_rows(file_path):
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def read_parquet_rows(file_path, batch_size=10000):
+    # pyarrow is optional and only needed for Parquet input
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(file_path)
+    yield list(parquet_file.schema_arrow.names)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def read_rows(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return read_xlsx_rows(file_path)
+    if extension == '.parquet':
+        return read_parquet_rows(file_path)
+    if extension == '.csv':
+        return read_csv_rows(file_path)
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+def read_records(rows):
+    # Yield (line number, {column: raw value}) pairs for every data row
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = header_to_columns(header)
+    for line_number, row in enumerate(rows, start=2):
+        if not row or all(value in (None, '') for value in row):
+            continue
+        row_columns = columns
+        if len(row) != len(header) and len(row) == len(indicator_only_layout):
+            row_columns = indicator_only_layout
+        yield line_number, {column: value for column, value in zip(row_columns, row) if column}
+
+
+def chunked(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def map_chunks(function, chunks, workers=None):
+    # Apply function to every chunk, in order. With several workers the chunks are spread over a
+    # process pool, with at most two chunks per worker in flight so memory stays bounded.
+    if not workers or workers <= 1:
+        for chunk in chunks:
+            yield function(chunk)
+        return
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(function, chunk))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def to_float(value):
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+def to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def prepare_chunk(chunk):
+    # Convert one chunk of raw records into insert rows, their line numbers and (line number, reason)
+    # rejections
+    rejected = []
+    metadata = []
+    indicator_values = np.full((len(chunk), len(indicator_columns)), np.nan)
+    parsed = np.zeros(len(chunk), dtype=bool)
+
+    for position, (line_number, record) in enumerate(chunk):
+        try:
+            indicator_values[position] = [to_float(record.get(column)) if record.get(column) not in (None, '')
+                                          else np.nan for column in indicator_columns]
+            metadata.append((
+                normalize_test_id(to_text(record.get('test_id'))),
+                iso_date(record.get('collection_date')),
+                to_float(record.get('latitude')),
+                to_float(record.get('longitude')),
+                to_text(record.get('name')),
+                to_float(record.get('area')),
+                to_text(record.get('gender')),
+                int(to_float(record.get('age'))) if record.get('age') not in (None, '') else None,
+                to_text(record.get('address')),
+                to_text(record.get('mobile_no')),
+            ))
+            parsed[position] = True
+        except (TypeError, ValueError) as e:
+            metadata.append(None)
+            rejected.append((line_number, f"Unreadable value: {e}"))
+
+    results = assess_batch(indicator_values)
+    valid = results['valid'] & parsed
+    for position in np.flatnonzero(parsed & ~results['valid']):
+        bad_columns = [indicator_columns[i] for i in np.flatnonzero(results['invalid_mask'][position])]
+        rejected.append((chunk[position][0], f"Invalid or missing values for {', '.join(bad_columns)}"))
+
+    scores = results['soil_health_score'][valid]
+    crop_recommendations = generate_crop_recommendations_batch(scores)
+    fertilizer_recommendations = generate_fertilizer_recommendations_batch(scores)
+    rounded_scores = np.round(scores, 2)
+    version = scoring_version()
+
+    rows, line_numbers = [], []
+    for i, position in enumerate(np.flatnonzero(valid)):
+        rows.append(metadata[position] + tuple(indicator_values[position].tolist()) +
+                    (float(rounded_scores[i]), crop_recommendations[i], fertilizer_recommendations[i], version))
+        line_numbers.append(chunk[position][0])
+    rejected.sort()
+    return rows, line_numbers, rejected
+
+
+def prepare_counted_chunk(chunk):
+    # prepare_chunk plus the chunk's row count, so worker processes need not send the raw chunk back
+    return (len(chunk),) + prepare_chunk(chunk)
+
+
+def reject_duplicates(conn, rows, line_numbers):
+    # Split rows into those to insert and (line number, reason) rejections for test IDs that are
+    # already stored or repeat an earlier row; run inside the chunk's write transaction
+    position = soil_test_columns.index('test_id')
+    seen = stored_test_ids(conn, [row[position] for row in rows])
+    kept, rejected = [], []
+    for line_number, row in zip(line_numbers, rows):
+        test_id = row[position]
+        if test_id is not None and test_id in seen:
+            rejected.append((line_number, f"duplicate test_id {test_id}"))
+            continue
+        if test_id is not None:
+            seen.add(test_id)
+        kept.append(row)
+    return kept, rejected
+
+
+def tune_connection(conn):
+    # Bulk-load pragmas on top of the shared WAL / synchronous=NORMAL connection settings
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+
+
+def import_file(file_path, chunk_size=10000, progress=None, workers=None, rows=None):
+    # Loads into the database configured in connection.py; the schema is migrated first.
+    # Chunks are scored on `workers` processes while this process does all the writing.
+    # rows, when given, replaces reading file_path (e.g. a csv.reader over stdin).
+    migrate()
+    sql = insert_sql()
+    stats = {'rows': 0, 'imported': 0, 'rejected': 0, 'rejected_rows': [], 'seconds': 0.0, 'rows_per_second': 0.0}
+    start_time = time.perf_counter()
+
+    tune_connection(get_connection())
+    with transaction() as conn:
+        record_scoring_version(conn)
+    chunks = chunked(read_records(rows if rows is not None else read_rows(file_path)), chunk_size)
+    for chunk_rows, prepared, line_numbers, rejected in map_chunks(prepare_counted_chunk, chunks, workers):
+        with transaction() as conn:  # One transaction per chunk
+            prepared, duplicates = reject_duplicates(conn, prepared, line_numbers)
+            store_recommendation_texts(conn, prepared)
+            conn.executemany(sql, prepared)
+        if duplicates:
+            rejected = sorted(rejected + duplicates)
+
+        stats['rows'] += chunk_rows
+        stats['imported'] += len(prepared)
+        stats['rejected'] += len(rejected)
+        room = MAX_REPORTED_REJECTIONS - len(stats['rejected_rows'])
+        stats['rejected_rows'].extend(rejected[:max(room, 0)])
+        if progress:
+            progress(stats)
+
+    stats['seconds'] = time.perf_counter() - start_time
+    if stats['seconds'] > 0:
+        stats['rows_per_second'] = stats['rows'] / stats['seconds']
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python importer.py <file.csv|file.xlsx> [database]")
+        sys.exit(1)
+    if len(sys.argv) > 2:
+        set_database_path(sys.argv[2])
+    result = import_file(sys.argv[1])
+    print(f"Imported {result['imported']} of {result['rows']} rows in {result['seconds']:.2f}s "
+          f"({result['rows_per_second']:.0f} rows/s), rejected {result['rejected']}")
+    for line_number, reason in result['rejected_rows']:
+        print(f"  line {line_number}: {reason}")
@@ -1,6 +1,9 @@
+import numpy as np
+
 class SoilIndicator:
-    def __init__(self, name, min_value, max_value, optimal_range, unit):
+    def __init__(self, name, min_value, max_value, optimal_range, unit, column=None):
         self.name = name
+        self.column = column
         self.min_value = min_value
         self.max_value = max_value
         self.optimal_range = optimal_range
@@ -10,14 +13,14 @@ class SoilIndicator:
         return f"{self.name} ({self.min_value}-{self.max_value} {self.unit})"
 
 # Define soil health indicators
-soil_ph = SoilIndicator("Soil pH", 0, 8.5, (6.0, 7.5), "")
-nitrogen = SoilIndicator("Nitrogen (N)", 10, 500, (50, 250), "mg/kg")
-phosphorus = SoilIndicator("Phosphorus (P)", 10, 200, (20, 100), "mg/kg")
-potassium = SoilIndicator("Potassium (K)", 10, 400, (50, 200), "mg/kg")
-electrical_conductivity = SoilIndicator("Electrical Conductivity (EC)", 0, 4, (0, 2), "dS/m")
-temperature = SoilIndicator("Temperature", 0, 50, (10, 30), "°C")
-moisture = SoilIndicator("Moisture", 0, 100, (20, 80), "%")
-humidity = SoilIndicator("Humidity", 0, 100, (30, 70), "%")
+soil_ph = SoilIndicator("Soil pH", 0, 8.5, (6.0, 7.5), "", "soil_ph")
+nitrogen = SoilIndicator("Nitrogen (N)", 10, 500, (50, 250), "mg/kg", "nitrogen")
+phosphorus = SoilIndicator("Phosphorus (P)", 10, 200, (20, 100), "mg/kg", "phosphorus")
+potassium = SoilIndicator("Potassium (K)", 10, 400, (50, 200), "mg/kg", "potassium")
+electrical_conductivity = SoilIndicator("Electrical Conductivity (EC)", 0, 4, (0, 2), "dS/m", "electrical_conductivity")
+temperature = SoilIndicator("Temperature", 0, 50, (10, 30), "°C", "temperature")
+moisture = SoilIndicator("Moisture", 0, 100, (20, 80), "%", "moisture")
+humidity = SoilIndicator("Humidity", 0, 100, (30, 70), "%", "humidity")
 
 # Create a list of soil health indicators
 soil_indicators = [
@@ -29,4 +32,52 @@ soil_indicators = [
     temperature,
     moisture,
     humidity
-]
\ No newline at end of file
+]
+
+# Database / record array column name of each indicator, in scoring order
+indicator_columns = [indicator.column for indicator in soil_indicators]
+
+def indicator_bounds(indicators=None):
+    # (min_values, max_values) arrays for vectorized validation and normalization
+    if indicators is None:
+        indicators = soil_indicators
+    min_values = np.array([indicator.min_value for indicator in indicators], dtype=float)
+    max_values = np.array([indicator.max_value for indicator in indicators], dtype=float)
+    return min_values, max_values
+
+# Compiled membership profiles keyed by each indicator's (min, max, optimal range)
+_profile_cache = {}
+
+def membership_breakpoints(indicator):
+    # Trapezoid rising from 0 at min_value to 1 across optimal_range and back to 0 at max_value.
+    # An optimal range touching a bound keeps membership 1 up to that bound.
+    low, high = indicator.optimal_range
+    points = [(indicator.min_value, 0.0), (low, 1.0), (high, 1.0), (indicator.max_value, 0.0)]
+    if low <= indicator.min_value:
+        points = points[1:]
+    if high >= indicator.max_value:
+        points = points[:-1]
+    x_points, memberships = zip(*points)
+    return np.array(x_points, dtype=float), np.array(memberships, dtype=float)
+
+def membership_profiles(indicators=None):
+    # (x_points, memberships) per indicator for np.interp, compiled once per indicator set
+    if indicators is None:
+        indicators = soil_indicators
+    key = tuple((indicator.min_value, indicator.max_value, tuple(indicator.optimal_range)) for indicator in indicators)
+    profiles = _profile_cache.get(key)
+    if profiles is None:
+        profiles = [membership_breakpoints(indicator) for indicator in indicators]
+        for x_points, memberships in profiles:
+            x_points.flags.writeable = False
+            memberships.flags.writeable = False
+        _profile_cache[key] = profiles
+    return profiles
+
+def membership_values(values, indicators=None):
+    # Membership of every value in an (N, n) array, or one (n,) sample; NaN stays NaN
+    values = np.asarray(values, dtype=float)
+    memberships = np.empty_like(values)
+    for column, (x_points, profile) in enumerate(membership_profiles(indicators)):
+        memberships[..., column] = np.interp(values[..., column], x_points, profile)
+    return memberships
@@ -0,0 +1,93 @@
+from connection import get_connection
+from search import filter_clause
+
+# Columns the browser may sort on; anything else is rejected before it reaches the SQL text
+sortable_columns = [
+    'id', 'test_id', 'collection_date', 'latitude', 'longitude', 'name', 'area', 'gender', 'age', 'address',
+    'mobile_no', 'soil_ph', 'nitrogen', 'phosphorus', 'potassium', 'electrical_conductivity', 'temperature',
+    'moisture', 'humidity', 'soil_health_score', 'crop_recommendations', 'fertilizer_recommendation'
+]
+
+
+def database_stamp(conn):
+    # data_version moves when another connection commits; total_changes covers this connection's own writes
+    return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+
+class PagedQuery:
+    # Keyset pagination over soil_test_details: each page continues after the (sort value, id) of the
+    # previous page's last row, so fetching page N costs the same as fetching page 1
+    def __init__(self, sort_column='id', descending=False, filter_text='', page_size=100):
+        if sort_column not in sortable_columns:
+            raise ValueError(f"Cannot sort by {sort_column}")
+        self.sort_column = sort_column
+        self.descending = descending
+        self.filter_text = filter_text.strip()
+        self.page_size = page_size
+        self.last_key = None
+        self.exhausted = False
+        # (connection, database stamp, total) of the last count, reused while neither has changed
+        self._count = None
+
+    def filter_clause(self):
+        if not self.filter_text:
+            return "", []
+        return filter_clause(self.filter_text)
+
+    def keyset_clause(self):
+        if self.last_key is None:
+            return "", []
+        value, record_id = self.last_key
+        column = self.sort_column
+        if column == 'id':
+            return ("id < ?" if self.descending else "id > ?"), [record_id]
+        # NULLs sort first ascending and last descending, and never compare equal in a row value
+        if self.descending:
+            if value is None:
+                return f"({column} IS NULL AND id < ?)", [record_id]
+            return f"(({column}, id) < (?, ?) OR {column} IS NULL)", [value, record_id]
+        if value is None:
+            return f"(({column} IS NULL AND id > ?) OR {column} IS NOT NULL)", [record_id]
+        return f"({column}, id) > (?, ?)", [value, record_id]
+
+    def build_query(self, limit):
+        conditions, parameters = [], []
+        for clause, clause_parameters in (self.filter_clause(), self.keyset_clause()):
+            if clause:
+                conditions.append(clause)
+                parameters.extend(clause_parameters)
+        query = "SELECT * FROM soil_test_details"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        direction = "DESC" if self.descending else "ASC"
+        if self.sort_column == 'id':
+            query += f" ORDER BY id {direction}"
+        else:
+            query += f" ORDER BY {self.sort_column} {direction}, id {direction}"
+        query += " LIMIT ?"
+        parameters.append(limit)
+        return query, parameters
+
+    def next_page(self, limit=None):
+        if self.exhausted:
+            return []
+        limit = limit or self.page_size
+        query, parameters = self.build_query(limit)
+        records = get_connection().execute(query, parameters).fetchall()
+        if len(records) < limit:
+            self.exhausted = True
+        if records:
+            last = records[-1]
+            self.last_key = (last[sortable_columns.index(self.sort_column)], last[0])
+        return records
+
+    def count(self):
+        conn = get_connection()
+        stamp = database_stamp(conn)
+        if self._count is not None and self._count[0] is conn and self._count[1] == stamp:
+            return self._count[2]
+        clause, parameters = self.filter_clause()
+        query = "SELECT COUNT(*) FROM soil_tests" + (f" WHERE {clause}" if clause else "")
+        total = conn.execute(query, parameters).fetchone()[0]
+        self._count = (conn, stamp, total)
+        return total
@@ -0,0 +1,190 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+import tkinter as tk
+from tkinter import ttk
+from PIL import Image, ImageTk
+from pdf2image import convert_from_path, pdfinfo_from_path
+from tasks import TaskRunner
+
+# A4 in PDF points, used when pdfinfo does not report a page size
+DEFAULT_PAGE_SIZE = (595.276, 841.89)
+PREVIEW_WIDTH = 600
+PAGE_GAP = 10
+MIN_ZOOM, MAX_ZOOM = 0.5, 2.0
+
+_page_size = re.compile(r'([\d.]+) x ([\d.]+)')
+
+
+class PageCache:
+    # Rendered pages keyed by (path, mtime, page, dpi); least recently used pages are dropped first.
+    # A report regenerated under the same name has a new mtime, so its old pages are never shown.
+    def __init__(self, max_pages=32):
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            image = self.pages.get(key)
+            if image is not None:
+                self.pages.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        with self.lock:
+            self.pages[key] = image
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+
+
+page_cache = PageCache()
+_info_cache = {}
+
+
+def pdf_info(file_path):
+    # (page count, page size in points), read once per file version with poppler's pdfinfo
+    key = (os.path.abspath(file_path), os.path.getmtime(file_path))
+    info = _info_cache.get(key)
+    if info is None:
+        details = pdfinfo_from_path(file_path)
+        match = _page_size.search(str(details.get('Page size', '')))
+        page_size = (float(match.group(1)), float(match.group(2))) if match else DEFAULT_PAGE_SIZE
+        info = (int(details['Pages']), page_size)
+        _info_cache[key] = info
+    return info
+
+
+def preview_dpi(page_size, width):
+    # Resolution at which a page is rasterized directly at the preview width
+    return max(1, round(width * 72 / page_size[0]))
+
+
+def render_pages(file_path, first_page, last_page, dpi):
+    # {page: image} for pages first_page..last_page (1-based) at the given resolution. Pages of this
+    # file version seen before come from the cache; the rest are rasterized by one poppler call
+    # spanning them, instead of one process per page.
+    path, mtime = os.path.abspath(file_path), os.path.getmtime(file_path)
+    images = {page: page_cache.get((path, mtime, page, dpi)) for page in range(first_page, last_page + 1)}
+    missing = [page for page, image in images.items() if image is None]
+    if missing:
+        rendered = convert_from_path(file_path, dpi=dpi, first_page=missing[0], last_page=missing[-1])
+        for page, image in zip(range(missing[0], missing[-1] + 1), rendered):
+            page_cache.put((path, mtime, page, dpi), image)
+            images[page] = image
+    return images
+
+
+def render_page(file_path, page, dpi):
+    # One page (1-based) at the given resolution
+    return render_pages(file_path, page, page, dpi)[page]
+
+
+def visible_pages(top, bottom, page_height, page_count, ahead=1):
+    # Pages overlapping the canvas rows top..bottom, plus `ahead` pages below so scrolling down
+    # finds the next page ready
+    stride = page_height + PAGE_GAP
+    first = max(1, int(top // stride) + 1)
+    last = min(page_count, int(bottom // stride) + 1 + ahead)
+    return range(first, last + 1)
+
+
+def page_runs(pages):
+    # Consecutive pages grouped into (first, last) runs, each rendered by one task
+    runs = []
+    for page in sorted(pages):
+        if runs and page == runs[-1][1] + 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return [tuple(run) for run in runs]
+
+
+class PdfPreview:
+    # Scrollable page view. Only page 1 is rasterized up front; other pages are rendered as they
+    # scroll into view, visible runs of pages by one poppler call on a background thread. Zooming
+    # resamples the rendered pages in memory. Closing the window cancels renders still pending.
+    def __init__(self, parent, file_path, width=PREVIEW_WIDTH, height=800):
+        self.file_path = file_path
+        self.page_count, self.page_size = pdf_info(file_path)
+        self.dpi = preview_dpi(self.page_size, width)
+        self.width = width
+        self.zoom = 1.0
+        self.images = {}
+        self.photos = {}
+        self.requested = set()
+        self.tasks = []
+        self.runner = TaskRunner(parent)
+
+        self.canvas = tk.Canvas(parent, width=width, height=height)
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.canvas.bind("<Destroy>", lambda event: self.close())
+
+        self.request_pages([1])
+        self.layout()
+
+    def request_pages(self, pages):
+        pages = [page for page in pages if page not in self.requested and page not in self.images]
+        for first, last in page_runs(pages):
+            self.requested.update(range(first, last + 1))
+            self.tasks.append(self.runner.submit(
+                lambda task, first=first, last=last: render_pages(self.file_path, first, last, self.dpi),
+                on_done=self.show_pages))
+
+    def on_scroll(self, first, last):
+        # yscrollcommand: called with the visible fraction whenever the view moves or the layout changes
+        self.scrollbar.set(first, last)
+        total = self.page_count * (self.page_height() + PAGE_GAP)
+        self.request_pages(visible_pages(float(first) * total, float(last) * total, self.page_height(),
+                                         self.page_count))
+
+    def page_height(self):
+        return round(self.width * self.zoom * self.page_size[1] / self.page_size[0])
+
+    def layout(self):
+        # Pages not rendered yet keep their place as blank outlines
+        self.canvas.delete(tk.ALL)
+        page_width, page_height = round(self.width * self.zoom), self.page_height()
+        for page in range(1, self.page_count + 1):
+            top = (page - 1) * (page_height + PAGE_GAP)
+            photo = self.photos.get(page)
+            if photo is None:
+                self.canvas.create_rectangle(0, top, page_width, top + page_height, outline='grey')
+            else:
+                self.canvas.create_image(0, top, anchor=tk.NW, image=photo)
+        self.canvas.configure(scrollregion=(0, 0, page_width, self.page_count * (page_height + PAGE_GAP)))
+
+    def photo_for(self, image):
+        size = (round(self.width * self.zoom), self.page_height())
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+        return ImageTk.PhotoImage(image)
+
+    def show_pages(self, images):
+        for page, image in images.items():
+            self.images[page] = image
+            # Every page keeps its own PhotoImage; Tk drops images that are no longer referenced
+            self.photos[page] = self.photo_for(image)
+        self.layout()
+
+    def set_zoom(self, zoom):
+        self.zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        self.photos = {page: self.photo_for(image) for page, image in self.images.items()}
+        self.layout()
+
+    def on_mouse_wheel(self, event):
+        if event.delta > 0:
+            self.set_zoom(self.zoom * 1.1)
+        elif event.delta < 0:
+            self.set_zoom(self.zoom * 0.9)
+
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+        self.runner.shutdown()
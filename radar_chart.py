@@ -0,0 +1,87 @@
+import io
+import threading
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Axis labels in indicator order
+radar_labels = [
+    'pH',
+    'N\n(mg/kg)',
+    'P\n(mg/kg)',
+    'K\n(mg/kg)',
+    'EC\n(dS/m)',
+    'Temp\n(°C)',
+    'Moist\n(%)',
+    'Humid\n(%)'
+]
+
+PREVIEW_DPI = 100
+REPORT_DPI = 300
+
+# Chart layouts: (figure size in inches, label font size, title font size)
+chart_styles = {
+    'gui': (4.5, 8, 12),
+    'report': (4, 6, 10),
+}
+
+
+class RadarChart:
+    # Polar axes, angles, grid and labels are built once; each render only moves the data line
+    # and its fill, then draws through the Agg canvas without going through pyplot
+    def __init__(self, size, label_fontsize, title_fontsize, labels=radar_labels):
+        self.figure = Figure(figsize=(size, size))
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot(projection='polar')
+        self.lock = threading.Lock()
+
+        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False)
+        self.angles = np.concatenate((angles, [angles[0]]))
+        empty = np.zeros(len(self.angles))
+        self.line, = self.axes.plot(self.angles, empty, 'o-', color='C0', linewidth=1)
+        self.fill, = self.axes.fill(self.angles, empty, color='C0', alpha=0.25)
+        self.axes.set_thetagrids(angles * 180 / np.pi, labels, fontsize=label_fontsize)
+        self.axes.set_title("Soil Health Indicators", fontsize=title_fontsize)
+        self.axes.grid(True)
+
+    def update(self, indicator_values):
+        values = np.asarray(indicator_values, dtype=float)
+        values = np.concatenate((values, [values[0]]))
+        self.line.set_data(self.angles, values)
+        self.fill.set_xy(np.column_stack((self.angles, values)))
+        # Rescale the radial axis to the new sample as a freshly plotted chart would
+        self.axes.relim()
+        self.axes.autoscale_view()
+
+    def render(self, indicator_values, dpi=REPORT_DPI, file_format='png'):
+        with self.lock:
+            self.update(indicator_values)
+            buffer = io.BytesIO()
+            self.figure.savefig(buffer, format=file_format, dpi=dpi, bbox_inches='tight')
+        buffer.seek(0)
+        return buffer
+
+
+# One template per style, shared by every chart drawn in this process
+_charts = {}
+_charts_lock = threading.Lock()
+
+
+def radar_chart(style='report'):
+    with _charts_lock:
+        if style not in _charts:
+            _charts[style] = RadarChart(*chart_styles[style])
+        return _charts[style]
+
+
+def render_radar_chart(indicator_values, style='report', preview=False):
+    # PNG of the indicator radar chart in a BytesIO; preview renders at screen resolution
+    return radar_chart(style).render(indicator_values, dpi=PREVIEW_DPI if preview else REPORT_DPI)
+
+
+def close_radar_charts():
+    # Release the cached figures, e.g. when the GUI shuts down
+    with _charts_lock:
+        for chart in _charts.values():
+            chart.figure.clear()
+        _charts.clear()
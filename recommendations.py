@@ -0,0 +1,147 @@
+import bisect
+import csv
+import hashlib
+import os
+import threading
+from typing import NamedTuple
+import numpy as np
+from assets import asset_path
+
+
+class IndexState(NamedTuple):
+    # One built index; refresh() swaps a whole new state in, so readers never see a partial rebuild
+    recommendations: list
+    breakpoints: list
+    segments: list
+    breakpoint_array: np.ndarray
+
+
+def build_state(rows):
+    breakpoints = sorted({edge for min_score, max_score, _ in rows for edge in (min_score, max_score)})
+    # Segment i covers [breakpoints[i], breakpoints[i + 1]); bands keep their CSV order
+    segments = [tuple(recommendation_id for recommendation_id, (min_score, max_score, _) in enumerate(rows)
+                      if min_score <= start < max_score)
+                for start in breakpoints[:-1]]
+    return IndexState(rows, breakpoints, segments, np.array(breakpoints, dtype=float))
+
+
+class RecommendationIndex:
+    # Score-band lookup over a (min, max, recommendation) CSV.
+    # The band edges are flattened into sorted breakpoints; every elementary segment between two
+    # neighbouring breakpoints remembers all bands covering it, so overlapping bands all match.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._mtime = None
+        self._digest = None
+        self._lock = threading.Lock()
+        self._state = build_state([])
+
+    @property
+    def recommendations(self):
+        return self._state.recommendations
+
+    @property
+    def breakpoints(self):
+        return self._state.breakpoints
+
+    @property
+    def segments(self):
+        return self._state.segments
+
+    def load_rows(self):
+        rows = []
+        try:
+            with open(self.file_path, 'r') as file:
+                csv_reader = csv.reader(file)
+                next(csv_reader)  # Skip the header row
+                for row in csv_reader:
+                    if not row:
+                        continue
+                    rows.append((float(row[0]), float(row[1]), row[2]))
+        except FileNotFoundError:
+            print(f"Error: {self.file_path} file not found.")
+        except csv.Error as e:
+            print(f"Error reading {self.file_path}: {e}")
+        return rows
+
+    def build(self, rows):
+        state = build_state(rows)
+        with self._lock:
+            self._state = state
+
+    def state(self):
+        # The current index, for callers that read segments and recommendations together
+        self.refresh()
+        return self._state
+
+    def refresh(self):
+        # Reparse the CSV only when its modification time has changed. A missing file is remembered
+        # as mtime 0, so it is reported once rather than on every lookup.
+        try:
+            mtime = os.path.getmtime(self.file_path)
+        except OSError:
+            mtime = 0
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime != self._mtime:
+                self._state = build_state(self.load_rows())
+                self._digest = self.file_digest()
+                self._mtime = mtime
+
+    def file_digest(self):
+        try:
+            with open(self.file_path, 'rb') as file:
+                return hashlib.sha1(file.read()).hexdigest()
+        except OSError:
+            return None
+
+    def version(self):
+        # Modification time of the CSV the index was last built from
+        self.refresh()
+        return self._mtime
+
+    def digest(self):
+        # Content hash of that CSV, which unlike the mtime survives copying the file elsewhere
+        self.refresh()
+        return self._digest
+
+    def segment_of(self, score, state=None):
+        state = state or self._state
+        segment = bisect.bisect_right(state.breakpoints, score) - 1
+        if 0 <= segment < len(state.segments):
+            return segment
+        return None
+
+    def lookup_ids(self, score, state=None):
+        state = state or self.state()
+        segment = self.segment_of(score, state)
+        return state.segments[segment] if segment is not None else ()
+
+    def lookup_all(self, score):
+        state = self.state()
+        return [state.recommendations[recommendation_id][2] for recommendation_id in self.lookup_ids(score, state)]
+
+    def lookup(self, score, default=None):
+        matches = self.lookup_all(score)
+        return matches[0] if matches else default
+
+    def lookup_segments(self, scores, state=None):
+        # Vectorized segment index per score, -1 where no band applies (including NaN scores)
+        state = state or self.state()
+        scores = np.asarray(scores, dtype=float)
+        segments = np.searchsorted(state.breakpoint_array, scores, side='right') - 1
+        segments[(segments < 0) | (segments >= len(state.segments)) | np.isnan(scores)] = -1
+        return segments
+
+    def lookup_batch(self, scores):
+        # Every matching recommendation for each score, computed once per distinct segment
+        state = self.state()
+        segments = self.lookup_segments(scores, state)
+        texts = [[state.recommendations[recommendation_id][2] for recommendation_id in matches]
+                 for matches in state.segments]
+        return [texts[segment] if segment >= 0 else [] for segment in segments]
+
+
+crop_index = RecommendationIndex(asset_path('crop_recommendations.csv'))
+fertilizer_index = RecommendationIndex(asset_path('fertilizer_recommendations.csv'))
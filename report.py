@@ -6,45 +6,87 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from indicators import soil_indicators
 from fahp import fahp_weights, evaluate_soil_health
 from assessment import assess_soil_health, generate_rating, generate_crop_recommendations
-import matplotlib.pyplot as plt
-import numpy as np
+from assets import asset_path
 import io
-import sqlite3
-import openpyxl
-from tkinter import filedialog
 from datetime import datetime
+from reportlab.pdfbase import pdfmetrics
+
+# Define custom color palette
+primary_color = colors.HexColor('#2E8B57')  # Green
+secondary_color = colors.HexColor('#000000')  # Black
+tertiary_color = colors.HexColor('#808080')  # Grey
+accent_color = colors.HexColor('#FFFFFF')  # White
+
+# Stylesheet and logo file contents, built once per process and shared by every report
+_report_styles = None
+_image_bytes = {}
+
+
+def report_styles():
+    global _report_styles
+    if _report_styles is None:
+        styles = getSampleStyleSheet()
+
+        # Define custom font styles
+        if 'MainTitle' not in styles:
+            styles.add(ParagraphStyle(name='MainTitle', fontName='Helvetica-Bold', fontSize=16, textColor=colors.black,
+                                      spaceAfter=6, alignment=TA_CENTER))
+        if 'TableTitle' not in styles:
+            styles.add(ParagraphStyle(name='TableTitle', fontName='Helvetica-Bold', fontSize=8,
+                                      textColor=secondary_color, spaceAfter=4, alignment=TA_CENTER))
+        if 'BodyText' not in styles:
+            styles.add(ParagraphStyle(name='BodyText', fontName='Helvetica', fontSize=8, textColor=secondary_color,
+                                      spaceAfter=4))
+        _report_styles = styles
+    return _report_styles
+
+
+# Shown in place of the score and rating of a stored test that has no score
+NOT_SCORED = '—'
+
+
+def score_text(soil_health_score):
+    return NOT_SCORED if soil_health_score is None else f"{soil_health_score:.2f}"
+
+
+def report_image(file_path, width, height):
+    # Logos are read from disk once; each report gets its own Image flowable over the cached bytes
+    if file_path not in _image_bytes:
+        with open(file_path, 'rb') as file:
+            _image_bytes[file_path] = file.read()
+    return Image(io.BytesIO(_image_bytes[file_path]), width=width, height=height)
+
+
+def warm_report_resources():
+    # Load styles, font metrics, logos and the chart template up front, e.g. once per batch worker process
+    from radar_chart import radar_chart
+    report_styles()
+    radar_chart('report')
+    for font_name in ('Helvetica', 'Helvetica-Bold'):
+        pdfmetrics.getFont(font_name).stringWidth('Soil Health', 10)
+    for file_path in (asset_path('main.png'), asset_path('mzu.png')):
+        report_image(file_path, inch, inch)
+
+
+def indicator_cell(value):
+    # Indicators skipped in the field are stored as NULL
+    return 'Not measured' if value is None else value
 
 
 def generate_pdf_report(data, file_path, indicator_values):
+    # matplotlib is only needed for the chart, so it is loaded on the first report
+    from radar_chart import render_radar_chart
     report = SimpleDocTemplate(file_path, pagesize=A4)
-    styles = getSampleStyleSheet()
-
-    # Define custom color palette
-    primary_color = colors.HexColor('#2E8B57')  # Green
-    secondary_color = colors.HexColor('#000000')  # Black
-    tertiary_color = colors.HexColor('#808080')  # Grey
-    accent_color = colors.HexColor('#FFFFFF')  # White
-
-    # Define custom font styles
-    if 'MainTitle' not in styles:
-        styles.add(ParagraphStyle(name='MainTitle', fontName='Helvetica-Bold', fontSize=16, textColor=colors.black,
-                                  spaceAfter=6, alignment=TA_CENTER))
-    if 'TableTitle' not in styles:
-        styles.add(ParagraphStyle(name='TableTitle', fontName='Helvetica-Bold', fontSize=8, textColor=secondary_color,
-                                  spaceAfter=4, alignment=TA_CENTER))
-    if 'BodyText' not in styles:
-        styles.add(ParagraphStyle(name='BodyText', fontName='Helvetica', fontSize=8, textColor=secondary_color,
-                                  spaceAfter=4))
+    styles = report_styles()
 
     # Create the report elements
     report_elements = []
 
     # Add the main title with images
-    main_image = Image('main.png', width=0.5 * inch, height=0.5 * inch)
-    university_image = Image('mzu.png', width=0.5 * inch, height=0.5 * inch)
+    main_image = report_image(asset_path('main.png'), width=0.5 * inch, height=0.5 * inch)
+    university_image = report_image(asset_path('mzu.png'), width=0.5 * inch, height=0.5 * inch)
     main_title = Paragraph('Soil Health Diagnostic System Report', styles['MainTitle'])
     main_title_with_images = Table([[main_image, main_title, university_image]], colWidths=[0.5 * inch, None, 1.5 * cm],
                                    hAlign='CENTER')
@@ -137,41 +179,17 @@ def generate_pdf_report(data, file_path, indicator_values):
     # Add soil health indicators table
     soil_health_data = [
         ['Indicators', 'Value', 'Normal Range'],
-        ['Soil pH', data['soil_ph'], '6.0 - 7.5'],
-        ['Nitrogen (N)(mg/kg)', data['nitrogen'], '50 - 250 mg/kg'],
-        ['Phosphorus (P)(mg/kg)', data['phosphorus'], '20 - 100 mg/kg'],
-        ['Potassium (K)(mg/kg)', data['potassium'], '50 - 200 mg/kg'],
-        ['EC(dS/m)', data['electrical_conductivity'], '0 - 2 dS/m'],
-        ['Temperature (°C)', data['temperature'], '10 - 30 °C'],
-        ['Moisture (%)', data['moisture'], '20 - 80 %'],
-        ['Humidity (%)', data['humidity'], '30 - 70 %']
+        ['Soil pH', indicator_cell(data['soil_ph']), '6.0 - 7.5'],
+        ['Nitrogen (N)(mg/kg)', indicator_cell(data['nitrogen']), '50 - 250 mg/kg'],
+        ['Phosphorus (P)(mg/kg)', indicator_cell(data['phosphorus']), '20 - 100 mg/kg'],
+        ['Potassium (K)(mg/kg)', indicator_cell(data['potassium']), '50 - 200 mg/kg'],
+        ['EC(dS/m)', indicator_cell(data['electrical_conductivity']), '0 - 2 dS/m'],
+        ['Temperature (°C)', indicator_cell(data['temperature']), '10 - 30 °C'],
+        ['Moisture (%)', indicator_cell(data['moisture']), '20 - 80 %'],
+        ['Humidity (%)', indicator_cell(data['humidity']), '30 - 70 %']
     ]
     # Create the radar chart
-    fig, ax = plt.subplots(figsize=(4, 4), subplot_kw={'projection': 'polar'})
-    angles = np.linspace(0, 2 * np.pi, len(soil_indicators), endpoint=False)
-    angles = np.concatenate((angles, [angles[0]]))
-    indicator_values = np.concatenate((indicator_values, [indicator_values[0]]))
-
-    ax.plot(angles, indicator_values, 'o-', linewidth=1)
-    ax.fill(angles, indicator_values, alpha=0.25)
-
-    labels = [
-        'pH',
-        'N\n(mg/kg)',
-        'P\n(mg/kg)',
-        'K\n(mg/kg)',
-        'EC\n(dS/m)',
-        'Temp\n(°C)',
-        'Moist\n(%)',
-        'Humid\n(%)'
-    ]
-    ax.set_thetagrids(angles[:-1] * 180 / np.pi, labels, fontsize=6)
-    ax.set_title("Soil Health Indicators", fontsize=10)
-    ax.grid(True)
-
-    chart_buffer = io.BytesIO()
-    plt.savefig(chart_buffer, format='png', dpi=300, bbox_inches='tight')
-    chart_buffer.seek(0)
+    chart_buffer = render_radar_chart(indicator_values, style='report')
     chart_img = Image(chart_buffer, width=3 * inch, height=3 * inch)
 
     # Get the height of the chart_img
@@ -231,8 +249,8 @@ def generate_pdf_report(data, file_path, indicator_values):
                                   ParagraphStyle(name='ValueRangesText', wordWrap='LTR', fontSize=8))
     overall_result_data = [
         ['Result', 'Value', 'Range'],
-        ['Soil Health Score', f"{data['soil_health_score']:.2f}", '0 - 1'],
-        ['Rating', data['rating'], value_ranges_text],
+        ['Soil Health Score', score_text(data['soil_health_score']), '0 - 1'],
+        ['Rating', data['rating'] or NOT_SCORED, value_ranges_text],
         ['Crop Recommendations', Paragraph(data['crop_recommendations'],
                                            ParagraphStyle(name='CropRecommendations', wordWrap='LTR', fontSize=8)), ''],
         ['Fertilizer Recommendations', Paragraph(data['fertilizer_recommendation'],
@@ -285,7 +303,6 @@ def generate_pdf_report(data, file_path, indicator_values):
     report_elements.append(Spacer(0.1, 0.1 * inch))
 
     # Define the paragraph style for developer information with a font size of 7
-    styles = getSampleStyleSheet()
     developer_info_style = ParagraphStyle('DeveloperInfo', parent=styles['Normal'], fontSize=7, leading=9,
                                           alignment=TA_CENTER)
 
@@ -307,21 +324,9 @@ def generate_pdf_report(data, file_path, indicator_values):
     report.build(report_elements)
 
 def export_to_excel(test_id):
+    from tkinter import filedialog
+    from exporter import export_xlsx
     file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")], initialfile=f"{test_id}_test.xlsx")
     if file_path:
-        conn = sqlite3.connect('soil_health.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM soil_tests WHERE test_id = ?", (test_id,))
-        data = c.fetchall()
-        conn.close()
-
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.append(['ID', 'Test ID', 'Sample Collection Date', 'Latitude', 'Longitude', 'Name', 'Area (ha)', 'Gender',
-                      'Age', 'Address', 'Mobile No.', 'Soil pH', 'Nitrogen', 'Phosphorus', 'Potassium',
-                      'Electrical Conductivity', 'Temperature', 'Moisture', 'Humidity', 'Soil Health Score',
-                      'Crop Recommendations'])
-        for row in data:
-            sheet.append(row)
-        workbook.save(file_path)
-    return file_path
\ No newline at end of file
+        export_xlsx(file_path, where="test_id = ?", parameters=(test_id,))
+    return file_path
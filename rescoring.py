@@ -0,0 +1,100 @@
+import sys
+import time
+import numpy as np
+from indicators import indicator_columns
+from assessment import (assess_batch, generate_crop_recommendations_batch, generate_fertilizer_recommendations_batch,
+                        missing_recommendation_files)
+from connection import get_connection, set_database_path, transaction
+from schema import (migrate, record_scoring_version, catalog_id_sql, store_recommendation_texts,
+                    prune_recommendation_texts)
+
+# Recompute stored scores and recommendations after the FAHP matrix or a recommendation CSV changed:
+#   python rescoring.py [database]
+# Every soil test carries the scoring_version it was scored with. The job walks the rows whose version
+# differs from the current one in id order, one chunk per transaction, so stopping it at any point
+# loses nothing: the next run picks up the rows that are still stale. Rows whose indicators cannot be
+# scored keep their stored score and recommendations and are flagged unscorable under the version.
+
+# Parameter layout of an update; the recommendation texts are resolved to their catalog ids
+update_columns = ['soil_health_score', 'crop_recommendations', 'fertilizer_recommendation', 'scoring_version', 'id']
+UPDATE_SQL = f'''UPDATE soil_tests SET soil_health_score = ?,
+                 crop_recommendation_id = {catalog_id_sql('crop_recommendations')},
+                 fertilizer_recommendation_id = {catalog_id_sql('fertilizer_recommendation')},
+                 scoring_version = ?, unscorable = 0 WHERE id = ?'''
+UNSCORABLE_SQL = "UPDATE soil_tests SET scoring_version = ?, unscorable = 1 WHERE id = ?"
+
+
+def stale_count(version, conn=None):
+    conn = conn or get_connection()
+    return conn.execute("SELECT COUNT(*) FROM soil_tests WHERE scoring_version IS NOT ?", (version,)).fetchone()[0]
+
+
+def stale_chunk(conn, version, after_id, chunk_size):
+    return conn.execute(f'''SELECT id, {', '.join(indicator_columns)} FROM soil_tests
+                            WHERE id > ? AND scoring_version IS NOT ? ORDER BY id LIMIT ?''',
+                        (after_id, version, chunk_size)).fetchall()
+
+
+def rescore_chunk(rows, version):
+    # (UPDATE parameters, (version, id) of unscorable rows) for one chunk of (id, indicators...) rows.
+    # Stored indicators that cannot be scored (out of range, or none measured) leave the row's results
+    # alone; only its version is brought up to date, so it is not picked up again on every run.
+    values = np.array([[np.nan if value is None else value for value in row[1:]] for row in rows], dtype=float)
+    results = assess_batch(values, allow_missing=True)
+    valid = results['valid']
+    scores = results['soil_health_score'][valid]
+    crop_recommendations = generate_crop_recommendations_batch(scores)
+    fertilizer_recommendations = generate_fertilizer_recommendations_batch(scores)
+    ids = [rows[position][0] for position in np.flatnonzero(valid)]
+    updates = list(zip(np.round(scores, 2).tolist(), crop_recommendations, fertilizer_recommendations,
+                       [version] * len(ids), ids))
+    unscorable = [(version, rows[position][0]) for position in np.flatnonzero(~valid)]
+    return updates, unscorable
+
+
+def rescore_database(chunk_size=2000, duty_cycle=0.5, progress=None, should_stop=None):
+    # duty_cycle is the share of wall time spent working: after each chunk the job sleeps long enough
+    # to leave the rest to the GUI and other writers. should_stop is checked between chunks; progress
+    # gets the running stats after each one.
+    migrate()
+    missing = missing_recommendation_files()
+    if missing:
+        # Scoring without a catalog would overwrite every stored recommendation with placeholder text
+        raise FileNotFoundError(f"Cannot rescore without the recommendation files: {', '.join(missing)}")
+    with transaction() as conn:
+        version = record_scoring_version(conn)
+    conn = get_connection()
+    stats = {'version': version, 'stale': stale_count(version, conn), 'rescored': 0, 'failed': 0, 'seconds': 0.0}
+    start_time = time.perf_counter()
+    after_id = 0
+    while not (should_stop and should_stop()):
+        work_start = time.perf_counter()
+        rows = stale_chunk(conn, version, after_id, chunk_size)
+        if not rows:
+            break
+        after_id = rows[-1][0]
+        updates, unscorable = rescore_chunk(rows, version)
+        with transaction() as conn:
+            store_recommendation_texts(conn, updates, update_columns)
+            conn.executemany(UPDATE_SQL, updates)
+            conn.executemany(UNSCORABLE_SQL, unscorable)
+        stats['rescored'] += len(updates)
+        stats['failed'] += len(unscorable)
+        stats['seconds'] = time.perf_counter() - start_time
+        if progress:
+            progress(stats)
+        if 0 < duty_cycle < 1:
+            time.sleep((time.perf_counter() - work_start) * (1 - duty_cycle) / duty_cycle)
+    if stats['rescored']:
+        with transaction() as conn:
+            prune_recommendation_texts(conn)
+    stats['seconds'] = time.perf_counter() - start_time
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        set_database_path(sys.argv[1])
+    result = rescore_database(duty_cycle=1)
+    print(f"Rescored {result['rescored']} of {result['stale']} stale rows in {result['seconds']:.2f}s "
+          f"(version {result['version']}), {result['failed']} could not be scored and kept their stored results")
@@ -0,0 +1,296 @@
+import re
+import sqlite3
+from datetime import date, datetime
+from connection import get_connection, transaction
+from search import create_search_index
+from spatial import create_spatial_index
+
+# Columns written for every soil test, in INSERT order
+soil_test_columns = [
+    'test_id', 'collection_date', 'latitude', 'longitude', 'name', 'area', 'gender', 'age', 'address', 'mobile_no',
+    'soil_ph', 'nitrogen', 'phosphorus', 'potassium', 'electrical_conductivity', 'temperature', 'moisture', 'humidity',
+    'soil_health_score', 'crop_recommendations', 'fertilizer_recommendation', 'scoring_version'
+]
+
+# Recommendation text columns of a soil test -> (id column stored in soil_tests, catalog table).
+# Each distinct text is stored once in its catalog; soil_test_details joins them back in.
+recommendation_catalogs = {
+    'crop_recommendations': ('crop_recommendation_id', 'crop_recommendation_texts'),
+    'fertilizer_recommendation': ('fertilizer_recommendation_id', 'fertilizer_recommendation_texts'),
+}
+
+# ALTER TABLE ... DROP COLUMN needs SQLite 3.35; older builds rebuild the table instead
+DROP_COLUMN_VERSION = (3, 35, 0)
+
+_display_date = re.compile(r'^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})$')
+_iso_date = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def iso_date(value):
+    # Collection dates are stored as ISO YYYY-MM-DD text so they sort and range-scan correctly.
+    # The GUI produces DD-MM-YYYY; anything unrecognised is kept as entered.
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    value = str(value).strip()
+    if _iso_date.match(value):
+        return value
+    match = _display_date.match(value)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            return value
+    return value
+
+
+def display_date(value):
+    # ISO date back to the DD-MM-YYYY form used on screen and in reports
+    if value and _iso_date.match(str(value)):
+        year, month, day = str(value).split('-')
+        return f"{day}-{month}-{year}"
+    return value
+
+
+def catalog_id_sql(column):
+    # Placeholder resolving a recommendation text to its catalog id
+    return f"(SELECT id FROM {recommendation_catalogs[column][1]} WHERE text = ?)"
+
+
+def insert_sql(replace=False):
+    # Parameters follow soil_test_columns, recommendation texts included; store_recommendation_texts()
+    # must have added those texts to their catalogs first. A test ID that is already stored raises
+    # sqlite3.IntegrityError, unless replace is set and the stored test's results are replaced.
+    stored = [recommendation_catalogs[column][0] if column in recommendation_catalogs else column
+              for column in soil_test_columns]
+    values = [catalog_id_sql(column) if column in recommendation_catalogs else '?' for column in soil_test_columns]
+    sql = f"INSERT INTO soil_tests ({', '.join(stored)}) VALUES ({', '.join(values)})"
+    if replace:
+        updates = ', '.join(f"{column} = excluded.{column}" for column in stored if column != 'test_id')
+        sql += f" ON CONFLICT(test_id) DO UPDATE SET {updates}"
+    return sql
+
+
+def normalize_test_id(value):
+    # Test IDs are unique, so a blank one is stored as NULL rather than colliding with other blanks
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def stored_test_ids(conn, test_ids, batch_size=500):
+    # The subset of test_ids already present in soil_tests
+    test_ids = [test_id for test_id in set(test_ids) if test_id is not None]
+    found = set()
+    for start in range(0, len(test_ids), batch_size):
+        batch = test_ids[start:start + batch_size]
+        found.update(row[0] for row in conn.execute(
+            f"SELECT test_id FROM soil_tests WHERE test_id IN ({', '.join('?' * len(batch))})", batch))
+    return found
+
+
+def store_recommendation_texts(conn, rows, columns=None):
+    # Add the recommendation texts used by rows (parameter tuples laid out as columns, by default
+    # soil_test_columns) to their catalogs; texts already there keep their id
+    columns = columns or soil_test_columns
+    for column, (_, table) in recommendation_catalogs.items():
+        position = columns.index(column)
+        texts = {row[position] for row in rows if row[position] is not None}
+        conn.executemany(f"INSERT OR IGNORE INTO {table} (text) VALUES (?)", [(text,) for text in texts])
+
+
+def prune_recommendation_texts(conn):
+    # Drop catalog texts no soil test refers to any more, e.g. after rescoring
+    for id_column, table in recommendation_catalogs.values():
+        conn.execute(f'''DELETE FROM {table} WHERE id NOT IN
+                         (SELECT DISTINCT {id_column} FROM soil_tests WHERE {id_column} IS NOT NULL)''')
+
+
+def create_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS soil_tests
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  test_id TEXT,
+                  collection_date TEXT,
+                  latitude REAL,
+                  longitude REAL,
+                  name TEXT,
+                  area REAL,
+                  gender TEXT,
+                  age INTEGER,
+                  address TEXT,
+                  mobile_no TEXT,
+                  soil_ph REAL,
+                  nitrogen REAL,
+                  phosphorus REAL,
+                  potassium REAL,
+                  electrical_conductivity REAL,
+                  temperature REAL,
+                  moisture REAL,
+                  humidity REAL,
+                  soil_health_score REAL(3,2),
+                  crop_recommendations TEXT,
+                  fertilizer_recommendation TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                 (version INTEGER PRIMARY KEY,
+                  description TEXT,
+                  applied_on TEXT)''')
+
+
+def migrate_iso_dates(conn):
+    rows = conn.execute("SELECT id, collection_date FROM soil_tests WHERE collection_date IS NOT NULL").fetchall()
+    updates = [(iso_date(collection_date), record_id) for record_id, collection_date in rows
+               if iso_date(collection_date) != collection_date]
+    conn.executemany("UPDATE soil_tests SET collection_date = ? WHERE id = ?", updates)
+
+
+def migrate_indexes(conn):
+    # Older databases hold repeated test IDs; the newest row keeps the ID and earlier ones get an "-<id>" suffix.
+    # Blank IDs become NULL first, since they identify nothing.
+    conn.execute("UPDATE soil_tests SET test_id = NULL WHERE TRIM(test_id) = ''")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_soil_tests_test_id_dedupe ON soil_tests (test_id, id)")
+    conn.execute('''UPDATE soil_tests SET test_id = test_id || '-' || id
+                    WHERE test_id IS NOT NULL
+                      AND id < (SELECT MAX(newer.id) FROM soil_tests AS newer
+                                WHERE newer.test_id = soil_tests.test_id)''')
+    conn.execute("DROP INDEX ix_soil_tests_test_id_dedupe")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_soil_tests_test_id ON soil_tests (test_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_soil_tests_name ON soil_tests (name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_soil_tests_collection_date ON soil_tests (collection_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_soil_tests_score ON soil_tests (soil_health_score)")
+
+
+def migrate_scoring_version(conn):
+    # Rows scored before versions were recorded keep NULL, which the rescoring job treats as stale
+    conn.execute("ALTER TABLE soil_tests ADD COLUMN scoring_version TEXT")
+    conn.execute('''CREATE TABLE IF NOT EXISTS scoring_versions
+                 (version TEXT PRIMARY KEY,
+                  scoring_mode TEXT,
+                  weights TEXT,
+                  crop_recommendations TEXT,
+                  fertilizer_recommendations TEXT,
+                  created_on TEXT)''')
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_soil_tests_scoring_version ON soil_tests (scoring_version)")
+
+
+def record_scoring_version(conn, scoring_mode='linear'):
+    # Register the current scoring version with what it was computed from, and return its id
+    from assessment import scoring_provenance, scoring_version
+    provenance = scoring_provenance(scoring_mode)
+    version = scoring_version(scoring_mode)
+    conn.execute("INSERT OR IGNORE INTO scoring_versions VALUES (?, ?, ?, ?, ?, ?)",
+                 (version, scoring_mode, provenance['weights'], provenance['crop_recommendations'],
+                  provenance['fertilizer_recommendations'], datetime.now().isoformat(timespec='seconds')))
+    return version
+
+
+def migrate_recommendation_catalogs(conn):
+    # Move recommendation texts into their catalogs (ids in order of first use), point every row at
+    # them and drop the text columns. soil_test_details keeps the old row shape for readers.
+    for column, (id_column, table) in recommendation_catalogs.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE)")
+        conn.execute(f'''INSERT OR IGNORE INTO {table} (text)
+                         SELECT {column} FROM soil_tests WHERE {column} IS NOT NULL
+                         GROUP BY {column} ORDER BY MIN(id)''')
+        conn.execute(f"ALTER TABLE soil_tests ADD COLUMN {id_column} INTEGER REFERENCES {table} (id)")
+        conn.execute(f"UPDATE soil_tests SET {id_column} = (SELECT id FROM {table} WHERE text = soil_tests.{column})")
+    drop_soil_test_columns(conn, list(recommendation_catalogs))
+    conn.execute('''CREATE VIEW IF NOT EXISTS soil_test_details AS
+                    SELECT soil_tests.id, test_id, collection_date, latitude, longitude, name, area, gender, age,
+                           address, mobile_no, soil_ph, nitrogen, phosphorus, potassium, electrical_conductivity,
+                           temperature, moisture, humidity, soil_health_score,
+                           crop.text AS crop_recommendations, fertilizer.text AS fertilizer_recommendation,
+                           scoring_version
+                    FROM soil_tests
+                    LEFT JOIN crop_recommendation_texts AS crop ON crop.id = soil_tests.crop_recommendation_id
+                    LEFT JOIN fertilizer_recommendation_texts AS fertilizer
+                           ON fertilizer.id = soil_tests.fertilizer_recommendation_id''')
+
+
+def drop_soil_test_columns(conn, columns):
+    if sqlite3.sqlite_version_info >= DROP_COLUMN_VERSION:
+        for column in columns:
+            conn.execute(f"ALTER TABLE soil_tests DROP COLUMN {column}")
+    else:
+        rebuild_soil_tests(conn, columns)
+
+
+def rebuild_soil_tests(conn, dropped):
+    # The documented way to drop columns without DROP COLUMN: copy the remaining columns into a new
+    # table, drop the old one and rename the copy. Indexes and triggers on soil_tests (search and
+    # spatial) go with the old table and are recreated from their stored SQL; ids and the
+    # AUTOINCREMENT sequence are kept, so the FTS and R*Tree tables still line up.
+    references = {id_column: table for id_column, table in recommendation_catalogs.values()}
+    definitions, kept = [], []
+    for _, name, column_type, _, _, primary_key in conn.execute("PRAGMA table_info(soil_tests)"):
+        if name in dropped:
+            continue
+        definition = f"{name} {column_type}".strip()
+        if primary_key:
+            definition += " PRIMARY KEY AUTOINCREMENT"
+        elif name in references:
+            definition += f" REFERENCES {references[name]} (id)"
+        definitions.append(definition)
+        kept.append(name)
+    dependents = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'soil_tests' AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL ORDER BY type, name")]
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'soil_tests'").fetchone()
+    columns = ', '.join(kept)
+    conn.execute(f"CREATE TABLE soil_tests_rebuild ({', '.join(definitions)})")
+    conn.execute(f"INSERT INTO soil_tests_rebuild ({columns}) SELECT {columns} FROM soil_tests")
+    conn.execute("DROP TABLE soil_tests")
+    conn.execute("ALTER TABLE soil_tests_rebuild RENAME TO soil_tests")
+    if sequence is not None:
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'soil_tests'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) SELECT 'soil_tests', MAX(?, COALESCE(MAX(id), 0)) "
+                     "FROM soil_tests", sequence)
+    for sql in dependents:
+        conn.execute(sql)
+
+
+def migrate_unscorable(conn):
+    # Rows the rescoring job could not score keep their stored results; the flag records that they
+    # were checked under their scoring_version, so later runs skip them until the version changes
+    conn.execute("ALTER TABLE soil_tests ADD COLUMN unscorable INTEGER NOT NULL DEFAULT 0")
+
+
+def migrate_search_index(conn):
+    create_search_index(conn)
+
+
+def migrate_spatial_index(conn):
+    create_spatial_index(conn)
+
+
+# (version, description, migration) in the order they are applied
+migrations = [
+    (1, "Store collection dates as ISO YYYY-MM-DD", migrate_iso_dates),
+    (2, "Unique test_id and lookup indexes", migrate_indexes),
+    (3, "FTS5 search index over name, address, test_id and mobile_no", migrate_search_index),
+    (4, "R*Tree spatial index over sample coordinates", migrate_spatial_index),
+    (5, "Scoring version on every soil test", migrate_scoring_version),
+    (6, "Recommendation texts in catalog tables, soil_test_details view", migrate_recommendation_catalogs),
+    (7, "Unscorable flag for rows the rescoring job could not score", migrate_unscorable),
+]
+
+
+def schema_version(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate():
+    # Apply every pending migration, each in its own transaction
+    with transaction() as conn:
+        create_tables(conn)
+    for version, description, migration in migrations:
+        with transaction() as conn:
+            if version <= schema_version(conn):
+                continue
+            migration(conn)
+            conn.execute("INSERT INTO schema_version (version, description, applied_on) VALUES (?, ?, ?)",
+                         (version, description, datetime.now().isoformat(timespec='seconds')))
@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+import numpy as np
+from indicators import indicator_bounds
+from fahp import fahp_weights, matrix_fingerprint
+from recommendations import crop_index, fertilizer_index
+from assessment import (indicator_array, assess_batch, rating_labels, rating_thresholds, NO_CROP_RECOMMENDATION)
+from fertilizer_recommendations import NO_FERTILIZER_RECOMMENDATION
+
+# Precomputed score lookup over binned indicator values, for high-volume screening:
+#   python score_table.py [score_table.npy]      build the table (plus score_table.json metadata)
+# Each cell of the dense table (one axis per indicator) holds the FAHP score at the centre of its
+# bins, the rating and the crop / fertilizer recommendation segments of that score. A query is
+# one np.digitize per indicator and a gather from the memory-mapped table.
+#
+# Error bound: the score is a weighted sum of normalized indicator values, so a sample anywhere in
+# a cell differs from the cell's centre score by at most
+#     sum(weight[i] * bin_width[i] / (2 * (max[i] - min[i])))
+# over the cell's bins. That bound is stored per cell ('error') and its maximum in the metadata.
+# A cell is 'exact' when the whole score interval it spans has one rating and one set of
+# recommendations; lookup() recomputes non-exact cells with exact FAHP unless told not to.
+
+# Bin edges default to the fuzzy comparison dataset's ranges (five bins per indicator)
+from fuzzy_comparison_matrix import default_indicators as dataset_indicators
+
+table_fields = [('score', np.float64), ('error', np.float32), ('rating', np.int8), ('crop', np.int16),
+                ('fertilizer', np.int16), ('exact', np.bool_)]
+
+
+def range_edges(ranges):
+    # Inner bin edges from range labels such as '<5.5', '5.5-6.5', '>8.5'
+    edges = set()
+    for label in ranges:
+        for part in label.lstrip('<>').split('-'):
+            edges.add(float(part))
+    return sorted(edges)
+
+
+def dataset_edges():
+    return [range_edges(indicator['ranges']) for indicator in dataset_indicators]
+
+
+def uniform_edges(bins):
+    # bins equal-width bins across each indicator's valid range
+    min_values, max_values = indicator_bounds()
+    return [np.linspace(low, high, bins + 1)[1:-1].tolist() for low, high in zip(min_values, max_values)]
+
+
+def bin_spans(edges):
+    # Normalized (lower, upper) of every bin of every indicator, clipped to the valid range;
+    # np.digitize puts x in bin b when lower <= x < upper
+    min_values, max_values = indicator_bounds()
+    spans = []
+    for inner, low, high in zip(edges, min_values, max_values):
+        bounds = np.clip(np.array([low] + list(inner) + [high], dtype=float), low, high)
+        normalized = (bounds - low) / (high - low)
+        spans.append((normalized[:-1], normalized[1:]))
+    return spans
+
+
+def table_metadata(edges, weights):
+    return {
+        'edges': [list(map(float, inner)) for inner in edges],
+        'weights': matrix_fingerprint(weights),
+        'crop_version': crop_index.version(),
+        'fertilizer_version': fertilizer_index.version(),
+    }
+
+
+def build_table(path='score_table.npy', edges=None):
+    # Fill the table one slab of the first indicator at a time, so peak memory is one slab
+    from numpy.lib.format import open_memmap
+    edges = edges if edges is not None else dataset_edges()
+    weights = fahp_weights()
+    spans = bin_spans(edges)
+    shape = tuple(len(inner) + 1 for inner in edges)
+    table = open_memmap(path, mode='w+', dtype=table_fields, shape=shape)
+
+    # Weighted contribution of each bin's lower and upper edge; every indicator after the first is
+    # shaped to broadcast along its own axis of a slab
+    lower, upper = [weights[0] * spans[0][0]], [weights[0] * spans[0][1]]
+    for axis in range(1, len(shape)):
+        view = [1] * (len(shape) - 1)
+        view[axis - 1] = shape[axis]
+        lower.append((weights[axis] * spans[axis][0]).reshape(view))
+        upper.append((weights[axis] * spans[axis][1]).reshape(view))
+
+    rating_breaks = np.asarray(rating_thresholds)
+    for first in range(shape[0]):
+        score_low = lower[0][first] + sum(lower[1:])
+        score_high = upper[0][first] + sum(upper[1:])
+        score = (score_low + score_high) / 2
+        slab = table[first]
+        slab['score'] = score
+        slab['error'] = (score_high - score_low) / 2
+        slab['rating'] = np.searchsorted(rating_breaks, score, side='right')
+        slab['crop'] = crop_index.lookup_segments(score)
+        slab['fertilizer'] = fertilizer_index.lookup_segments(score)
+        # Ratings and segments only ever increase with the score, so equal ends mean one value throughout
+        slab['exact'] = ((np.searchsorted(rating_breaks, score_low, side='right') ==
+                          np.searchsorted(rating_breaks, score_high, side='right')) &
+                         (crop_index.lookup_segments(score_low) == crop_index.lookup_segments(score_high)) &
+                         (fertilizer_index.lookup_segments(score_low) ==
+                          fertilizer_index.lookup_segments(score_high)))
+    table.flush()
+
+    metadata = table_metadata(edges, weights)
+    metadata['max_error'] = float(table['error'].max())
+    metadata['exact_fraction'] = float(table['exact'].mean())
+    del table
+    with open(metadata_path(path), 'w', encoding='utf-8') as file:
+        json.dump(metadata, file, indent=2)
+    return metadata
+
+
+def metadata_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+class ScoreTable:
+    def __init__(self, path='score_table.npy'):
+        with open(metadata_path(path), encoding='utf-8') as file:
+            self.metadata = json.load(file)
+        self.table = np.load(path, mmap_mode='r')
+        self.edges = [np.array(inner, dtype=float) for inner in self.metadata['edges']]
+        self.max_error = self.metadata['max_error']
+
+    def is_current(self):
+        # False once the FAHP weights or either recommendation CSV changed since the table was built
+        current = table_metadata(self.metadata['edges'], fahp_weights())
+        return all(self.metadata[key] == value for key, value in current.items() if key != 'edges')
+
+    def cells(self, values):
+        bins = tuple(np.digitize(values[:, axis], inner) for axis, inner in enumerate(self.edges))
+        return self.table.reshape(-1)[np.ravel_multi_index(bins, self.table.shape)]
+
+    def lookup(self, samples, exact_fallback=True):
+        # Same keys as assess_batch plus 'error' (bound on the score error, 0 where recomputed) and
+        # 'crop_recommendations' / 'fertilizer_recommendations' texts
+        values = indicator_array(samples)
+        min_values, max_values = indicator_bounds()
+        with np.errstate(invalid='ignore'):
+            invalid_mask = ~((values >= min_values) & (values <= max_values))
+        valid = ~invalid_mask.any(axis=1)
+
+        cells = self.cells(np.where(invalid_mask, min_values, values))
+        scores = cells['score'].copy()
+        errors = cells['error'].astype(float)
+        ratings = cells['rating'].astype(np.intp)
+        crop_segments = cells['crop'].astype(np.intp)
+        fertilizer_segments = cells['fertilizer'].astype(np.intp)
+
+        if exact_fallback:
+            recompute = valid & ~cells['exact']
+            if recompute.any():
+                exact = assess_batch(values[recompute])['soil_health_score']
+                scores[recompute] = exact
+                errors[recompute] = 0.0
+                ratings[recompute] = np.searchsorted(rating_thresholds, exact, side='right')
+                crop_segments[recompute] = crop_index.lookup_segments(exact)
+                fertilizer_segments[recompute] = fertilizer_index.lookup_segments(exact)
+
+        scores[~valid] = np.nan
+        errors[~valid] = np.nan
+        rating = rating_labels[ratings]
+        rating[~valid] = None
+        return {
+            'soil_health_score': scores,
+            'error': errors,
+            'rating': rating,
+            'crop_recommendations': segment_texts(crop_index, crop_segments, valid, NO_CROP_RECOMMENDATION),
+            'fertilizer_recommendations': segment_texts(fertilizer_index, fertilizer_segments, valid,
+                                                        NO_FERTILIZER_RECOMMENDATION),
+            'valid': valid,
+            'invalid_mask': invalid_mask
+        }
+
+
+def segment_texts(index, segments, valid, default):
+    # Segment -1 (no band applies) picks the default text appended at the end
+    state = index.state()
+    texts = np.array([" ".join(state.recommendations[recommendation_id][2] for recommendation_id in matches)
+                      or default for matches in state.segments] + [default], dtype=object)
+    texts = texts[segments]
+    texts[~valid] = None
+    return texts
+
+
+@lru_cache(maxsize=4)
+def load_score_table(path):
+    # One memory map per process; refuses a table built for other weights or recommendations
+    table = ScoreTable(path)
+    if not table.is_current():
+        raise ValueError(f"{path} is out of date; rebuild it with: python score_table.py {path}")
+    return table
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else 'score_table.npy'
+    start_time = time.perf_counter()
+    metadata = build_table(path)
+    cells = int(np.prod([len(inner) + 1 for inner in metadata['edges']]))
+    print(f"Built {path}: {cells} cells in {time.perf_counter() - start_time:.2f}s")
+    print(f"Score error bound {metadata['max_error']:.4f}; "
+          f"{metadata['exact_fraction']:.1%} of cells have an exact rating and recommendations")
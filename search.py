@@ -0,0 +1,146 @@
+import difflib
+import re
+import sqlite3
+from connection import get_connection
+
+# Farmer and sample fields covered by the full-text index, in index column order
+search_columns = ['name', 'address', 'test_id', 'mobile_no']
+
+_token = re.compile(r'\w+', re.UNICODE)
+
+
+# External-content FTS5 tables over soil_tests and their tokenizers: word/prefix matching, and
+# trigrams for fuzzy matching (the trigram tokenizer needs SQLite 3.34+)
+index_tokenizers = {
+    'soil_tests_fts': 'unicode61 remove_diacritics 2',
+    'soil_tests_trigram': 'trigram',
+}
+trigger_events = ('insert', 'delete', 'update')
+
+
+def create_search_index(conn):
+    # Each table is created together with the triggers keeping it in step with soil_tests and its
+    # initial rebuild, inside a savepoint; a table this SQLite build cannot create (no FTS5, or no
+    # trigram tokenizer) is rolled back entirely. Returns False when the word index is missing, in
+    # which case searches fall back to LIKE.
+    created = {table: create_index_table(conn, table, tokenizer) for table, tokenizer in index_tokenizers.items()}
+    return created['soil_tests_fts']
+
+
+def create_index_table(conn, table, tokenizer):
+    columns = ', '.join(search_columns)
+    new_values = ', '.join(f"new.{column}" for column in search_columns)
+    old_values = ', '.join(f"old.{column}" for column in search_columns)
+    conn.execute(f"SAVEPOINT create_{table}")
+    try:
+        conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+                         {columns}, content='soil_tests', content_rowid='id', tokenize='{tokenizer}')""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON soil_tests BEGIN
+                         INSERT INTO {table} (rowid, {columns}) VALUES (new.id, {new_values});
+                         END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON soil_tests BEGIN
+                         INSERT INTO {table} ({table}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                         END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_update AFTER UPDATE OF {columns} ON soil_tests BEGIN
+                         INSERT INTO {table} ({table}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                         INSERT INTO {table} (rowid, {columns}) VALUES (new.id, {new_values});
+                         END""")
+        conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+    except sqlite3.OperationalError:
+        conn.execute(f"ROLLBACK TO create_{table}")
+        conn.execute(f"RELEASE create_{table}")
+        return False
+    conn.execute(f"RELEASE create_{table}")
+    return True
+
+
+def has_search_index(conn=None, table='soil_tests_fts'):
+    # True only when the table and all three of its triggers exist, so the index is kept in sync
+    conn = conn or get_connection()
+    names = [table] + [f"{table}_{event}" for event in trigger_events]
+    found = conn.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({', '.join('?' * len(names))})",
+                         names).fetchone()[0]
+    return found == len(names)
+
+
+def prefix_query(text):
+    # Every word of the input must match the start of a word in some indexed field. Words are
+    # quoted, so FTS5 operators and punctuation typed by the user are treated as plain text.
+    tokens = _token.findall(text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def trigram_query(text):
+    # Any shared trigram is a candidate; candidates are ranked by bm25 and re-checked in Python
+    text = text.strip().lower()
+    trigrams = {text[i:i + 3] for i in range(len(text) - 2)}
+    return ' OR '.join('"' + trigram.replace('"', '""') + '"' for trigram in sorted(trigrams))
+
+
+def like_clause(text):
+    # Fallback for databases without FTS5, with LIKE wildcards in the input escaped
+    pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    clause = ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in search_columns)
+    return f"({clause})", [pattern] * len(search_columns)
+
+
+def filter_clause(text):
+    # WHERE fragment restricting soil_tests to rows whose farmer/sample fields match the text by prefix
+    text = text.strip()
+    query = prefix_query(text)
+    if query and has_search_index():
+        return "id IN (SELECT rowid FROM soil_tests_fts WHERE soil_tests_fts MATCH ?)", [query]
+    return like_clause(text)
+
+
+def search_ids(text, limit=50, fuzzy=False, ranked=False, min_similarity=0.6):
+    # soil_tests ids matching the text. Prefix matches come newest first, or best first when ranked;
+    # ranking scores every match, so it is slower for very common words.
+    conn = get_connection()
+    text = text.strip()
+    if not text:
+        return []
+    if not has_search_index(conn):
+        clause, parameters = like_clause(text)
+        return [row[0] for row in conn.execute(f"SELECT id FROM soil_tests WHERE {clause} LIMIT ?",
+                                               parameters + [limit])]
+    if not fuzzy:
+        query = prefix_query(text)
+        if not query:
+            return []
+        order = "rank" if ranked else "rowid DESC"
+        return [row[0] for row in conn.execute(
+            f"SELECT rowid FROM soil_tests_fts WHERE soil_tests_fts MATCH ? ORDER BY {order} LIMIT ?", (query, limit))]
+
+    # Too short for trigrams, or no trigram index: a prefix search is the closest useful match
+    if len(text) < 3 or not has_search_index(conn, 'soil_tests_trigram'):
+        return search_ids(text, limit)
+    columns = ', '.join(search_columns)
+    candidates = conn.execute(
+        f"SELECT rowid, {columns} FROM soil_tests_trigram WHERE soil_tests_trigram MATCH ? ORDER BY rank LIMIT ?",
+        (trigram_query(text), limit * 10)).fetchall()
+    scored = []
+    needle = text.lower()
+    for row in candidates:
+        similarity = max((field_similarity(needle, str(value).lower()) for value in row[1:] if value is not None),
+                         default=0)
+        if similarity >= min_similarity:
+            scored.append((-similarity, row[0]))
+    scored.sort()
+    return [record_id for _, record_id in scored[:limit]]
+
+
+def field_similarity(needle, value):
+    # Best match of the needle against the field as a whole or against any of its words
+    candidates = [value] + _token.findall(value)
+    return max(difflib.SequenceMatcher(None, needle, candidate).ratio() for candidate in candidates)
+
+
+def search_tests(text, limit=50, fuzzy=False, ranked=False):
+    ids = search_ids(text, limit, fuzzy, ranked)
+    if not ids:
+        return []
+    rows = get_connection().execute(
+        f"SELECT * FROM soil_test_details WHERE id IN ({', '.join('?' * len(ids))})", ids).fetchall()
+    order = {record_id: position for position, record_id in enumerate(ids)}
+    return sorted(rows, key=lambda row: order[row[0]])
@@ -0,0 +1,178 @@
+import numpy as np
+from indicators import soil_indicators, indicator_columns
+from fahp import predefined_fuzzy_comparison_matrix, fahp_weights, evaluate_soil_health_masked
+from assessment import assess_batch, rating_thresholds, rating_labels
+from connection import get_connection
+from schema import migrate
+
+# Monte Carlo sensitivity of FAHP weights and ratings to the expert comparison matrix:
+#   python cli.py sensitivity --draws 10000 --workers 4
+# Each draw replaces every judgment above the diagonal by a triangular fuzzy number nested inside the
+# expert's (l, m, u): m' follows a triangular distribution on [l, u] peaking at m, then l' and u' are
+# uniform on [l, m'] and [m', u]. The entries below the diagonal stay reciprocal. Weights for a block
+# of draws come from one vectorized pass of the geometric-mean method in log space, and every stored
+# sample is re-rated with every draw's weights to count how often its rating changes.
+
+DEFAULT_DRAWS = 5000
+CHUNK_DRAWS = 1000
+# Score cells held at once while re-rating stored samples (samples x draws)
+RATING_BLOCK_CELLS = 2_000_000
+
+# Normalized stored samples and their baseline ratings, set once per process by init_worker
+_samples = None
+
+
+def perturbed_matrices(matrix, draws, rng):
+    # (draws, n, n, 3) log-matrices of perturbed TFNs
+    matrix = np.asarray(matrix, dtype=float)
+    n = matrix.shape[0]
+    rows, columns = np.triu_indices(n, 1)
+    low, mode, high = (matrix[rows, columns, component] for component in range(3))
+    spread = high - low
+
+    # Inverse-CDF triangular draw, which also copes with crisp judgments (l == m == u)
+    peak = np.divide(mode - low, spread, out=np.zeros_like(spread), where=spread > 0)
+    uniform = rng.random((draws, len(rows)))
+    modes = np.where(uniform < peak,
+                     low + np.sqrt(uniform * spread * (mode - low)),
+                     high - np.sqrt((1 - uniform) * spread * (high - mode)))
+    lows = low + rng.random((draws, len(rows))) * (modes - low)
+    highs = modes + rng.random((draws, len(rows))) * (high - modes)
+
+    upper = np.log(np.stack([lows, modes, highs], axis=-1))
+    log_matrices = np.zeros((draws, n, n, 3))
+    log_matrices[:, rows, columns] = upper
+    log_matrices[:, columns, rows] = -upper[..., ::-1]  # (1/u, 1/m, 1/l)
+    return log_matrices
+
+
+def batch_weights(log_matrices):
+    # fahp.compute_fahp_weights for a stack of log-matrices: row geometric means are exp(mean(log))
+    geometric_means = np.exp(log_matrices.mean(axis=2))
+    fuzzy = geometric_means / geometric_means.sum(axis=1, keepdims=True)
+    weights = fuzzy.mean(axis=2)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def stored_samples(scoring_mode='linear'):
+    # (ids, normalized values with NaN where not measured) of every scorable soil test
+    migrate()
+    conn = get_connection()
+    cursor = conn.execute(f"SELECT id, {', '.join(indicator_columns)} FROM soil_tests ORDER BY id")
+    ids, values = [], []
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            break
+        ids.extend(row[0] for row in rows)
+        values.extend([np.nan if value is None else value for value in row[1:]] for row in rows)
+    values = np.array(values, dtype=float).reshape(-1, len(soil_indicators))
+    results = assess_batch(values, allow_missing=True, scoring_mode=scoring_mode)
+    return np.array(ids)[results['valid']], results['normalized_values'][results['valid']]
+
+
+def rating_codes(scores):
+    return np.searchsorted(rating_thresholds, scores, side='right')
+
+
+def init_worker(samples):
+    # samples: (normalized values, baseline rating codes); sent to each worker process once
+    global _samples
+    values, baseline = samples
+    present = ~np.isnan(values)
+    _samples = (np.where(present, values, 0.0), present.astype(float), baseline)
+
+
+def run_chunk(matrix, seed, draws):
+    # Weights of one block of draws, with per-draw and per-sample rating flip counts
+    rng = np.random.default_rng(seed)
+    weights = batch_weights(perturbed_matrices(matrix, draws, rng))
+    values, present, baseline = _samples
+    sample_flips = np.zeros(len(values), dtype=np.int64)
+    draw_flips = np.zeros(draws, dtype=np.int64)
+    upgrades = downgrades = 0
+    if len(values):
+        block = max(1, RATING_BLOCK_CELLS // len(values))
+        for start in range(0, draws, block):
+            block_weights = weights[start:start + block]
+            # Weights renormalized over each sample's measured indicators, as in assess_batch
+            scores = (values @ block_weights.T) / (present @ block_weights.T)
+            codes = rating_codes(scores)
+            changed = codes != baseline[:, None]
+            sample_flips += changed.sum(axis=1)
+            draw_flips[start:start + block] = changed.sum(axis=0)
+            upgrades += int((codes > baseline[:, None]).sum())
+            downgrades += int((codes < baseline[:, None]).sum())
+    return weights, sample_flips, draw_flips, upgrades, downgrades
+
+
+def run_sensitivity(draws=DEFAULT_DRAWS, seed=None, workers=None, chunk_draws=CHUNK_DRAWS, scoring_mode='linear',
+                    matrix=None, samples=None):
+    # samples: (ids, normalized values) to re-rate, by default every scorable stored soil test.
+    # Draw blocks get independent child seeds, so a seed gives the same result for any worker count.
+    if draws < 1:
+        raise ValueError(f"Sensitivity analysis needs at least one draw, got {draws}")
+    matrix = np.asarray(matrix if matrix is not None else predefined_fuzzy_comparison_matrix(), dtype=float)
+    baseline_weights = fahp_weights(matrix)
+    ids, values = samples if samples is not None else stored_samples(scoring_mode)
+    baseline_scores = evaluate_soil_health_masked(values, ~np.isnan(values), baseline_weights)
+    worker_samples = (values, rating_codes(baseline_scores))
+
+    sizes = [min(chunk_draws, draws - start) for start in range(0, draws, chunk_draws)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(worker_samples,)) as executor:
+            chunks = list(executor.map(run_chunk, [matrix] * len(sizes), seeds, sizes))
+    else:
+        init_worker(worker_samples)
+        chunks = [run_chunk(matrix, chunk_seed, size) for chunk_seed, size in zip(seeds, sizes)]
+
+    weights = np.concatenate([chunk[0] for chunk in chunks])
+    sample_flips = sum(chunk[1] for chunk in chunks)
+    draw_flips = np.concatenate([chunk[2] for chunk in chunks])
+    baseline_ranks = np.argsort(np.argsort(-baseline_weights))
+    ranks = np.argsort(np.argsort(-weights, axis=1), axis=1)
+    cells = max(len(values) * draws, 1)
+    return {
+        'draws': draws,
+        'samples': len(values),
+        'indicators': [indicator.name for indicator in soil_indicators],
+        'baseline_weights': baseline_weights,
+        'weight_mean': weights.mean(axis=0),
+        'weight_std': weights.std(axis=0),
+        'weight_percentiles': dict(zip((5, 50, 95), np.percentile(weights, [5, 50, 95], axis=0))),
+        'rank_stability': (ranks == baseline_ranks).mean(axis=0),
+        'top_indicator_share': np.bincount(weights.argmax(axis=1), minlength=weights.shape[1]) / draws,
+        'flip_rate': sample_flips.sum() / cells,
+        'upgrade_rate': sum(chunk[3] for chunk in chunks) / cells,
+        'downgrade_rate': sum(chunk[4] for chunk in chunks) / cells,
+        'draw_flip_rates': draw_flips / max(len(values), 1),
+        'sample_ids': ids,
+        'sample_flip_rates': sample_flips / draws,
+        'baseline_ratings': rating_labels[worker_samples[1]],
+    }
+
+
+def format_report(result, most_sensitive=10):
+    lines = [f"{result['draws']} perturbed comparison matrices, {result['samples']} stored samples", "",
+             f"{'Indicator':<32}{'Baseline':>9}{'Mean':>8}{'Std':>8}{'5%':>8}{'95%':>8}{'Same rank':>11}"]
+    percentiles = result['weight_percentiles']
+    for i, name in enumerate(result['indicators']):
+        lines.append(f"{name:<32}{result['baseline_weights'][i]:>9.4f}{result['weight_mean'][i]:>8.4f}"
+                     f"{result['weight_std'][i]:>8.4f}{percentiles[5][i]:>8.4f}{percentiles[95][i]:>8.4f}"
+                     f"{result['rank_stability'][i]:>10.1%}")
+    if result['samples']:
+        draw_rates = result['draw_flip_rates']
+        lines += ["", f"Rating flips: {result['flip_rate']:.2%} of sample-draw pairs "
+                      f"({result['upgrade_rate']:.2%} up, {result['downgrade_rate']:.2%} down); "
+                      f"per draw median {np.median(draw_rates):.2%}, 95th percentile {np.percentile(draw_rates, 95):.2%}",
+                  f"Samples whose rating never changes: {np.mean(result['sample_flip_rates'] == 0):.1%}", "",
+                  "Most sensitive samples:"]
+        order = np.argsort(-result['sample_flip_rates'], kind='stable')[:most_sensitive]
+        for position in order:
+            if result['sample_flip_rates'][position] == 0:
+                break
+            lines.append(f"  id {result['sample_ids'][position]}: {result['baseline_ratings'][position]}, "
+                         f"rating changes in {result['sample_flip_rates'][position]:.1%} of draws")
+    return "\n".join(lines)
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import math
+import time
+from http import HTTPStatus
+import numpy as np
+from indicators import soil_indicators, indicator_columns
+from assessment import (assess_batch, generate_crop_recommendations_batch,
+                        generate_fertilizer_recommendations_batch)
+
+# Headless scoring service. Only the scoring core is imported here: no Tk, matplotlib or pywin32.
+#   POST /score        {"indicators": [8 values] or {"soil_ph": ..., ...}}
+#   POST /score/batch  {"samples": [indicators, ...]}
+#   GET  /metrics      request latency and batch size histograms (Prometheus text format)
+#   GET  /health
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_BATCH_SAMPLES = 100000
+
+# Endpoints, also the only values of the latency histogram's path label; anything else is 'other'
+routes = ('/score', '/score/batch', '/metrics', '/health')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 10000, 100000)
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        counts, total = self.series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+        # Cumulative counts are worked out at exposition time; here only the first matching bucket is bumped
+        position = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        counts[position] += 1
+        self.series[key] = (counts, total + value)
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.series.items()):
+            labels = ''.join(f'{name}="{value}",' for name, value in key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+            label_text = f"{{{labels.rstrip(',')}}}" if labels else ''
+            lines.append(f"{self.name}_sum{label_text} {total}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return '\n'.join(lines)
+
+
+request_latency = Histogram('shds_request_seconds', 'HTTP request latency in seconds', LATENCY_BUCKETS)
+scoring_latency = Histogram('shds_scoring_seconds', 'Time spent in one vectorized scoring call', LATENCY_BUCKETS)
+batch_sizes = Histogram('shds_scoring_batch_samples', 'Samples per vectorized scoring call', BATCH_SIZE_BUCKETS)
+
+
+def sample_values(sample):
+    # One sample as 8 floats in indicator order; missing values become NaN and are reported as invalid
+    if isinstance(sample, dict):
+        sample = [sample.get(column) for column in indicator_columns]
+    if not isinstance(sample, (list, tuple)) or len(sample) != len(soil_indicators):
+        raise RequestError(HTTPStatus.BAD_REQUEST,
+                           f"Each sample needs {len(soil_indicators)} indicator values: {', '.join(indicator_columns)}")
+    try:
+        return [math.nan if value is None else float(value) for value in sample]
+    except (TypeError, ValueError):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Indicator values must be numbers")
+
+
+def score_samples(values):
+    # Score an (N, 8) array in one vectorized pass; runs on an executor thread
+    start_time = time.perf_counter()
+    results = assess_batch(values)
+    scores = results['soil_health_score']
+    crop_recommendations = generate_crop_recommendations_batch(scores)
+    fertilizer_recommendations = generate_fertilizer_recommendations_batch(scores)
+    scored = []
+    for row, valid in enumerate(results['valid']):
+        if not valid:
+            invalid = [indicator.name for indicator, flag in zip(soil_indicators, results['invalid_mask'][row]) if flag]
+            scored.append({'valid': False, 'error': f"Missing or out of range: {', '.join(invalid)}"})
+            continue
+        scored.append({
+            'valid': True,
+            'soil_health_score': float(scores[row]),
+            'rating': results['rating'][row],
+            'crop_recommendations': crop_recommendations[row],
+            'fertilizer_recommendation': fertilizer_recommendations[row],
+            'normalized_values': results['normalized_values'][row].tolist()
+        })
+    scoring_latency.observe(time.perf_counter() - start_time)
+    batch_sizes.observe(len(scored))
+    return scored
+
+
+class ScoringCoalescer:
+    # Single-sample requests arriving close together are scored as one vectorized batch. A batch is
+    # flushed when it reaches max_batch samples or max_delay seconds after its first sample arrived.
+    def __init__(self, limiter, max_batch=256, max_delay=0.002):
+        self.limiter = limiter
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.worker = None
+        # The event loop only keeps weak references to tasks, so running flushes are held here
+        self.flushes = set()
+
+    def start(self):
+        self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, values):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((values, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(pending) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            flush = asyncio.create_task(self.flush(pending))
+            self.flushes.add(flush)
+            flush.add_done_callback(self.flushes.discard)
+
+    async def flush(self, pending):
+        values = np.array([values for values, _ in pending], dtype=float)
+        try:
+            async with self.limiter:
+                results = await asyncio.get_running_loop().run_in_executor(None, score_samples, values)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class ScoringService:
+    def __init__(self, max_concurrency=4, max_batch=256, max_delay=0.002):
+        # Bounds how many vectorized scoring calls run at once across both endpoints
+        self.limiter = asyncio.Semaphore(max_concurrency)
+        self.coalescer = ScoringCoalescer(self.limiter, max_batch, max_delay)
+
+    async def score_one(self, body):
+        if not isinstance(body, dict) or 'indicators' not in body:
+            raise RequestError(HTTPStatus.BAD_REQUEST, 'Expected {"indicators": [...]}')
+        return await self.coalescer.score(sample_values(body['indicators']))
+
+    async def score_batch(self, body):
+        if not isinstance(body, dict) or not isinstance(body.get('samples'), list):
+            raise RequestError(HTTPStatus.BAD_REQUEST, 'Expected {"samples": [[...], ...]}')
+        if len(body['samples']) > MAX_BATCH_SAMPLES:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                               f"At most {MAX_BATCH_SAMPLES} samples per request")
+        if not body['samples']:
+            return {'results': []}
+        values = np.array([sample_values(sample) for sample in body['samples']], dtype=float)
+        async with self.limiter:
+            results = await asyncio.get_running_loop().run_in_executor(None, score_samples, values)
+        return {'results': results}
+
+    def metrics(self):
+        return '\n'.join(histogram.exposition() for histogram in (request_latency, scoring_latency, batch_sizes)) + '\n'
+
+    async def route(self, method, path, body):
+        if path == '/score' and method == 'POST':
+            return HTTPStatus.OK, 'application/json', await self.score_one(parse_json(body))
+        if path == '/score/batch' and method == 'POST':
+            return HTTPStatus.OK, 'application/json', await self.score_batch(parse_json(body))
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, 'text/plain; version=0.0.4', self.metrics()
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, 'application/json', {'status': 'ok'}
+        if path in routes:
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No such endpoint: {path}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                start_time = time.perf_counter()
+                try:
+                    status, content_type, payload = await self.route(method, path, body)
+                except RequestError as e:
+                    status, content_type, payload = e.status, 'application/json', {'error': str(e)}
+                except Exception as e:
+                    status, content_type, payload = HTTPStatus.INTERNAL_SERVER_ERROR, 'application/json', {'error': str(e)}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await write_response(writer, status, content_type, payload, keep_alive)
+                request_latency.observe(time.perf_counter() - start_time, path=path if path in routes else 'other',
+                                        status=int(status))
+                if not keep_alive:
+                    break
+        except RequestError as e:
+            await write_response(writer, e.status, 'application/json', {'error': str(e)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def parse_json(body):
+    try:
+        return json.loads(body or b'null')
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON")
+
+
+async def read_request(reader):
+    # Minimal HTTP/1.1 request reader: request line, headers and a Content-Length body
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Incomplete request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large")
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed Content-Length header")
+    if length < 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed Content-Length header")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+async def write_response(writer, status, content_type, payload, keep_alive):
+    body = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_concurrency=4, max_batch=256, max_delay=0.002):
+    service = ScoringService(max_concurrency, max_batch, max_delay)
+    service.coalescer.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Scoring service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.coalescer.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless soil health scoring service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-concurrency', type=int, default=4, help="Scoring calls running at once")
+    parser.add_argument('--max-batch', type=int, default=256, help="Most single requests coalesced into one batch")
+    parser.add_argument('--max-delay-ms', type=float, default=2.0, help="Longest wait for a batch to fill")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_concurrency, args.max_batch, args.max_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,163 @@
+import math
+import sqlite3
+import numpy as np
+from connection import get_connection
+from assessment import generate_ratings, rating_labels
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+# Half of Earth's circumference: no two points are further apart than this
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def create_spatial_index(conn):
+    # R*Tree over sample coordinates kept in sync by triggers. Returns False when this SQLite build
+    # has no R*Tree module, in which case a (latitude, longitude) B-tree index is used instead.
+    try:
+        conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS soil_tests_rtree
+                        USING rtree(id, min_latitude, max_latitude, min_longitude, max_longitude)''')
+    except sqlite3.OperationalError:
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_soil_tests_location ON soil_tests (latitude, longitude)")
+        return False
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS soil_tests_rtree_insert AFTER INSERT ON soil_tests
+                    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+                    INSERT INTO soil_tests_rtree VALUES (new.id, new.latitude, new.latitude,
+                                                         new.longitude, new.longitude);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS soil_tests_rtree_delete AFTER DELETE ON soil_tests BEGIN
+                    DELETE FROM soil_tests_rtree WHERE id = old.id;
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS soil_tests_rtree_update AFTER UPDATE OF latitude, longitude
+                    ON soil_tests BEGIN
+                    DELETE FROM soil_tests_rtree WHERE id = old.id;
+                    INSERT INTO soil_tests_rtree SELECT new.id, new.latitude, new.latitude,
+                                                        new.longitude, new.longitude
+                    WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+                    END''')
+    conn.execute('''INSERT OR REPLACE INTO soil_tests_rtree
+                    SELECT id, latitude, latitude, longitude, longitude FROM soil_tests
+                    WHERE latitude IS NOT NULL AND longitude IS NOT NULL''')
+    return True
+
+
+def has_spatial_index(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'soil_tests_rtree'").fetchone() is not None
+
+
+def bounding_box_clause(conn, min_latitude, min_longitude, max_latitude, max_longitude):
+    # The R*Tree stores 32-bit floats rounded outwards, so rows are re-checked against the exact box
+    exact = "latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?"
+    parameters = [min_latitude, max_latitude, min_longitude, max_longitude]
+    if has_spatial_index(conn):
+        return (f"id IN (SELECT id FROM soil_tests_rtree WHERE max_latitude >= ? AND min_latitude <= ? "
+                f"AND max_longitude >= ? AND min_longitude <= ?) AND {exact}"), parameters + parameters
+    return exact, parameters
+
+
+def bounding_box_query(min_latitude, min_longitude, max_latitude, max_longitude, columns='*'):
+    conn = get_connection()
+    clause, parameters = bounding_box_clause(conn, min_latitude, min_longitude, max_latitude, max_longitude)
+    return conn.execute(f"SELECT {columns} FROM soil_test_details WHERE {clause}", parameters).fetchall()
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    latitudes, longitudes = np.radians(np.asarray(latitudes, dtype=float)), np.radians(np.asarray(longitudes, dtype=float))
+    a = (np.sin((latitudes - latitude) / 2) ** 2 +
+         np.cos(latitude) * np.cos(latitudes) * np.sin((longitudes - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def radius_box(latitude, longitude, radius_km):
+    # Bounding box in degrees that contains every point within radius_km
+    latitude_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    min_latitude, max_latitude = latitude - latitude_delta, latitude + latitude_delta
+    if min_latitude <= -90 or max_latitude >= 90:
+        return max(min_latitude, -90), -180, min(max_latitude, 90), 180
+    longitude_delta = latitude_delta / max(math.cos(math.radians(max(abs(min_latitude), abs(max_latitude)))), 1e-12)
+    if longitude_delta >= 180:
+        return min_latitude, -180, max_latitude, 180
+    return min_latitude, longitude - longitude_delta, max_latitude, longitude + longitude_delta
+
+
+def radius_candidates(latitude, longitude, radius_km):
+    box = radius_box(latitude, longitude, radius_km)
+    boxes = [box]
+    # Split boxes that cross the antimeridian into two
+    if box[1] < -180:
+        boxes = [(box[0], box[1] + 360, box[2], 180), (box[0], -180, box[2], box[3])]
+    elif box[3] > 180:
+        boxes = [(box[0], box[1], box[2], 180), (box[0], -180, box[2], box[3] - 360)]
+    rows = []
+    for min_latitude, min_longitude, max_latitude, max_longitude in boxes:
+        rows.extend(bounding_box_query(min_latitude, min_longitude, max_latitude, max_longitude,
+                                       columns='id, latitude, longitude'))
+    return rows
+
+
+def radius_ids(latitude, longitude, radius_km):
+    # (id, distance_km) pairs within radius_km, nearest first
+    rows = radius_candidates(latitude, longitude, radius_km)
+    if not rows:
+        return []
+    ids = np.array([row[0] for row in rows])
+    distances = haversine_km(latitude, longitude, [row[1] for row in rows], [row[2] for row in rows])
+    inside = distances <= radius_km
+    order = np.argsort(distances[inside], kind='stable')
+    return list(zip(ids[inside][order].tolist(), distances[inside][order].tolist()))
+
+
+def fetch_by_ids(ids, columns='*'):
+    # Rows for the given ids, queried in chunks to stay under SQLite's bound-parameter limit
+    conn = get_connection()
+    rows = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        rows.extend(conn.execute(f"SELECT {columns} FROM soil_test_details WHERE id IN ({', '.join('?' * len(chunk))})",
+                                 chunk).fetchall())
+    return rows
+
+
+def fetch_tests(ids_with_distance):
+    by_id = {row[0]: row for row in fetch_by_ids([record_id for record_id, _ in ids_with_distance])}
+    return [(by_id[record_id], distance) for record_id, distance in ids_with_distance if record_id in by_id]
+
+
+def radius_query(latitude, longitude, radius_km):
+    # All tests within radius_km of the point as (row, distance_km), nearest first
+    return fetch_tests(radius_ids(latitude, longitude, radius_km))
+
+
+def nearest_query(latitude, longitude, k=10, initial_radius_km=1.0):
+    # k nearest tests as (row, distance_km). The search radius doubles until it holds k samples;
+    # the k closest inside that circle are then the k closest overall.
+    radius_km = initial_radius_km
+    while True:
+        found = radius_ids(latitude, longitude, radius_km)
+        if len(found) >= k or radius_km >= MAX_DISTANCE_KM:
+            return fetch_tests(found[:k])
+        radius_km = min(radius_km * 2, MAX_DISTANCE_KM)
+
+
+def summarize_scores(scores):
+    scores = np.asarray([score for score in scores if score is not None], dtype=float)
+    ratings = generate_ratings(scores)
+    summary = {
+        'count': int(scores.size),
+        'mean_score': float(scores.mean()) if scores.size else None,
+        'min_score': float(scores.min()) if scores.size else None,
+        'max_score': float(scores.max()) if scores.size else None,
+        'ratings': {label: int(np.sum(ratings == label)) for label in rating_labels}
+    }
+    return summary
+
+
+def bounding_box_summary(min_latitude, min_longitude, max_latitude, max_longitude):
+    rows = bounding_box_query(min_latitude, min_longitude, max_latitude, max_longitude, columns='soil_health_score')
+    return summarize_scores(row[0] for row in rows)
+
+
+def radius_summary(latitude, longitude, radius_km):
+    # Soil health summary of the tests within radius_km, e.g. "all tests within 5 km of this farm"
+    ids = [record_id for record_id, _ in radius_ids(latitude, longitude, radius_km)]
+    return summarize_scores(row[0] for row in fetch_by_ids(ids, columns='soil_health_score'))
@@ -0,0 +1,105 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class BackgroundTask:
+    # Handle for one piece of background work. The work function receives the task and may call
+    # report_progress(); cancel() is called from the Tk thread and stops any further callbacks.
+    def __init__(self, runner, work, on_done=None, on_error=None, on_progress=None):
+        self.runner = runner
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+    def report_progress(self, fraction, message=''):
+        # Raises TaskCancelled, so cancelled work stops at its next progress step
+        self.check_cancelled()
+        self.runner.post(self, self.on_progress, fraction, message)
+
+    def run(self):
+        try:
+            result = self.work(self)
+            self.check_cancelled()
+        except TaskCancelled:
+            return
+        except Exception as e:
+            self.runner.post(self, self.on_error, e)
+        else:
+            self.runner.post(self, self.on_done, result)
+
+
+class TaskRunner:
+    # Runs work on background threads and hands progress, results and errors back to the Tk thread.
+    # Worker threads never touch widgets: they queue callbacks, which a root.after() poll loop
+    # running on the Tk thread delivers while tasks are outstanding.
+    def __init__(self, root, workers=1, poll_interval=15):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shds-task')
+        self.events = queue.Queue()
+        self.pending = 0
+        self.poll_interval = poll_interval
+        self.polling = False
+        self.closed = False
+
+    def submit(self, work, on_done=None, on_error=None, on_progress=None):
+        task = BackgroundTask(self, work, on_done, on_error, on_progress)
+        self.pending += 1
+        self.executor.submit(self.run, task)
+        self.schedule_poll()
+        return task
+
+    def run(self, task):
+        try:
+            task.run()
+        finally:
+            # A callback of None marks the task as finished
+            self.events.put((task, None, ()))
+
+    def post(self, task, callback, *args):
+        if callback is not None:
+            self.events.put((task, callback, args))
+
+    def schedule_poll(self):
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self.poll)
+
+    def poll(self):
+        if self.closed:
+            self.polling = False
+            return
+        while True:
+            try:
+                task, callback, args = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if callback is None:
+                self.pending -= 1
+            elif not task.cancelled:
+                callback(*args)
+        self.polling = False
+        if self.pending:
+            self.schedule_poll()
+
+    def shutdown(self):
+        # Queued work is dropped and no further callbacks are delivered
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root. Tests run from a scratch directory, so nothing depends on
+# being started from the repository.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def scratch_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def database(tmp_path):
+    # A fresh database file for the test; the shared soil_health.db is never touched
+    import connection
+    previous = connection.get_database_path()
+    path = str(tmp_path / 'soil_health.db')
+    connection.set_database_path(path)
+    yield path
+    connection.set_database_path(previous)
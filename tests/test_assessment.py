@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import fahp
+from assessment import assess_sample, assess_batch, generate_rating, generate_ratings, rating_thresholds
+
+SAMPLE = (6.5, 150.0, 20.0, 100.0, 1.0, 25.0, 50.0, 50.0)
+
+
+@pytest.mark.parametrize('score, rating', [
+    (0.0, "Very Poor"), (0.1999, "Very Poor"), (0.2, "Poor"), (0.4, "Below Average"), (0.6, "Average"),
+    (0.7, "Above Average"), (0.8, "Good"), (0.9, "Excellent"), (1.0, "Excellent"),
+])
+def test_rating_bins_start_at_their_threshold(score, rating):
+    assert generate_rating(score) == rating
+
+
+@pytest.mark.parametrize('score', [None, np.nan, float('inf'), -np.inf])
+def test_scores_that_are_not_numbers_get_no_rating(score):
+    assert generate_rating(score) is None
+    if score is not None:
+        assert generate_ratings([score, 0.95])[0] is None
+
+
+def test_batch_ratings_match_single_ratings():
+    scores = np.concatenate([rating_thresholds, rating_thresholds - 1e-9, [0.0, 1.0]])
+    assert list(generate_ratings(scores)) == [generate_rating(score) for score in scores]
+    assert generate_ratings([np.nan])[0] is None
+
+
+def test_batch_scores_match_single_samples():
+    rng = np.random.default_rng(1)
+    samples = [SAMPLE, (4.0, 50.0, 12.0, 30.0, 0.2, 15.0, 20.0, 20.0), tuple(rng.uniform(1.0, 1.3, 8) * SAMPLE)]
+    results = assess_batch(samples)
+    for sample, score in zip(samples, results['soil_health_score']):
+        assert assess_sample(sample).soil_health_score == pytest.approx(score)
+
+
+def test_missing_indicators_renormalize_the_weights():
+    partial = list(SAMPLE)
+    partial[1] = None
+    result = assess_sample(partial)
+    assert result.missing_indicators == ("Nitrogen (N)",)
+    batch = assess_batch([partial], allow_missing=True)
+    assert batch['valid'][0]
+    assert batch['soil_health_score'][0] == pytest.approx(result.soil_health_score)
+    assert not assess_batch([partial])['valid'][0]
+    with pytest.raises(ValueError):
+        assess_sample([None] * 8)
+
+
+def test_single_sample_cache_follows_the_comparison_matrix(monkeypatch):
+    before = assess_sample(SAMPLE).soil_health_score
+    original = fahp.predefined_fuzzy_comparison_matrix()
+    changed = original.copy()
+    changed[0, 1:] = [[9, 9, 9]] * (len(changed) - 1)
+    changed[1:, 0] = [[1 / 9, 1 / 9, 1 / 9]] * (len(changed) - 1)
+    monkeypatch.setattr(fahp, 'predefined_fuzzy_comparison_matrix', lambda: changed)
+    fahp.invalidate_weights_cache()
+    try:
+        after = assess_sample(SAMPLE).soil_health_score
+        assert after != pytest.approx(before)
+        assert after == pytest.approx(assess_batch([SAMPLE])['soil_health_score'][0])
+    finally:
+        monkeypatch.undo()
+        fahp.invalidate_weights_cache()
+    assert assess_sample(SAMPLE).soil_health_score == before
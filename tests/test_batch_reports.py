@@ -0,0 +1,51 @@
+import os
+from connection import transaction
+from schema import migrate
+from batch_reports import report_data, generate_reports
+from report import score_text, NOT_SCORED
+
+INDICATORS = (6.5, 150, 20, 100, 1.0, 25, 50, 50)
+
+
+def add_tests(rows):
+    with transaction() as conn:
+        conn.execute("INSERT INTO crop_recommendation_texts (text) VALUES ('Rice')")
+        conn.executemany('''INSERT INTO soil_tests (test_id, name, collection_date, soil_ph, nitrogen, phosphorus,
+                            potassium, electrical_conductivity, temperature, moisture, humidity, soil_health_score,
+                            crop_recommendation_id) VALUES (?, 'Farmer', '2024-03-07', ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)''',
+                         [(test_id,) + INDICATORS + (score,) for test_id, score in rows])
+
+
+def test_report_data_without_a_score():
+    row = {'collection_date': '2024-03-07', 'soil_health_score': None, 'crop_recommendations': None,
+           'fertilizer_recommendation': 'Urea'}
+    data = report_data(row)
+    assert data['rating'] is None
+    assert data['collection_date'] == '07-03-2024'
+    assert data['crop_recommendations'] == ''
+    assert score_text(data['soil_health_score']) == NOT_SCORED
+    assert score_text(0.456) == '0.46'
+
+
+def test_a_failing_test_does_not_stop_the_batch(database, tmp_path, monkeypatch):
+    migrate()
+    add_tests([('T1', 0.62), ('T2', None), ('T3', 0.35)])
+    import batch_reports
+    real_report_data = batch_reports.report_data
+
+    def report_data_failing_on_t3(row):
+        if row['test_id'] == 'T3':
+            raise ValueError("broken row")
+        return real_report_data(row)
+
+    monkeypatch.setattr(batch_reports, 'report_data', report_data_failing_on_t3)
+    progress = []
+    results = generate_reports(str(tmp_path / 'reports'), workers=1,
+                               progress=lambda done, total, result: progress.append((done, total)))
+    by_test = {result['test_id']: result for result in results}
+    assert by_test['T3']['error'] == "broken row"
+    # The test without a score still gets its report
+    for test_id in ('T1', 'T2'):
+        assert by_test[test_id]['error'] is None
+        assert os.path.getsize(by_test[test_id]['file_path']) > 0
+    assert progress == [(1, 3), (2, 3), (3, 3)]
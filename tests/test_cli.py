@@ -0,0 +1,75 @@
+import csv
+import os
+import pytest
+import connection
+from cli import main
+from recommendations import crop_index, fertilizer_index
+
+HEADER = ['Test ID', 'Soil pH', 'Nitrogen', 'Phosphorus', 'Potassium', 'Electrical Conductivity', 'Temperature',
+          'Moisture', 'Humidity']
+VALID = ['A1', 6.5, 150, 20, 100, 1.0, 25, 50, 50]
+OUT_OF_RANGE = ['A2', 99, 150, 20, 100, 1.0, 25, 50, 50]
+
+
+def write_samples(path, rows):
+    with open(path, 'w', newline='') as file:
+        csv.writer(file).writerows([HEADER] + rows)
+    return str(path)
+
+
+def read_output(path):
+    with open(path, newline='') as file:
+        return list(csv.DictReader(file))
+
+
+@pytest.fixture
+def missing_crop_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(crop_index, 'file_path', str(tmp_path / 'crop_recommendations.csv'))
+    yield
+    monkeypatch.undo()
+    crop_index.refresh()
+
+
+def test_bundled_files_do_not_depend_on_the_working_directory():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert os.getcwd() != root
+    for file_path in (crop_index.file_path, fertilizer_index.file_path, connection.DEFAULT_DB_PATH):
+        assert os.path.dirname(file_path) == root
+    assert crop_index.digest() is not None and fertilizer_index.digest() is not None
+
+
+def test_score_succeeds_when_every_row_scores(tmp_path):
+    output = tmp_path / 'scored.csv'
+    assert main(['score', write_samples(tmp_path / 'in.csv', [VALID]), '-o', str(output)]) == 0
+    [row] = read_output(output)
+    assert row['test_id'] == 'A1' and row['error'] == ''
+    assert row['crop_recommendations'].startswith('Grow')
+
+
+def test_score_reports_invalid_rows(tmp_path):
+    output = tmp_path / 'scored.csv'
+    assert main(['score', write_samples(tmp_path / 'in.csv', [VALID, OUT_OF_RANGE]), '-o', str(output)]) == 2
+    rows = read_output(output)
+    assert [row['error'] for row in rows] == ['', 'Invalid or missing values for soil_ph']
+    assert rows[1]['soil_health_score'] == ''
+
+
+def test_score_refuses_to_run_without_recommendations(tmp_path, missing_crop_file, capsys):
+    output = tmp_path / 'scored.csv'
+    assert main(['score', write_samples(tmp_path / 'in.csv', [VALID]), '-o', str(output)]) == 1
+    assert not output.exists()
+    assert 'crop_recommendations.csv' in capsys.readouterr().err
+
+
+def test_import_and_rescore_refuse_to_run_without_recommendations(database, tmp_path, missing_crop_file):
+    samples = write_samples(tmp_path / 'in.csv', [VALID])
+    assert main(['import', samples]) == 1
+    assert main(['rescore']) == 1
+    assert not os.path.exists(database)
+
+
+def test_import_then_rescore(database, tmp_path):
+    samples = write_samples(tmp_path / 'in.csv', [VALID, OUT_OF_RANGE])
+    assert main(['import', samples]) == 2
+    assert connection.get_connection().execute("SELECT test_id FROM soil_tests").fetchall() == [('A1',)]
+    assert main(['rescore']) == 0
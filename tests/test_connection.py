@@ -0,0 +1,75 @@
+import gc
+import sqlite3
+import threading
+import pytest
+import connection
+from connection import get_connection, transaction, close_all_connections
+
+
+def in_thread(target):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', target()))
+    thread.start()
+    thread.join()
+    return result.get('value')
+
+
+def test_one_connection_per_thread(database):
+    conn = get_connection()
+    assert get_connection() is conn
+    assert in_thread(get_connection) is not conn
+
+
+def test_thread_connection_closed_when_thread_exits(database):
+    conn = in_thread(get_connection)
+    gc.collect()
+    assert not connection._open_connections
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+def test_close_all_closes_other_threads_connections(database):
+    opened, closed = threading.Event(), threading.Event()
+    seen = {}
+
+    def worker():
+        seen['first'] = get_connection()
+        opened.set()
+        closed.wait()
+        # The owning thread reopens on its next call instead of using the closed connection
+        seen['second'] = get_connection()
+        seen['second'].execute("SELECT 1")
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    opened.wait()
+    close_all_connections()
+    with pytest.raises(sqlite3.ProgrammingError):
+        seen['first'].execute("SELECT 1")
+    closed.set()
+    thread.join()
+    assert seen['second'] is not seen['first']
+
+
+def test_nested_transactions_roll_back_to_savepoint(database):
+    get_connection().execute("CREATE TABLE t (x INTEGER)")
+    with transaction() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+        with pytest.raises(ValueError):
+            with transaction():
+                conn.execute("INSERT INTO t VALUES (2)")
+                raise ValueError
+    assert [row[0] for row in get_connection().execute("SELECT x FROM t")] == [1]
+
+    with pytest.raises(ValueError):
+        with transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (3)")
+            raise ValueError
+    assert get_connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+
+def test_set_database_path_reopens(database, tmp_path):
+    first = get_connection()
+    connection.set_database_path(str(tmp_path / 'other.db'))
+    assert get_connection() is not first
+    assert get_connection().execute("PRAGMA database_list").fetchone()[2].endswith('other.db')
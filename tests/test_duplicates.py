@@ -0,0 +1,93 @@
+import sqlite3
+import pytest
+from connection import get_connection, transaction
+from schema import create_tables, migrate, insert_sql, iso_date, display_date, soil_test_columns, \
+    store_recommendation_texts
+from database import save_results
+from importer import import_file
+
+HEADER = ['Test ID', 'Name', 'Soil pH', 'Nitrogen', 'Phosphorus', 'Potassium', 'Electrical Conductivity',
+          'Temperature', 'Moisture', 'Humidity']
+INDICATORS = [6.5, 150, 20, 100, 1.0, 25, 50, 50]
+
+
+def sample(test_id, name='Farmer'):
+    data = dict.fromkeys(soil_test_columns)
+    data.update(zip(['soil_ph', 'nitrogen', 'phosphorus', 'potassium', 'electrical_conductivity', 'temperature',
+                     'moisture', 'humidity'], INDICATORS))
+    data.update(test_id=test_id, name=name, soil_health_score=0.5, crop_recommendations='crops',
+                fertilizer_recommendation='fertilizer')
+    return data
+
+
+def stored(column='name'):
+    return get_connection().execute(f"SELECT test_id, {column} FROM soil_test_details ORDER BY id").fetchall()
+
+
+def test_collection_dates_round_trip():
+    assert iso_date('07-03-2024') == '2024-03-07'
+    assert iso_date('2024-03-07') == '2024-03-07'
+    assert iso_date('31-02-2024') == '31-02-2024'
+    assert iso_date('') is None
+    assert display_date('2024-03-07') == '07-03-2024'
+
+
+def test_migration_renames_older_duplicates_and_clears_blank_ids(database):
+    with transaction() as conn:
+        create_tables(conn)
+        conn.executemany("INSERT INTO soil_tests (test_id, name, collection_date) VALUES (?, ?, ?)",
+                         [('T1', 'first', '07-03-2024'), ('T1', 'second', None), ('', 'blank', None),
+                          (' ', 'blank too', None), ('T2', 'other', None)])
+    migrate()
+    assert get_connection().execute(
+        "SELECT test_id, name, collection_date FROM soil_tests ORDER BY id").fetchall() == [
+        ('T1-1', 'first', '2024-03-07'), ('T1', 'second', None), (None, 'blank', None), (None, 'blank too', None),
+        ('T2', 'other', None)]
+
+
+def test_insert_refuses_a_stored_test_id(database):
+    migrate()
+    row = tuple(sample('T1').values())
+    with transaction() as conn:
+        store_recommendation_texts(conn, [row])
+        conn.execute(insert_sql(), row)
+    with pytest.raises(sqlite3.IntegrityError):
+        with transaction() as conn:
+            conn.execute(insert_sql(), row)
+    assert len(stored()) == 1
+
+
+def test_save_results_keeps_the_stored_test_unless_replacing(database):
+    migrate()
+    assert save_results(sample('T1', 'first farmer'))
+    assert not save_results(sample('T1', 'second farmer'))
+    assert stored() == [('T1', 'first farmer')]
+    assert save_results(sample('T1', 'second farmer'), replace=True)
+    assert stored() == [('T1', 'second farmer')]
+
+
+def test_save_results_stores_blank_test_ids_as_null(database):
+    migrate()
+    assert save_results(sample(''))
+    assert save_results(sample('  '))
+    assert stored('id') == [(None, 1), (None, 2)]
+
+
+def test_import_rejects_duplicate_test_ids(database, tmp_path):
+    migrate()
+    save_results(sample('T1', 'saved earlier'))
+    rows = [HEADER,
+            ['T1', 'clash with stored'] + INDICATORS,
+            ['T2', 'first T2'] + INDICATORS,
+            ['T2', 'repeat in chunk'] + INDICATORS,
+            ['', 'no id'] + INDICATORS,
+            ['', 'no id either'] + INDICATORS,
+            ['T3', 'next chunk'] + INDICATORS,
+            ['T3', 'repeat across chunks'] + INDICATORS]
+    stats = import_file(None, chunk_size=6, rows=rows)
+    assert stats['imported'] == 4
+    assert stats['rejected'] == 3
+    assert stats['rejected_rows'] == [(2, "duplicate test_id T1"), (4, "duplicate test_id T2"),
+                                      (8, "duplicate test_id T3")]
+    assert stored() == [('T1', 'saved earlier'), ('T2', 'first T2'), (None, 'no id'), (None, 'no id either'),
+                        ('T3', 'next chunk')]
@@ -0,0 +1,52 @@
+import csv
+import openpyxl
+import exporter
+from exporter import export_csv, export_xlsx, sheet_title
+from importer import import_file
+
+HEADER = ['Test ID', 'Collection Date', 'Name', 'Soil pH', 'Nitrogen', 'Phosphorus', 'Potassium',
+          'Electrical Conductivity', 'Temperature', 'Moisture', 'Humidity']
+INDICATORS = [6.5, 150, 20, 100, 1.0, 25, 50, 50]
+
+
+def import_samples(count):
+    rows = [HEADER] + [[f"T{i}", f"0{1 + i % 3}-01-202{i % 2}", f"Farmer {i}"] + INDICATORS for i in range(count)]
+    return import_file(None, rows=rows)
+
+
+def test_csv_export_reads_back_through_the_importer(database, tmp_path):
+    import_samples(5)
+    path = tmp_path / 'tests.csv'
+    assert export_csv(str(path)) == 5
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert [row['Test ID'] for row in rows] == [f"T{i}" for i in range(5)]
+    assert rows[0]['Crop Recommendations'] and rows[0]['Fertilizer Recommendation']
+
+
+def test_xlsx_export_of_one_row_as_the_viewer_does(database, tmp_path):
+    import_samples(3)
+    path = str(tmp_path / 'one.xlsx')
+    assert export_xlsx(path, where="id = ?", parameters=(2,)) == 1
+    sheet = openpyxl.load_workbook(path).active
+    values = list(sheet.iter_rows(values_only=True))
+    assert len(values) == 2
+    assert values[1][values[0].index('Test ID')] == 'T1'
+
+
+def test_xlsx_split_by_year_and_row_limit(database, tmp_path, monkeypatch):
+    import_samples(7)
+    monkeypatch.setattr(exporter, 'MAX_SHEET_ROWS', 3)  # header plus two rows per sheet
+    path = str(tmp_path / 'split.xlsx')
+    assert export_xlsx(path, split_by='year') == 7
+    workbook = openpyxl.load_workbook(path)
+    assert workbook.sheetnames == ['2020', '2020 (2)', '2021', '2021 (2)']
+    assert sum(sheet.max_row - 1 for sheet in workbook) == 7
+
+
+def test_sheet_titles_are_valid_and_unique():
+    used = set()
+    assert sheet_title('a/b:c', used) == 'a_b_c'
+    assert sheet_title('A/B:C', used) == 'A_B_C (2)'
+    assert sheet_title(None, used) == 'Unknown'
+    assert len(sheet_title('x' * 40, used)) == 31
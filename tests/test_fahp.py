@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from fahp import fahp_weights, masked_weights, masked_weights_table, mask_patterns, evaluate_soil_health, \
+    evaluate_soil_health_masked
+
+VALUES = np.array([0.76, 0.29, 0.05, 0.23, 0.25, 0.5, 0.5, 0.5])
+
+
+def test_every_pattern_renormalizes_over_its_indicators():
+    weights = fahp_weights()
+    table = masked_weights_table()
+    assert table.shape == (2 ** len(weights), len(weights))
+    assert np.all(np.isnan(table[0]))
+    assert np.allclose(table[1:].sum(axis=1), 1)
+    assert np.allclose(table[-1], weights)
+    # Missing indicators get no weight; present ones keep their ratios
+    present = np.array([True, False, True, True, False, True, True, False])
+    row = masked_weights(present)
+    assert np.all(row[~present] == 0)
+    assert np.allclose(row[present], weights[present] / weights[present].sum())
+
+
+def test_mask_patterns_set_one_bit_per_present_indicator():
+    assert mask_patterns([True] + [False] * 7) == 1
+    assert mask_patterns([False] * 7 + [True]) == 128
+    assert list(mask_patterns(np.eye(8, dtype=bool))) == [1 << i for i in range(8)]
+
+
+def test_complete_samples_score_as_before():
+    assert evaluate_soil_health_masked(VALUES, np.ones(8, dtype=bool)) == pytest.approx(evaluate_soil_health(VALUES))
+
+
+def test_missing_values_are_ignored_not_counted_as_zero():
+    present = np.ones(8, dtype=bool)
+    present[[4, 7]] = False
+    with_nan = np.where(present, VALUES, np.nan)
+    with_zero = np.where(present, VALUES, 0.0)
+    score = evaluate_soil_health_masked(with_nan, present)
+    assert score == pytest.approx(evaluate_soil_health_masked(with_zero, present))
+    assert score == pytest.approx(np.dot(masked_weights(present), with_zero))
+    assert score > evaluate_soil_health(with_zero)
+
+
+def test_batch_scores_one_row_per_sample():
+    values = np.array([VALUES, VALUES, VALUES])
+    present = np.array([[True] * 8, [True] * 4 + [False] * 4, [False] * 8])
+    scores = evaluate_soil_health_masked(values, present)
+    assert scores[0] == pytest.approx(evaluate_soil_health(VALUES))
+    assert scores[1] == pytest.approx(evaluate_soil_health_masked(VALUES, present[1]))
+    assert np.isnan(scores[2])
+
+
+def test_custom_weights_get_their_own_table():
+    weights = np.full(8, 1 / 8)
+    present = np.array([True, True] + [False] * 6)
+    assert np.allclose(masked_weights(present, weights)[:2], 0.5)
+    assert not np.allclose(masked_weights(present)[:2], 0.5)
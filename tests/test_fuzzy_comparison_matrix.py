@@ -0,0 +1,66 @@
+import csv
+import hashlib
+import itertools
+import numpy as np
+import pytest
+from fuzzy_comparison_matrix import generate, default_indicators, default_values
+
+# SHA-256 and size of fuzzy_comparison_matrix.csv as written by the original nested-loop script
+ORIGINAL_SHA256 = 'd29b63c0b99b2b4f6bff79ea179d42d1b01839d7701af38af303eac7af79d3ea'
+ORIGINAL_SIZE = 20547025
+ORIGINAL_ROWS = 5 ** 8
+
+SMALL_INDICATORS = [
+    {'name': 'A', 'ranges': ['a1', 'a2', 'a3'], 'low': ['a1'], 'high': ['a3']},
+    {'name': 'B', 'ranges': ['b1', 'b2'], 'low': [], 'high': ['b2']},
+    {'name': 'C', 'ranges': ['c1', 'c2', 'c3', 'c4'], 'low': ['c4'], 'high': ['c2', 'c3']},
+]
+
+
+def sha256(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+@pytest.mark.parametrize('chunk_rows', [1000, 65536])
+def test_csv_matches_the_original_byte_for_byte(tmp_path, chunk_rows):
+    path = tmp_path / 'fuzzy_comparison_matrix.csv'
+    assert generate(str(path), chunk_rows=chunk_rows) == ORIGINAL_ROWS
+    assert path.stat().st_size == ORIGINAL_SIZE
+    assert sha256(path) == ORIGINAL_SHA256
+
+
+def test_custom_rules_follow_the_nested_loop_order(tmp_path):
+    path = tmp_path / 'small.csv'
+    generate(str(path), indicators=SMALL_INDICATORS, chunk_rows=5)
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ['A', 'B', 'C', 'Fuzzy Value']
+    expected = []
+    for combination in itertools.product(*(indicator['ranges'] for indicator in SMALL_INDICATORS)):
+        if any(label in indicator['low'] for label, indicator in zip(combination, SMALL_INDICATORS)):
+            value = default_values['low']
+        elif all(label in indicator['high'] for label, indicator in zip(combination, SMALL_INDICATORS)):
+            value = default_values['high']
+        else:
+            value = default_values['medium']
+        expected.append(list(combination) + [str(value)])
+    assert rows[1:] == expected
+
+
+def test_npy_holds_the_same_rows_as_the_csv(tmp_path):
+    csv_path, npy_path = tmp_path / 'small.csv', tmp_path / 'small.npy'
+    generate(str(csv_path), indicators=SMALL_INDICATORS)
+    assert generate(str(npy_path), indicators=SMALL_INDICATORS, chunk_rows=7) == 24
+    with open(csv_path, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))[1:]
+    table = np.load(npy_path)
+    for row, record in zip(rows, table):
+        assert [indicator['ranges'][index] for indicator, index in zip(SMALL_INDICATORS, list(record)[:-1])] == row[:-1]
+        assert record['Fuzzy Value'] == pytest.approx(float(row[-1]))
+
+
+def test_unknown_rule_range_is_rejected(tmp_path):
+    indicators = [dict(default_indicators[0], low=['<5'])]
+    with pytest.raises(ValueError):
+        generate(str(tmp_path / 'bad.csv'), indicators=indicators)
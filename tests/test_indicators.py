@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from indicators import SoilIndicator, soil_indicators, membership_breakpoints, membership_values
+from assessment import assess_sample, assess_batch
+
+SAMPLE = (6.5, 150.0, 20.0, 100.0, 1.0, 25.0, 50.0, 50.0)
+
+
+def test_membership_is_one_inside_the_optimal_range():
+    values = np.array([[(low + high) / 2 for low, high in (indicator.optimal_range for indicator in soil_indicators)],
+                       [indicator.optimal_range[0] for indicator in soil_indicators],
+                       [indicator.optimal_range[1] for indicator in soil_indicators]])
+    assert np.all(membership_values(values) == 1)
+
+
+def test_membership_falls_to_zero_at_the_bounds():
+    ph = soil_indicators[0]  # optimal 6.0-7.5 within 0-8.5
+    x_points, memberships = membership_breakpoints(ph)
+    assert list(x_points) == [0, 6.0, 7.5, 8.5]
+    assert list(memberships) == [0, 1, 1, 0]
+    values = np.full((4, len(soil_indicators)), 50.0)
+    values[:, 0] = [0.0, 3.0, 8.0, 8.5]
+    assert membership_values(values)[:, 0] == pytest.approx([0, 0.5, 0.5, 0])
+
+
+def test_optimal_range_touching_a_bound_stays_at_one():
+    # Electrical conductivity is best anywhere from 0 to 2
+    ec = soil_indicators[4]
+    x_points, memberships = membership_breakpoints(ec)
+    assert list(x_points) == [0, 2, 4]
+    assert list(memberships) == [1, 1, 0]
+    both = SoilIndicator("Both bounds", 0, 10, (0, 10), "", "both")
+    assert list(membership_breakpoints(both)[1]) == [1, 1]
+
+
+def test_not_measured_stays_nan():
+    values = np.array(SAMPLE)
+    values[2] = np.nan
+    memberships = membership_values(values)
+    assert np.isnan(memberships[2])
+    assert not np.isnan(np.delete(memberships, 2)).any()
+
+
+def test_values_past_the_optimum_stop_scoring_higher():
+    optimal, alkaline = list(SAMPLE), list(SAMPLE)
+    optimal[0], alkaline[0] = 7.0, 8.5
+    assert assess_sample(alkaline).soil_health_score > assess_sample(optimal).soil_health_score
+    assert (assess_sample(alkaline, 'membership').soil_health_score
+            < assess_sample(optimal, 'membership').soil_health_score)
+
+
+def test_membership_mode_matches_between_single_and_batch():
+    partial = list(SAMPLE)
+    partial[7] = None
+    batch = assess_batch([SAMPLE, partial], allow_missing=True, scoring_mode='membership')
+    for sample, score in zip([SAMPLE, partial], batch['soil_health_score']):
+        assert assess_sample(sample, 'membership').soil_health_score == pytest.approx(score)
+    with pytest.raises(ValueError):
+        assess_batch([SAMPLE], scoring_mode='logistic')
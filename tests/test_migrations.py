@@ -0,0 +1,95 @@
+import shutil
+import sqlite3
+import pytest
+import schema
+from connection import get_connection, transaction
+from schema import create_tables, migrate, migrations, schema_version
+from search import search_ids, has_search_index
+
+# Rows as an install from before the migrations stored them: display dates, repeated and blank test
+# IDs, recommendation texts on every row, and a deleted row above the highest remaining id
+PRE_SERIES_ROWS = [
+    ('T1', '07-03-2024', 12.9, 77.5, 'Asha Rao', 0.62, 'Rice, Maize', 'Urea'),
+    ('T1', '08-03-2024', 13.0, 77.6, 'Ravi Kumar', 0.48, 'Rice, Maize', 'DAP'),
+    ('', '09-03-2024', None, None, 'Meena Devi', 0.71, 'Wheat', 'Urea'),
+    ('T2', '10-03-2024', 12.8, 77.4, 'Gopal Singh', None, None, None),
+    ('T3', '11-03-2024', 12.7, 77.3, 'Deleted Later', 0.55, 'Millet', 'Potash'),
+]
+
+
+@pytest.fixture
+def pre_series(tmp_path):
+    path = str(tmp_path / 'pre_series.db')
+    conn = sqlite3.connect(path)
+    with conn:
+        create_tables(conn)
+        conn.executemany('''INSERT INTO soil_tests (test_id, collection_date, latitude, longitude, name,
+                            soil_health_score, crop_recommendations, fertilizer_recommendation)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', PRE_SERIES_ROWS)
+        conn.execute("DELETE FROM soil_tests WHERE test_id = 'T3'")
+    conn.close()
+    return path
+
+
+@pytest.fixture(params=['drop column', 'rebuild'])
+def migrated(request, pre_series, database, monkeypatch):
+    # Migrate a copy, so the pre-series file itself is never changed; the rebuild path is what
+    # SQLite builds older than 3.35 take
+    if request.param == 'rebuild':
+        monkeypatch.setattr(schema, 'DROP_COLUMN_VERSION', (99, 0, 0))
+    shutil.copyfile(pre_series, database)
+    migrate()
+    return get_connection()
+
+
+def columns(conn, table='soil_tests'):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_all_migrations_apply_once(migrated):
+    assert schema_version(migrated) == migrations[-1][0]
+    migrate()
+    assert migrated.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == len(migrations)
+
+
+def test_recommendation_texts_move_to_catalogs(migrated):
+    assert 'crop_recommendations' not in columns(migrated)
+    assert 'fertilizer_recommendation' not in columns(migrated)
+    assert {'crop_recommendation_id', 'fertilizer_recommendation_id', 'scoring_version'} <= set(columns(migrated))
+    assert migrated.execute("SELECT id, text FROM crop_recommendation_texts ORDER BY id").fetchall() == [
+        (1, 'Rice, Maize'), (2, 'Wheat')]
+    assert migrated.execute("SELECT id, text FROM fertilizer_recommendation_texts ORDER BY id").fetchall() == [
+        (1, 'Urea'), (2, 'DAP')]
+    assert migrated.execute('''SELECT test_id, collection_date, name, soil_health_score, crop_recommendations,
+                               fertilizer_recommendation FROM soil_test_details ORDER BY id''').fetchall() == [
+        ('T1-1', '2024-03-07', 'Asha Rao', 0.62, 'Rice, Maize', 'Urea'),
+        ('T1', '2024-03-08', 'Ravi Kumar', 0.48, 'Rice, Maize', 'DAP'),
+        (None, '2024-03-09', 'Meena Devi', 0.71, 'Wheat', 'Urea'),
+        ('T2', '2024-03-10', 'Gopal Singh', None, None, None)]
+
+
+def test_indexes_and_triggers_survive(migrated):
+    names = {row[0] for row in migrated.execute(
+        "SELECT name FROM sqlite_master WHERE tbl_name = 'soil_tests' AND type IN ('index', 'trigger')")}
+    assert {'ux_soil_tests_test_id', 'ix_soil_tests_name', 'ix_soil_tests_collection_date',
+            'ix_soil_tests_score', 'ix_soil_tests_scoring_version'} <= names
+    assert has_search_index(migrated)
+    assert search_ids('Ravi') == [2]
+    with pytest.raises(sqlite3.IntegrityError):
+        with transaction() as conn:
+            conn.execute("INSERT INTO soil_tests (test_id) VALUES ('T2')")
+    # New rows take an id above the deleted one and reach the search and spatial indexes
+    with transaction() as conn:
+        conn.execute("INSERT INTO soil_tests (test_id, name, latitude, longitude) VALUES ('T4', 'Lata', 12.5, 77.2)")
+    assert migrated.execute("SELECT id FROM soil_tests WHERE test_id = 'T4'").fetchone() == (6,)
+    assert search_ids('Lata') == [6]
+    assert migrated.execute("SELECT id FROM soil_tests_rtree ORDER BY id").fetchall() == [(1,), (2,), (4,), (6,)]
+
+
+def test_pre_series_file_is_unchanged(migrated, pre_series):
+    conn = sqlite3.connect(pre_series)
+    try:
+        assert 'crop_recommendations' in columns(conn)
+        assert conn.execute("SELECT COUNT(*) FROM soil_tests").fetchone()[0] == 4
+    finally:
+        conn.close()
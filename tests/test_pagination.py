@@ -0,0 +1,67 @@
+import pytest
+import connection
+from connection import get_connection, transaction
+from schema import migrate
+from pagination import PagedQuery
+
+
+@pytest.fixture
+def stored_tests(database):
+    # Repeated and NULL sort values, so pages must break ties on id and place NULLs correctly
+    migrate()
+    names = ['Lalthanzara', None, 'Zoremsangi', 'Lalthanzara', None, 'Chhuanawma', 'Lalthanzara', 'Biakmawia']
+    with transaction() as conn:
+        conn.executemany("INSERT INTO soil_tests (test_id, name, soil_health_score) VALUES (?, ?, ?)",
+                         [(f"T{i}", name, None if i % 3 == 0 else round(i / 10, 1)) for i, name in enumerate(names)])
+
+
+def all_pages(query):
+    ids = []
+    while True:
+        page = query.next_page()
+        if not page:
+            return ids
+        ids.extend(row[0] for row in page)
+
+
+@pytest.mark.parametrize('column', ['id', 'name', 'soil_health_score'])
+@pytest.mark.parametrize('descending', [False, True])
+def test_pages_follow_the_full_ordering(stored_tests, column, descending):
+    direction = "DESC" if descending else "ASC"
+    expected = [row[0] for row in get_connection().execute(
+        f"SELECT id FROM soil_test_details ORDER BY {column} {direction}, id {direction}")]
+    assert all_pages(PagedQuery(column, descending, page_size=3)) == expected
+
+
+def test_filtered_pages_and_counts(stored_tests):
+    query = PagedQuery('name', filter_text='lalthan', page_size=2)
+    assert all_pages(query) == [1, 4, 7]
+    assert query.count() == 3
+    with transaction() as conn:
+        conn.execute("INSERT INTO soil_tests (test_id, name) VALUES ('T9', 'Lalthanzuali')")
+    assert query.count() == 4
+
+
+def test_unknown_sort_column_is_rejected():
+    with pytest.raises(ValueError):
+        PagedQuery('name; DROP TABLE soil_tests')
+
+
+def test_counts_follow_the_database_in_use(tmp_path):
+    # Both databases are filled through separate connections, so the connections the queries use
+    # start from identical data_version/total_changes stamps
+    previous = connection.get_database_path()
+    try:
+        totals = []
+        for name, rows in (('first.db', 2), ('second.db', 5)):
+            connection.set_database_path(str(tmp_path / name))
+            migrate()
+            writer = connection.open_connection()
+            with writer:
+                writer.executemany("INSERT INTO soil_tests (test_id) VALUES (?)", [(f"T{i}",) for i in range(rows)])
+            writer.close()
+            connection.set_database_path(str(tmp_path / name))
+            totals.append(PagedQuery().count())
+        assert totals == [2, 5]
+    finally:
+        connection.set_database_path(previous)
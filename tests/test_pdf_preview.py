@@ -0,0 +1,106 @@
+import types
+import pytest
+import pdf_preview
+from pdf_preview import PageCache, PdfPreview, render_pages, visible_pages, page_runs, PAGE_GAP
+
+
+@pytest.fixture
+def poppler(monkeypatch, tmp_path):
+    # Stand-in for pdf2image.convert_from_path that records each call instead of starting poppler
+    calls = []
+
+    def convert_from_path(file_path, dpi, first_page, last_page):
+        calls.append((first_page, last_page))
+        return [f"page {page} at {dpi}" for page in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr(pdf_preview, 'convert_from_path', convert_from_path)
+    monkeypatch.setattr(pdf_preview, 'page_cache', PageCache())
+    path = tmp_path / 'report.pdf'
+    path.write_bytes(b'%PDF-1.4')
+    return str(path), calls
+
+
+class FakeRunner:
+    def __init__(self):
+        self.work = []
+
+    def submit(self, work, on_done=None):
+        task = types.SimpleNamespace(cancelled=False)
+        task.cancel = lambda: setattr(task, 'cancelled', True)
+        self.work.append((work, on_done, task))
+        return task
+
+    def run_all(self):
+        work, self.work = self.work, []
+        for function, on_done, task in work:
+            if not task.cancelled:
+                on_done(function(task))
+
+
+def fake_preview(file_path, page_count):
+    # PdfPreview's scheduling state without a Tk window
+    preview = PdfPreview.__new__(PdfPreview)
+    preview.file_path, preview.page_count, preview.page_size = file_path, page_count, (600, 800)
+    preview.width, preview.zoom, preview.dpi = 600, 1.0, 72
+    preview.images, preview.requested, preview.tasks = {}, set(), []
+    preview.runner = FakeRunner()
+    preview.scrollbar = types.SimpleNamespace(set=lambda first, last: None)
+    preview.show_pages = preview.images.update
+    return preview
+
+
+def test_page_cache_drops_least_recently_used():
+    cache = PageCache(max_pages=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_render_pages_uses_one_poppler_call_per_run_and_the_cache(poppler):
+    path, calls = poppler
+    assert render_pages(path, 2, 4, 72) == {page: f"page {page} at 72" for page in (2, 3, 4)}
+    assert render_pages(path, 3, 5, 72)[5] == "page 5 at 72"
+    assert calls == [(2, 4), (5, 5)]
+    render_pages(path, 2, 5, 72)
+    render_pages(path, 2, 2, 96)
+    assert calls == [(2, 4), (5, 5), (2, 2)]
+
+
+def test_visible_pages_and_runs():
+    stride = 100 + PAGE_GAP
+    assert list(visible_pages(0, 50, 100, 10)) == [1, 2]
+    assert list(visible_pages(stride * 3 + 5, stride * 5 - 1, 100, 10)) == [4, 5, 6]
+    assert list(visible_pages(stride * 9, stride * 10, 100, 10)) == [10]
+    assert page_runs([7, 2, 3, 5, 4, 9]) == [(2, 5), (7, 7), (9, 9)]
+
+
+def test_pages_render_only_when_scrolled_into_view(poppler):
+    path, calls = poppler
+    preview = fake_preview(path, page_count=20)
+    preview.request_pages([1])
+    preview.runner.run_all()
+    assert calls == [(1, 1)]
+
+    # The view shows pages 1-2, so page 3 is rendered ahead; page 1 is not rendered again
+    preview.on_scroll(0.0, 0.09)
+    preview.on_scroll(0.0, 0.09)
+    preview.runner.run_all()
+    assert calls == [(1, 1), (2, 3)]
+
+    preview.on_scroll(0.5, 0.59)
+    preview.runner.run_all()
+    assert calls[-1] == (11, 13)
+    assert sorted(preview.images) == [1, 2, 3, 11, 12, 13]
+
+
+def test_close_cancels_pending_renders(poppler):
+    path, calls = poppler
+    preview = fake_preview(path, page_count=20)
+    preview.runner.shutdown = lambda: None
+    preview.on_scroll(0.0, 0.09)
+    preview.close()
+    preview.runner.run_all()
+    assert calls == []
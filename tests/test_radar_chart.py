@@ -0,0 +1,30 @@
+import numpy as np
+from PIL import Image
+from radar_chart import RadarChart, radar_chart, render_radar_chart, close_radar_charts, chart_styles, PREVIEW_DPI
+
+FIRST = [6.5, 150, 20, 100, 1.0, 25, 50, 50]
+SECOND = [4.0, 480, 190, 30, 3.5, 45, 10, 95]
+
+
+def pixels(buffer):
+    return np.asarray(Image.open(buffer).convert('RGB'))
+
+
+def test_reused_template_draws_like_a_fresh_chart():
+    # Only the data line moves between renders, so nothing of the previous sample may remain
+    render_radar_chart(FIRST, preview=True)
+    reused = pixels(render_radar_chart(SECOND, preview=True))
+    fresh = pixels(RadarChart(*chart_styles['report']).render(SECOND, dpi=PREVIEW_DPI))
+    assert reused.shape == fresh.shape
+    assert np.array_equal(reused, fresh)
+    assert not np.array_equal(reused, pixels(render_radar_chart(FIRST, preview=True)))
+
+
+def test_one_template_per_style():
+    assert radar_chart('report') is radar_chart('report')
+    assert radar_chart('gui') is not radar_chart('report')
+    preview = Image.open(render_radar_chart(FIRST, style='gui', preview=True))
+    assert preview.format == 'PNG'
+    template = radar_chart('gui')
+    close_radar_charts()
+    assert radar_chart('gui') is not template
@@ -0,0 +1,67 @@
+import os
+import threading
+from recommendations import RecommendationIndex
+
+
+def write_bands(path, rows):
+    with open(path, 'w') as file:
+        file.write("min,max,text\n")
+        for row in rows:
+            file.write(",".join(map(str, row)) + "\n")
+
+
+def test_overlapping_bands_all_match(tmp_path):
+    path = tmp_path / 'bands.csv'
+    write_bands(path, [(0.0, 0.5, 'low'), (0.3, 1.0, 'wide'), (0.5, 1.0, 'high')])
+    index = RecommendationIndex(str(path))
+    assert index.lookup_all(0.1) == ['low']
+    assert index.lookup_all(0.4) == ['low', 'wide']
+    assert index.lookup_all(0.5) == ['wide', 'high']
+    assert index.lookup_all(1.0) == []
+    assert index.lookup_batch([0.1, 0.4, float('nan')]) == [['low'], ['low', 'wide'], []]
+
+
+def test_missing_file_is_reported_once(tmp_path, capsys):
+    index = RecommendationIndex(str(tmp_path / 'missing.csv'))
+    for _ in range(3):
+        assert index.lookup_all(0.5) == []
+    assert capsys.readouterr().out.count("not found") == 1
+    assert index.version() == 0
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    path = tmp_path / 'bands.csv'
+    write_bands(path, [(0.0, 1.0, 'first')])
+    index = RecommendationIndex(str(path))
+    assert index.lookup(0.5) == 'first'
+    write_bands(path, [(0.0, 1.0, 'second')])
+    os.utime(path, (index.version() + 10, index.version() + 10))
+    assert index.lookup(0.5) == 'second'
+
+
+def test_lookups_never_see_a_partial_rebuild(tmp_path):
+    path = tmp_path / 'bands.csv'
+    write_bands(path, [(0.0, 1.0, 'a')])
+    index = RecommendationIndex(str(path))
+    small = [(0.0, 1.0, 'a')]
+    large = [(step / 100, (step + 1) / 100, f'band {step}') for step in range(100)]
+    stop = threading.Event()
+    errors = []
+
+    def rebuild():
+        while not stop.is_set():
+            index.build(large)
+            index.build(small)
+
+    thread = threading.Thread(target=rebuild)
+    thread.start()
+    try:
+        for _ in range(2000):
+            try:
+                index.lookup_batch([0.05, 0.55, 0.95])
+            except IndexError as e:
+                errors.append(e)
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
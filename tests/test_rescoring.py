@@ -0,0 +1,103 @@
+import pytest
+import fahp
+from connection import get_connection, transaction
+from schema import migrate, create_tables
+from assessment import scoring_version
+from recommendations import crop_index
+from rescoring import rescore_database, stale_count
+
+GOOD = (6.5, 150, 20, 100, 1.0, 25, 50, 50)
+OUT_OF_RANGE = (99.0, 150, 20, 100, 1.0, 25, 50, 50)
+NOTHING_MEASURED = (None,) * 8
+
+
+def add_tests(samples):
+    with transaction() as conn:
+        conn.executemany('''INSERT INTO soil_tests (test_id, soil_ph, nitrogen, phosphorus, potassium,
+                            electrical_conductivity, temperature, moisture, humidity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                         [(f"T{i}",) + tuple(sample) for i, sample in enumerate(samples)])
+
+
+def stored():
+    return get_connection().execute(
+        "SELECT soil_health_score, crop_recommendations, scoring_version FROM soil_test_details ORDER BY id").fetchall()
+
+
+def test_rows_from_before_versioning_are_rescored_once(database):
+    # A database from before migration 5 holds scores with no version
+    with transaction() as conn:
+        create_tables(conn)
+    add_tests([GOOD] * 5)
+    migrate()
+    assert stale_count(scoring_version()) == 5
+    stats = rescore_database(chunk_size=2, duty_cycle=1)
+    assert (stats['stale'], stats['rescored'], stats['failed']) == (5, 5, 0)
+    rows = stored()
+    assert {row[2] for row in rows} == {scoring_version()}
+    assert all(row[0] is not None and row[1] for row in rows)
+    assert rescore_database(duty_cycle=1)['stale'] == 0
+
+
+def test_unscorable_rows_keep_their_results_and_are_not_retried(database):
+    migrate()
+    add_tests([GOOD, OUT_OF_RANGE, NOTHING_MEASURED])
+    with transaction() as conn:
+        conn.execute("INSERT INTO crop_recommendation_texts (text) VALUES ('Rice')")
+        conn.execute("""UPDATE soil_tests SET soil_health_score = 0.42,
+                        crop_recommendation_id = (SELECT id FROM crop_recommendation_texts WHERE text = 'Rice')""")
+    stats = rescore_database(duty_cycle=1)
+    assert (stats['rescored'], stats['failed']) == (1, 2)
+    rows = stored()
+    assert rows[0][0] != 0.42
+    assert rows[1] == (0.42, 'Rice', scoring_version())
+    assert rows[2] == (0.42, 'Rice', scoring_version())
+    assert get_connection().execute("SELECT unscorable FROM soil_tests ORDER BY id").fetchall() == [(0,), (1,), (1,)]
+    again = rescore_database(duty_cycle=1)
+    assert (again['stale'], again['rescored'], again['failed']) == (0, 0, 0)
+
+
+def test_missing_recommendation_file_stops_the_job(database, monkeypatch):
+    migrate()
+    add_tests([GOOD])
+    rescore_database(duty_cycle=1)
+    before = stored()
+    monkeypatch.setattr(crop_index, 'file_path', 'missing_crop_recommendations.csv')
+    try:
+        with pytest.raises(FileNotFoundError):
+            rescore_database(duty_cycle=1)
+        assert stored() == before
+    finally:
+        monkeypatch.undo()
+        crop_index.refresh()
+
+
+def test_stopped_job_resumes_where_it_left_off(database):
+    migrate()
+    add_tests([GOOD] * 6)
+    chunks = []
+    first = rescore_database(chunk_size=2, duty_cycle=1, progress=lambda stats: chunks.append(stats['rescored']),
+                             should_stop=lambda: len(chunks) >= 1)
+    assert first['rescored'] == 2
+    assert stale_count(scoring_version()) == 4
+    assert rescore_database(chunk_size=2, duty_cycle=1)['rescored'] == 4
+
+
+def test_new_weights_make_every_row_stale(database, monkeypatch):
+    migrate()
+    add_tests([GOOD] * 3)
+    rescore_database(duty_cycle=1)
+    before = stored()
+    changed = fahp.predefined_fuzzy_comparison_matrix().copy()
+    changed[0, 1] = [9, 9, 9]
+    changed[1, 0] = [1 / 9, 1 / 9, 1 / 9]
+    monkeypatch.setattr(fahp, 'predefined_fuzzy_comparison_matrix', lambda: changed)
+    fahp.invalidate_weights_cache()
+    try:
+        assert stale_count(scoring_version()) == 3
+        assert rescore_database(duty_cycle=1)['rescored'] == 3
+        after = stored()
+        assert after[0][2] != before[0][2]
+        assert after[0][0] != pytest.approx(before[0][0])
+    finally:
+        monkeypatch.undo()
+        fahp.invalidate_weights_cache()
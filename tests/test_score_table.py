@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import fahp
+from assessment import assess_batch, generate_crop_recommendations_batch
+from indicators import indicator_bounds
+from score_table import ScoreTable, build_table, uniform_edges, load_score_table
+
+
+@pytest.fixture(scope='module')
+def table_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('table') / 'score_table.npy')
+    build_table(path, uniform_edges(3))
+    return path
+
+
+@pytest.fixture
+def table(table_path):
+    return ScoreTable(table_path)
+
+
+def random_samples(count, seed=0):
+    min_values, max_values = indicator_bounds()
+    return np.random.default_rng(seed).uniform(min_values, max_values, (count, len(min_values)))
+
+
+def test_lookup_stays_within_the_error_bound(table):
+    samples = random_samples(5000)
+    looked_up = table.lookup(samples, exact_fallback=False)
+    exact = assess_batch(samples)['soil_health_score']
+    assert np.all(np.abs(looked_up['soil_health_score'] - exact) <= looked_up['error'] + 1e-9)
+    assert looked_up['error'].max() <= table.max_error + 1e-6
+
+
+def test_exact_fallback_matches_exact_ratings_and_recommendations(table):
+    samples = random_samples(5000, seed=1)
+    looked_up = table.lookup(samples)
+    exact = assess_batch(samples)
+    assert list(looked_up['rating']) == list(exact['rating'])
+    assert list(looked_up['crop_recommendations']) == generate_crop_recommendations_batch(
+        exact['soil_health_score'])
+
+
+def test_invalid_samples_are_flagged(table):
+    samples = random_samples(2)
+    samples[1, 0] = 99.0
+    looked_up = table.lookup(samples)
+    assert list(looked_up['valid']) == [True, False]
+    assert np.isnan(looked_up['soil_health_score'][1])
+    assert looked_up['rating'][1] is None
+
+
+def test_table_built_for_other_weights_is_refused(table, table_path, monkeypatch):
+    assert table.is_current()
+    changed = fahp.predefined_fuzzy_comparison_matrix().copy()
+    changed[0, 1] = [9, 9, 9]
+    changed[1, 0] = [1 / 9, 1 / 9, 1 / 9]
+    monkeypatch.setattr(fahp, 'predefined_fuzzy_comparison_matrix', lambda: changed)
+    fahp.invalidate_weights_cache()
+    try:
+        assert not table.is_current()
+        load_score_table.cache_clear()
+        with pytest.raises(ValueError, match="out of date"):
+            load_score_table(table_path)
+    finally:
+        monkeypatch.undo()
+        fahp.invalidate_weights_cache()
+        load_score_table.cache_clear()
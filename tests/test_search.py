@@ -0,0 +1,68 @@
+import search
+from connection import get_connection, transaction
+from schema import migrate, schema_version
+from search import search_ids, filter_clause, has_search_index, like_clause
+
+
+def add_farmers(names):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO soil_tests (test_id, name, address) VALUES (?, ?, ?)",
+                         [(f"T{i}", name, f"Village {i}") for i, name in enumerate(names)])
+
+
+def filtered(text):
+    clause, parameters = filter_clause(text)
+    return [row[0] for row in get_connection().execute(f"SELECT name FROM soil_tests WHERE {clause} ORDER BY id",
+                                                       parameters)]
+
+
+def test_prefix_search_follows_inserts_updates_and_deletes(database):
+    migrate()
+    add_farmers(['Lalthanzara Khiangte', 'Zoremsangi Ralte', 'Lalremruata Khiangte'])
+    assert filtered('khiang') == ['Lalthanzara Khiangte', 'Lalremruata Khiangte']
+    assert filtered('lal khi') == ['Lalthanzara Khiangte', 'Lalremruata Khiangte']
+    with transaction() as conn:
+        conn.execute("UPDATE soil_tests SET name = 'Vanlalruata Pachuau' WHERE test_id = 'T0'")
+        conn.execute("DELETE FROM soil_tests WHERE test_id = 'T2'")
+    assert filtered('khiang') == []
+    assert filtered('pachuau') == ['Vanlalruata Pachuau']
+    assert search_ids('T1') == [2]
+
+
+def test_fuzzy_search_tolerates_typos(database):
+    migrate()
+    add_farmers(['Lalthanzara Khiangte', 'Zoremsangi Ralte'])
+    assert search_ids('Khaingte', fuzzy=True) == [1]
+
+
+def test_missing_trigram_tokenizer_keeps_a_working_word_index(database, monkeypatch):
+    monkeypatch.setitem(search.index_tokenizers, 'soil_tests_trigram', 'no_such_tokenizer')
+    migrate()
+    conn = get_connection()
+    assert schema_version() >= 3
+    assert not has_search_index(conn, 'soil_tests_trigram')
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'soil_tests_trigram%'").fetchone()[0] == 0
+    assert has_search_index(conn)
+    add_farmers(['Zoremsangi Ralte'])
+    assert filtered('ralte') == ['Zoremsangi Ralte']
+    # Fuzzy search degrades to prefix matching
+    assert search_ids('Ralte', fuzzy=True) == [1]
+
+
+def test_index_without_triggers_falls_back_to_like(database):
+    migrate()
+    with transaction() as conn:
+        conn.execute("DROP TRIGGER soil_tests_fts_insert")
+    add_farmers(['Zoremsangi Ralte'])
+    assert not has_search_index()
+    assert filter_clause('ralte')[0] == like_clause('ralte')[0]
+    assert filtered('ralte') == ['Zoremsangi Ralte']
+    assert search_ids('ralte') == [1]
+
+
+def test_like_fallback_escapes_wildcards(database):
+    migrate()
+    add_farmers(['100% organic', '100 percent'])
+    clause, parameters = like_clause('100%')
+    assert [row[0] for row in get_connection().execute(
+        f"SELECT name FROM soil_tests WHERE {clause}", parameters)] == ['100% organic']
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from cli import build_parser
+from fahp import predefined_fuzzy_comparison_matrix, fahp_weights
+from sensitivity import perturbed_matrices, batch_weights, run_sensitivity
+
+# Normalized indicator values of a few samples, NaN where not measured
+SAMPLES = (np.arange(4), np.array([[0.9, 0.8, 0.7, 0.9, 0.8, 0.6, 0.7, 0.9],
+                                   [0.3, 0.5, np.nan, 0.4, 0.6, 0.5, 0.2, 0.4],
+                                   [0.55, 0.6, 0.5, 0.45, 0.6, 0.5, 0.55, 0.6],
+                                   [0.1, 0.2, 0.1, np.nan, np.nan, 0.3, 0.2, 0.1]]))
+
+
+def test_perturbed_judgments_stay_inside_the_expert_range():
+    matrix = predefined_fuzzy_comparison_matrix()
+    log_matrices = perturbed_matrices(matrix, 200, np.random.default_rng(1))
+    rows, columns = np.triu_indices(matrix.shape[0], 1)
+    drawn = np.exp(log_matrices[:, rows, columns])
+    assert np.all(drawn >= matrix[rows, columns, 0][:, None] - 1e-9)
+    assert np.all(drawn <= matrix[rows, columns, 2][:, None] + 1e-9)
+    assert np.all(np.diff(drawn, axis=-1) >= -1e-9)
+    # Below the diagonal every entry is the reciprocal (1/u, 1/m, 1/l)
+    assert np.allclose(log_matrices[:, columns, rows], -log_matrices[:, rows, columns][..., ::-1])
+
+
+def test_unperturbed_matrix_gives_the_fahp_weights():
+    matrix = predefined_fuzzy_comparison_matrix()
+    weights = batch_weights(np.log(matrix)[None])
+    assert np.allclose(weights[0], fahp_weights(matrix))
+
+
+@pytest.mark.parametrize('chunk_draws', [7, 1000])
+def test_seed_gives_the_same_result_for_any_worker_count(chunk_draws):
+    single = run_sensitivity(30, seed=42, workers=1, chunk_draws=chunk_draws, samples=SAMPLES)
+    parallel = run_sensitivity(30, seed=42, workers=2, chunk_draws=chunk_draws, samples=SAMPLES)
+    for key in ('weight_mean', 'weight_std', 'rank_stability', 'sample_flip_rates', 'draw_flip_rates'):
+        assert np.array_equal(single[key], parallel[key])
+    assert single['flip_rate'] == parallel['flip_rate']
+    other = run_sensitivity(30, seed=43, workers=1, chunk_draws=chunk_draws, samples=SAMPLES)
+    assert not np.array_equal(single['weight_mean'], other['weight_mean'])
+
+
+def test_at_least_one_draw_is_required():
+    with pytest.raises(ValueError):
+        run_sensitivity(0, samples=SAMPLES)
+
+
+@pytest.mark.parametrize('draws', ['0', '-5', 'many'])
+def test_cli_rejects_draw_counts_below_one(draws, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        build_parser().parse_args(['sensitivity', '--draws', draws])
+    assert exit_info.value.code == 2
+    assert '--draws' in capsys.readouterr().err
+    assert build_parser().parse_args(['sensitivity', '--draws', '1']).draws == 1
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import service
+from service import ScoringService, request_latency
+
+SAMPLE = [6.5, 150, 20, 100, 1.0, 25, 50, 50]
+
+
+async def exchange(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b' ', 2)[1])
+    return status, response.split(b'\r\n\r\n', 1)[1]
+
+
+def request(method, path, body=b'', headers=None):
+    headers = dict({'Content-Length': str(len(body)), 'Connection': 'close'}, **(headers or {}))
+    head = ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+    return f"{method} {path} HTTP/1.1\r\n{head}\r\n".encode() + body
+
+
+def run_with_service(*raw_requests):
+    async def main():
+        scoring = ScoringService(max_delay=0.001)
+        scoring.coalescer.start()
+        server = await asyncio.start_server(scoring.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*(exchange(port, raw) for raw in raw_requests))
+        finally:
+            server.close()
+            await scoring.coalescer.stop()
+    return asyncio.run(main())
+
+
+def test_single_requests_are_scored_together():
+    body = json.dumps({'indicators': SAMPLE}).encode()
+    responses = run_with_service(*[request('POST', '/score', body)] * 5)
+    assert all(status == 200 for status, _ in responses)
+    scores = {json.loads(payload)['soil_health_score'] for _, payload in responses}
+    assert len(scores) == 1
+
+
+def test_malformed_and_oversized_content_length():
+    (bad_status, _), (negative_status, _), (large_status, _) = run_with_service(
+        request('POST', '/score', headers={'Content-Length': 'ten'}),
+        request('POST', '/score', headers={'Content-Length': '-5'}),
+        request('POST', '/score', headers={'Content-Length': str(service.MAX_BODY_BYTES + 1)}))
+    assert (bad_status, negative_status, large_status) == (400, 400, 413)
+
+
+def test_unknown_paths_share_one_latency_label():
+    run_with_service(request('GET', '/no/such/path/1'), request('GET', '/no/such/path/2'), request('GET', '/health'))
+    paths = {dict(key)['path'] for key in request_latency.series}
+    assert paths <= set(service.routes) | {'other'}
+    assert 'other' in paths
+
+
+def test_flush_tasks_are_held_until_done():
+    async def main():
+        scoring = ScoringService(max_delay=0.001)
+        scoring.coalescer.start()
+        try:
+            pending = asyncio.ensure_future(scoring.coalescer.score(SAMPLE))
+            while not scoring.coalescer.flushes and not pending.done():
+                await asyncio.sleep(0)
+            held = len(scoring.coalescer.flushes)
+            result = await pending
+        finally:
+            await scoring.coalescer.stop()
+        return held, result, scoring.coalescer.flushes
+    held, result, flushes = asyncio.run(main())
+    assert held == 1
+    assert result['valid']
+    assert not flushes
@@ -0,0 +1,74 @@
+import pytest
+import spatial
+from connection import transaction
+from schema import migrate
+from spatial import radius_box, radius_ids, nearest_query, bounding_box_query, haversine_km, KM_PER_DEGREE_LATITUDE
+
+# Samples on both sides of the antimeridian near Fiji, and a line of samples due north of Aizawl
+ANTIMERIDIAN = [('F1', -17.0, 179.95), ('F2', -17.0, -179.95), ('F3', -17.0, 179.5), ('F4', -17.0, -179.5),
+                ('F5', -17.0, 170.0)]
+AIZAWL = (23.7271, 92.7176)
+NORTH_KM = [0.5, 3.0, 5.0, 50.0]
+
+
+@pytest.fixture(params=['rtree', 'btree'])
+def stored_points(request, database):
+    # Every query runs against the R*Tree and against the (latitude, longitude) index used without it
+    migrate()
+    rows = ANTIMERIDIAN + [(f"A{i}", AIZAWL[0] + km / KM_PER_DEGREE_LATITUDE, AIZAWL[1])
+                           for i, km in enumerate(NORTH_KM)]
+    with transaction() as conn:
+        conn.executemany("INSERT INTO soil_tests (test_id, latitude, longitude) VALUES (?, ?, ?)", rows)
+        if request.param == 'btree':
+            for event in ('insert', 'delete', 'update'):
+                conn.execute(f"DROP TRIGGER soil_tests_rtree_{event}")
+            conn.execute("DROP TABLE soil_tests_rtree")
+            conn.execute("CREATE INDEX ix_soil_tests_location ON soil_tests (latitude, longitude)")
+    return request.param
+
+
+def record_ids(pairs):
+    return [record_id for record_id, _ in pairs]
+
+
+def test_radius_box_crosses_the_antimeridian():
+    min_latitude, min_longitude, max_latitude, max_longitude = radius_box(-17.0, 179.95, 20)
+    assert max_longitude > 180
+    assert min_latitude < -17.0 < max_latitude
+    # Near a pole every longitude is in range
+    assert radius_box(89.95, 10.0, 20)[1::2] == (-180, 180)
+
+
+def test_radius_search_finds_points_across_the_antimeridian(stored_points):
+    found = radius_ids(-17.0, 179.95, 20)
+    assert record_ids(found) == [1, 2]
+    assert found[1][1] == pytest.approx(haversine_km(-17.0, 179.95, [-17.0], [-179.95])[0])
+    assert record_ids(radius_ids(-17.0, -179.95, 60)) == [2, 1, 4, 3]
+    assert record_ids(radius_ids(-17.0, 179.95, 2000)) == [1, 2, 3, 4, 5]
+
+
+def test_bounding_box_on_each_side(stored_points):
+    assert sorted(row[0] for row in bounding_box_query(-18, 179, -16, 180, columns='id')) == [1, 3]
+    assert sorted(row[0] for row in bounding_box_query(-18, -180, -16, -179, columns='id')) == [2, 4]
+
+
+def test_nearest_expands_the_radius_until_it_holds_k(stored_points, monkeypatch):
+    radii = []
+    real_radius_ids = spatial.radius_ids
+
+    def recording_radius_ids(latitude, longitude, radius_km):
+        radii.append(radius_km)
+        return real_radius_ids(latitude, longitude, radius_km)
+
+    monkeypatch.setattr(spatial, 'radius_ids', recording_radius_ids)
+    nearest = nearest_query(*AIZAWL, k=3, initial_radius_km=1.0)
+    assert [row[1] for row, _ in nearest] == ['A0', 'A1', 'A2']
+    assert [distance for _, distance in nearest] == pytest.approx(NORTH_KM[:3], rel=1e-2)
+    assert radii == [1.0, 2.0, 4.0, 8.0]
+
+
+def test_nearest_returns_every_sample_when_k_exceeds_them(stored_points):
+    nearest = nearest_query(*AIZAWL, k=50, initial_radius_km=100.0)
+    assert len(nearest) == len(ANTIMERIDIAN) + len(NORTH_KM)
+    distances = [distance for _, distance in nearest]
+    assert distances == sorted(distances)
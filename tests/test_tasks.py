@@ -0,0 +1,108 @@
+import threading
+import time
+import pytest
+from tasks import TaskRunner
+
+
+class FakeRoot:
+    # Stands in for the Tk root: after() only records the poll, and pump() runs the recorded polls
+    # on the test thread until the runner stops rescheduling them
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, interval, callback):
+        self.scheduled.append(callback)
+
+    def pump(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.scheduled:
+            assert time.monotonic() < deadline, "tasks did not finish"
+            self.scheduled.pop(0)()
+            time.sleep(0.001)
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+
+@pytest.fixture
+def runner(root):
+    runner = TaskRunner(root)
+    yield runner
+    runner.shutdown()
+
+
+def recorder():
+    calls = []
+    return calls, {name: (lambda *args, name=name: calls.append((name,) + args))
+                   for name in ('on_done', 'on_error', 'on_progress')}
+
+
+def test_results_and_progress_reach_the_callbacks(root, runner):
+    calls, callbacks = recorder()
+
+    def work(task):
+        task.report_progress(0.5, 'half')
+        return 42
+
+    runner.submit(work, **callbacks)
+    root.pump()
+    assert calls == [('on_progress', 0.5, 'half'), ('on_done', 42)]
+    assert runner.pending == 0
+
+
+def test_errors_reach_on_error(root, runner):
+    calls, callbacks = recorder()
+    error = ValueError("bad sample")
+
+    def work(task):
+        raise error
+
+    runner.submit(work, **callbacks)
+    root.pump()
+    assert calls == [('on_error', error)]
+
+
+def test_no_callbacks_after_cancel_while_running(root, runner):
+    calls, callbacks = recorder()
+    started, release = threading.Event(), threading.Event()
+    steps = []
+
+    def work(task):
+        task.report_progress(0.1)
+        started.set()
+        release.wait(5)
+        for step in range(3):
+            task.report_progress(0.5 + step / 10)
+            steps.append(step)
+        return 'finished'
+
+    task = runner.submit(work, **callbacks)
+    started.wait(5)
+    task.cancel()
+    release.set()
+    root.pump()
+    # The progress queued before cancel() is dropped too, and the work stops at its next step
+    assert calls == []
+    assert steps == []
+    assert runner.pending == 0
+
+
+def test_no_callbacks_when_cancelled_after_the_work_finished(root, runner):
+    calls, callbacks = recorder()
+    task = runner.submit(lambda task: 'finished', **callbacks)
+    runner.executor.shutdown(wait=True)
+    task.cancel()
+    root.pump()
+    assert calls == []
+    assert runner.pending == 0
+
+
+def test_shutdown_drops_every_callback(root, runner):
+    calls, callbacks = recorder()
+    runner.submit(lambda task: 'finished', **callbacks)
+    runner.executor.shutdown(wait=True)
+    runner.shutdown()
+    root.pump()
+    assert calls == []